@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Corpus Analytics for General Conference Talks
+
+This module produces the per-conference statistics: word counts and reading
+time per talk, the most-cited scriptures, the most used terms of each speaker
+and how term use trends across the years.
+
+Talks are tokenized once into a TermStore: every word becomes an id into one
+vocabulary and a talk is a slice of one int32 array, with footnote scripture
+citations kept as (talk, reference) id pairs. The statistics are then array
+operations over the whole archive (bincount, sparse group-by-term matrices,
+a least-squares slope per term) rather than Python loops over the JSON, and
+a store saved with --store loads in well under a second for later reports.
+
+NumPy and SciPy are only needed here: pip install numpy scipy
+
+Usage:
+    python analytics.py [--store FILE] [--csv DIR] [--json FILE] [--top N] [--terms WORD,...]
+                        [conference_data.json ...]
+
+Example:
+    python analytics.py --store archive.npz --csv reports archive/*.json
+    python analytics.py --store archive.npz --terms faith,hope,charity
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import argparse
+from typing import Dict, Iterable, List, Optional, Tuple
+from content_utils import (FOOTNOTE_PATTERN, STOP_WORDS, WORD_PATTERN, conference_slug, extract_conference_date,
+                           iter_talk_blocks)
+from snapshot_diff import conference_tree
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # Optional dependencies, only needed for analytics
+    np = sparse = None
+
+
+# Average adult silent reading speed
+READING_WORDS_PER_MINUTE = 200
+
+# Terms shorter than this, numbers and stop words are left out of term reports
+MIN_TERM_LENGTH = 3
+
+# Only terms used at least this often across the corpus are ranked as trends
+MIN_TREND_COUNT = 50
+
+# 'Alma 32:21', '1 Nephi 3:7', 'Doctrine and Covenants 88:118', 'Joseph Smith—History 1:17'
+SCRIPTURE_PATTERN = re.compile(
+    r"\b((?:[1-4] )?[A-Z][a-z]+(?:(?: and| of the| of)? [A-Z][a-z]+)*(?:[—–-][A-Z][a-z]+)?)"
+    r" (\d+):(\d+)")
+
+# Words that may precede a book name in a citation ('See John 3:16')
+CITATION_LEAD_WORDS = ('See', 'Compare', 'Also', 'Read', 'Cf', 'In')
+
+
+def require_numpy():
+    if np is None:
+        raise ImportError("Corpus analytics needs NumPy and SciPy: pip install numpy scipy")
+
+
+def scripture_references(text: str) -> List[str]:
+    """Scripture references ('Alma 32:21') cited in a footnote's text, first verse only"""
+    references = []
+    for book, chapter, verse in SCRIPTURE_PATTERN.findall(text):
+        words = book.split(' ')
+        while len(words) > 1 and words[0] in CITATION_LEAD_WORDS:
+            words.pop(0)
+        references.append(f"{' '.join(words)} {chapter}:{verse}")
+    return references
+
+
+def talk_text(talk: Dict) -> str:
+    """A talk's body text (paragraphs and headers, no footnote markers), lower case"""
+    parts = [content if kind != 'image' else '' for kind, content, _ in iter_talk_blocks(talk)]
+    return FOOTNOTE_PATTERN.sub(' ', '\n'.join(parts)).lower()
+
+
+class TermStore:
+    """Talks tokenized into term ids, with their citations and metadata, as flat arrays
+
+    tokens[offsets[i]:offsets[i + 1]] are the term ids of talk i, and
+    talk_conference / talk_speaker give each talk's conference and speaker
+    ids. Each citation is a pair citation_talk[j], citation_ref[j].
+    """
+
+    def __init__(self):
+        require_numpy()
+        self.terms = []  # Term id -> term
+        self.speakers = []  # Speaker id -> name
+        self.conferences = []  # Conference id -> {'name', 'title', 'year', 'month', 'hash'}
+        self.references = []  # Reference id -> 'Book chapter:verse'
+        self.talks = []  # Talk -> {'title', 'url'}
+        self._term_ids = {}
+        self._speaker_ids = {}
+        self._reference_ids = {}
+        self.tokens = np.zeros(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.talk_conference = np.zeros(0, dtype=np.int32)
+        self.talk_speaker = np.zeros(0, dtype=np.int32)
+        self.citation_talk = np.zeros(0, dtype=np.int32)
+        self.citation_ref = np.zeros(0, dtype=np.int32)
+        self._talk_terms = None
+
+    def __len__(self):
+        return len(self.talks)
+
+    def _id(self, ids: Dict[str, int], names: List[str], name: str) -> int:
+        index = ids.get(name)
+        if index is None:
+            index = ids[name] = len(names)
+            names.append(name)
+        return index
+
+    def add_conference(self, conference: Dict):
+        """Tokenize a conference's talks and append them to the store"""
+        date = extract_conference_date(conference)
+        month, year = date.split() if date else ('', '0')
+        conference_id = len(self.conferences)
+        self.conferences.append({
+            'name': conference_slug(conference),
+            'title': conference.get('conference_title', ''),
+            'year': int(year),
+            'month': month,
+            'hash': conference_tree(conference)['hash'],
+        })
+
+        term_ids = self._term_ids
+        terms = self.terms
+        talk_tokens, lengths, speakers, citation_talks, citation_refs = [], [], [], [], []
+        first_talk = len(self.talks)
+        for talk in conference['talks']:
+            words = WORD_PATTERN.findall(talk_text(talk))
+            ids = [term_ids[word] if word in term_ids else self._id(term_ids, terms, word) for word in words]
+            talk_tokens.append(np.array(ids, dtype=np.int32))
+            lengths.append(len(ids))
+            speakers.append(self._id(self._speaker_ids, self.speakers, talk.get('speaker', '')))
+            for footnote in talk.get('footnotes') or []:
+                for reference in scripture_references(footnote.get('text', '')):
+                    citation_talks.append(first_talk + len(lengths) - 1)
+                    citation_refs.append(self._id(self._reference_ids, self.references, reference))
+            self.talks.append({'title': talk.get('title', ''), 'url': talk.get('url', '')})
+
+        self.tokens = np.concatenate([self.tokens] + talk_tokens)
+        self.offsets = np.concatenate([self.offsets, self.offsets[-1] + np.cumsum(lengths, dtype=np.int64)])
+        self.talk_conference = np.concatenate([self.talk_conference,
+                                               np.full(len(lengths), conference_id, dtype=np.int32)])
+        self.talk_speaker = np.concatenate([self.talk_speaker, np.array(speakers, dtype=np.int32)])
+        self.citation_talk = np.concatenate([self.citation_talk, np.array(citation_talks, dtype=np.int32)])
+        self.citation_ref = np.concatenate([self.citation_ref, np.array(citation_refs, dtype=np.int32)])
+        self._talk_terms = None
+
+    @classmethod
+    def build(cls, conferences: Iterable) -> 'TermStore':
+        """A store of conferences (dicts, talk_model Conferences or JSON paths)"""
+        from talk_model import load_conference
+        store = cls()
+        for conference in conferences:
+            if isinstance(conference, str):
+                conference = load_conference(conference)
+            store.add_conference(conference)
+        return store
+
+    def without(self, names) -> 'TermStore':
+        """A copy of the store without the named conferences (term, speaker and reference ids are kept)"""
+        store = type(self)()
+        store.terms, store.speakers, store.references = list(self.terms), list(self.speakers), list(self.references)
+        store._term_ids, store._speaker_ids = dict(self._term_ids), dict(self._speaker_ids)
+        store._reference_ids = dict(self._reference_ids)
+        kept = [i for i, info in enumerate(self.conferences) if info['name'] not in names]
+        store.conferences = [self.conferences[i] for i in kept]
+
+        conference_ids = np.full(len(self.conferences), -1, dtype=np.int32)
+        conference_ids[kept] = np.arange(len(kept), dtype=np.int32)
+        kept_talk = conference_ids[self.talk_conference] >= 0
+        talks = np.flatnonzero(kept_talk)
+        talk_ids = np.full(len(self), -1, dtype=np.int32)
+        talk_ids[talks] = np.arange(len(talks), dtype=np.int32)
+        lengths = self.talk_lengths()
+
+        store.talks = [self.talks[i] for i in talks.tolist()]
+        store.tokens = self.tokens[np.repeat(kept_talk, lengths)]
+        store.offsets = np.concatenate([[0], np.cumsum(lengths[talks], dtype=np.int64)])
+        store.talk_conference = conference_ids[self.talk_conference[talks]]
+        store.talk_speaker = self.talk_speaker[talks]
+        cited = talk_ids[self.citation_talk] >= 0
+        store.citation_talk = talk_ids[self.citation_talk[cited]]
+        store.citation_ref = self.citation_ref[cited]
+        return store
+
+    def save(self, path: str):
+        meta = {key: getattr(self, key) for key in ('terms', 'speakers', 'conferences', 'references', 'talks')}
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, tokens=self.tokens, offsets=self.offsets, talk_conference=self.talk_conference,
+                                talk_speaker=self.talk_speaker, citation_talk=self.citation_talk,
+                                citation_ref=self.citation_ref, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, path: str) -> 'TermStore':
+        store = cls()
+        with np.load(path, allow_pickle=False) as data:
+            for key in ('tokens', 'offsets', 'talk_conference', 'talk_speaker', 'citation_talk', 'citation_ref'):
+                setattr(store, key, data[key])
+            meta = json.loads(str(data['meta']))
+        for key, value in meta.items():
+            setattr(store, key, value)
+        store._term_ids = {term: i for i, term in enumerate(store.terms)}
+        store._speaker_ids = {name: i for i, name in enumerate(store.speakers)}
+        store._reference_ids = {ref: i for i, ref in enumerate(store.references)}
+        return store
+
+    # Derived arrays
+
+    def talk_lengths(self):
+        """Words per talk"""
+        return np.diff(self.offsets)
+
+    def token_talks(self):
+        """The talk of every token"""
+        return np.repeat(np.arange(len(self.talks), dtype=np.int32), self.talk_lengths())
+
+    def content_terms(self):
+        """Boolean mask over the vocabulary: terms worth reporting (no stop words, numbers or short words)"""
+        return np.array([len(term) >= MIN_TERM_LENGTH and term not in STOP_WORDS and not term.isdigit()
+                         for term in self.terms], dtype=bool)
+
+    def talk_terms(self):
+        """Sparse (talks x terms) counts, built once"""
+        if self._talk_terms is None:
+            ones = np.ones(len(self.tokens), dtype=np.int32)
+            self._talk_terms = sparse.csr_matrix((ones, (self.token_talks(), self.tokens)),
+                                                 shape=(len(self), len(self.terms)))
+        return self._talk_terms
+
+    def term_counts(self, talk_groups, num_groups: int):
+        """Sparse (groups x terms) counts, where talk_groups maps each talk to its group"""
+        membership = sparse.csr_matrix((np.ones(len(self), dtype=np.int32), (talk_groups, np.arange(len(self)))),
+                                       shape=(num_groups, len(self)))
+        return membership @ self.talk_terms()
+
+
+# Reports
+
+def talk_report(store: TermStore) -> List[Dict]:
+    """Per talk: conference, speaker, title, words, reading minutes and citations"""
+    words = store.talk_lengths()
+    minutes = words / READING_WORDS_PER_MINUTE
+    citations = np.bincount(store.citation_talk, minlength=len(store))
+    return [{
+        'conference': store.conferences[conference]['name'],
+        'speaker': store.speakers[speaker],
+        'title': talk['title'],
+        'words': int(count),
+        'reading_minutes': round(float(reading), 1),
+        'citations': int(cited),
+    } for talk, conference, speaker, count, reading, cited in zip(
+        store.talks, store.talk_conference.tolist(), store.talk_speaker.tolist(), words, minutes, citations)]
+
+
+def conference_report(store: TermStore) -> List[Dict]:
+    """Per conference: talks, total and mean words, mean reading minutes and citations"""
+    num = len(store.conferences)
+    talks = np.bincount(store.talk_conference, minlength=num)
+    words = np.bincount(store.talk_conference, weights=store.talk_lengths(), minlength=num)
+    citations = np.bincount(store.talk_conference[store.citation_talk], minlength=num)
+    mean_words = np.divide(words, talks, out=np.zeros(num), where=talks > 0)
+    return [{
+        'conference': info['name'],
+        'talks': int(talks[i]),
+        'words': int(words[i]),
+        'mean_words': round(float(mean_words[i])),
+        'mean_reading_minutes': round(float(mean_words[i]) / READING_WORDS_PER_MINUTE, 1),
+        'citations': int(citations[i]),
+    } for i, info in enumerate(store.conferences)]
+
+
+def scripture_report(store: TermStore, top: int = 25) -> Dict[str, List[Dict]]:
+    """The most-cited references and books, with how many talks cite each"""
+    counts = np.bincount(store.citation_ref, minlength=len(store.references))
+    # Talks citing a reference: unique (reference, talk) pairs
+    pairs = np.unique(store.citation_ref.astype(np.int64) * max(len(store), 1) + store.citation_talk)
+    talks = np.bincount(pairs // max(len(store), 1), minlength=len(store.references))
+    order = np.argsort(-counts, kind='stable')[:top]
+    references = [{'reference': store.references[i], 'citations': int(counts[i]), 'talks': int(talks[i])}
+                  for i in order if counts[i]]
+
+    books = sorted({ref.rsplit(' ', 1)[0] for ref in store.references})
+    book_ids = {book: i for i, book in enumerate(books)}
+    ref_book = np.array([book_ids[ref.rsplit(' ', 1)[0]] for ref in store.references], dtype=np.int32)
+    book_counts = np.bincount(ref_book[store.citation_ref], minlength=len(books)) if books else np.zeros(0)
+    book_order = np.argsort(-book_counts, kind='stable')[:top]
+    return {
+        'references': references,
+        'books': [{'book': books[i], 'citations': int(book_counts[i])} for i in book_order if book_counts[i]],
+    }
+
+
+def _top_in_rows(matrix, top: int) -> List[List[Tuple[int, int]]]:
+    """For each row of a CSR matrix, its top (column, value) pairs by value"""
+    rows = []
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        values, columns = matrix.data[start:end], matrix.indices[start:end]
+        if len(values) > top:
+            keep = np.argpartition(-values, top - 1)[:top]
+            values, columns = values[keep], columns[keep]
+        order = np.argsort(-values, kind='stable')
+        rows.append(list(zip(columns[order].tolist(), values[order].tolist())))
+    return rows
+
+
+def speaker_term_report(store: TermStore, top: int = 10) -> List[Dict]:
+    """Each speaker's most used terms, with their rate per 10,000 words"""
+    counts = store.term_counts(store.talk_speaker, len(store.speakers))
+    words = np.bincount(store.talk_speaker, weights=store.talk_lengths(), minlength=len(store.speakers))
+    counts.data[~store.content_terms()[counts.indices]] = 0
+    counts.eliminate_zeros()
+    report = []
+    for speaker, row in enumerate(_top_in_rows(counts, top)):
+        for term, count in row:
+            report.append({'speaker': store.speakers[speaker], 'term': store.terms[term], 'count': int(count),
+                           'per_10k_words': round(count * 10000 / words[speaker], 2)})
+    return report
+
+
+def term_trends(store: TermStore, terms: Optional[List[str]] = None, top: int = 15) -> Dict:
+    """Term rates per 10,000 words by year, and the terms rising or falling fastest
+
+    A term's trend is the least-squares slope of its yearly rate, computed for
+    all terms at once; only content terms used at least MIN_TREND_COUNT times
+    are ranked. Conferences without a date (year 0) are left out.
+    """
+    conference_years = np.array([info['year'] for info in store.conferences], dtype=np.int32)
+    years, talk_year = np.unique(conference_years[store.talk_conference], return_inverse=True)
+    counts = store.term_counts(talk_year, len(years))
+    words = np.bincount(talk_year, weights=store.talk_lengths(), minlength=len(years))
+    dated = years > 0
+    years, counts, words = years[dated], counts[dated], words[dated]
+    scale = np.divide(10000.0, words, out=np.zeros(len(years)), where=words > 0)
+
+    result = {'years': years.tolist(), 'terms': {}, 'rising': [], 'falling': []}
+    for term in terms or []:
+        term_id = store._term_ids.get(term.lower())
+        column = counts[:, term_id].toarray().ravel() if term_id is not None else np.zeros(len(years))
+        result['terms'][term] = np.round(column * scale, 2).tolist()
+
+    if len(years) < 2:
+        return result
+    totals = np.asarray(counts.sum(axis=0)).ravel()
+    candidates = np.flatnonzero(store.content_terms() & (totals >= MIN_TREND_COUNT))
+    rates = counts[:, candidates].toarray() * scale[:, None]  # years x candidate terms
+    x = years - years.mean()
+    slopes = (x @ (rates - rates.mean(axis=0))) / (x @ x)  # Per-year change in rate, every term at once
+    order = np.argsort(slopes)
+    for key, picked in (('rising', order[::-1][:top]), ('falling', order[:top])):
+        result[key] = [{'term': store.terms[candidates[i]], 'slope_per_year': round(float(slopes[i]), 3),
+                        'first_rate': round(float(rates[0, i]), 2), 'last_rate': round(float(rates[-1, i]), 2)}
+                       for i in picked]
+    return result
+
+
+def build_reports(store: TermStore, top: int = 25, terms: Optional[List[str]] = None) -> Dict:
+    return {
+        'conferences': conference_report(store),
+        'talks': talk_report(store),
+        'scriptures': scripture_report(store, top),
+        'speaker_terms': speaker_term_report(store, min(top, 10)),
+        'trends': term_trends(store, terms, top),
+    }
+
+
+def _write_csv(path: str, rows: List[Dict]):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if rows:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def export_csv(reports: Dict, directory: str):
+    """One CSV file per report"""
+    os.makedirs(directory, exist_ok=True)
+    _write_csv(os.path.join(directory, 'conferences.csv'), reports['conferences'])
+    _write_csv(os.path.join(directory, 'talks.csv'), reports['talks'])
+    _write_csv(os.path.join(directory, 'scriptures.csv'), reports['scriptures']['references'])
+    _write_csv(os.path.join(directory, 'scripture_books.csv'), reports['scriptures']['books'])
+    _write_csv(os.path.join(directory, 'speaker_terms.csv'), reports['speaker_terms'])
+    trends = reports['trends']
+    _write_csv(os.path.join(directory, 'trends.csv'),
+               [dict(direction=key, **row) for key in ('rising', 'falling') for row in trends[key]])
+    if trends['terms']:
+        _write_csv(os.path.join(directory, 'term_rates.csv'),
+                   [dict(year=year, **{term: rates[i] for term, rates in trends['terms'].items()})
+                    for i, year in enumerate(trends['years'])])
+
+
+def main():
+    """Main function for corpus analytics from JSON files or a saved store"""
+    parser = argparse.ArgumentParser(description="Statistics over scraped conference talks")
+    parser.add_argument('inputs', nargs='*', help="conference data JSON file(s)")
+    parser.add_argument('--store', help="term store file: written when inputs are given, else read")
+    parser.add_argument('--csv', metavar='DIR', help="write the reports as CSV files in DIR")
+    parser.add_argument('--json', metavar='FILE', help="write the reports as one JSON file")
+    parser.add_argument('--top', type=int, default=25, help="entries per ranking (default: 25)")
+    parser.add_argument('--terms', help="comma separated terms to chart by year")
+    args = parser.parse_args()
+
+    if np is None:
+        sys.exit("analytics.py needs NumPy and SciPy: pip install numpy scipy")
+    if args.inputs:
+        store = TermStore.build(args.inputs)
+        if args.store:
+            store.save(args.store)
+    elif args.store:
+        store = TermStore.load(args.store)
+    else:
+        parser.error("give conference JSON files, or --store with a saved store")
+
+    terms = [term.strip() for term in args.terms.split(',')] if args.terms else None
+    reports = build_reports(store, args.top, terms)
+
+    print(f"{len(store)} talks, {len(store.tokens):,} words, {len(store.terms):,} distinct terms, "
+          f"{len(store.citation_ref):,} scripture citations in {len(store.conferences)} conferences")
+    for row in reports['conferences']:
+        print(f"  {row['conference']:16s} {row['talks']:3d} talks, {row['mean_words']:5d} words "
+              f"({row['mean_reading_minutes']} min) per talk, {row['citations']:4d} citations")
+    cited = ', '.join(f"{row['reference']} ({row['citations']})" for row in reports['scriptures']['references'][:5])
+    if cited:
+        print(f"Most cited: {cited}")
+    for term, rates in reports['trends']['terms'].items():
+        print(f"  {term}: " + ', '.join(f"{year} {rate}" for year, rate in zip(reports['trends']['years'], rates)))
+
+    if args.csv:
+        export_csv(reports, args.csv)
+        print(f"CSV reports written to {args.csv}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+        print(f"JSON report written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
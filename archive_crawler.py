@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+General Conference Archive Crawler
+
+This script discovers every conference linked from the general conference
+landing page (following the archive's decade and collection pages), then
+scrapes each conference's talks into one JSON file per conference, the same
+format conference_scraper.py writes. Progress is checkpointed to a state file
+as it goes: discovered pages, finished conferences, and each scraped talk, so
+an interrupted crawl resumes where it stopped and re-running it later only
+scrapes conferences (or talks) it doesn't have yet.
+
+Usage:
+    python archive_crawler.py [--output-dir DIR] [--workers N] [--limit N] [--every HOURS]
+                              [--progress human|quiet|jsonl] [--cache DIR | --fixtures DIR | --record DIR]
+
+Example:
+    python archive_crawler.py --output-dir archive --workers 4
+"""
+
+import os
+import re
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Dict, List, Optional
+from conference_scraper import ConferenceScraper
+from content_utils import conference_name_from_url
+from progress import MODES, ProgressReporter
+from fetchers import add_fetcher_arguments, fetcher_from_args
+from snapshot_diff import HASHES_KEY, conference_tree
+
+
+LANDING_URL = "https://www.churchofjesuschrist.org/study/general-conference?lang=eng"
+
+# Links to a conference's own page, e.g. /study/general-conference/2025/04
+CONFERENCE_LINK_PATTERN = re.compile(r'href="(/study/general-conference/\d{4}/\d{2})(?:\?[^"]*)?"')
+
+# Links to pages that list more conferences (the archive and its decade pages)
+INDEX_LINK_PATTERN = re.compile(
+    r'href="(/study/general-conference/(?:conferences|\d{4}-\d{4}|\d{8})(?:/[^"?#]*)?)(?:\?[^"]*)?"')
+
+
+def _write_json_atomic(path: str, data):
+    """Write JSON via a temporary file, so an interrupted write never leaves a torn file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class CrawlState:
+    """Persistent crawl frontier and completion state (crawl_state.json)
+
+    frontier: index pages still to fetch; seen: every page URI queued so far;
+    conferences: conference URI -> {'name', 'status', 'talks', 'failed'} where
+    status is 'pending', 'incomplete' (some talks failed) or 'done'.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frontier = []
+        self.seen = set()
+        self.conferences = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.frontier = data.get('frontier', [])
+            self.seen = set(data.get('seen', []))
+            self.conferences = data.get('conferences', {})
+
+    def save(self):
+        _write_json_atomic(self.path, {
+            'frontier': self.frontier,
+            'seen': sorted(self.seen),
+            'conferences': self.conferences,
+            'saved_at': datetime.now().isoformat(),
+        })
+
+    def add_page(self, uri: str):
+        if uri not in self.seen:
+            self.seen.add(uri)
+            self.frontier.append(uri)
+
+    def add_conference(self, uri: str):
+        if uri not in self.conferences:
+            name = conference_name_from_url(uri) or uri.strip('/').replace('/', '_')
+            self.conferences[uri] = {'name': name, 'status': 'pending', 'talks': 0, 'failed': 0}
+
+    def pending_conferences(self) -> List[str]:
+        """Conferences not yet fully scraped, newest first"""
+        return sorted((uri for uri, info in self.conferences.items() if info['status'] != 'done'),
+                      reverse=True)
+
+
+class ArchiveCrawler:
+    """Discovers and scrapes every general conference, resumably"""
+
+    def __init__(self, output_dir: str = "archive", max_workers: int = 4, progress=None, fetcher=None):
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.progress = progress  # Optional progress.ProgressReporter
+        self.fetcher = fetcher  # Optional fetchers.Fetcher shared by every scraper
+        os.makedirs(output_dir, exist_ok=True)
+        self.state = CrawlState(os.path.join(output_dir, 'crawl_state.json'))
+
+    def _log(self, message: str, level: str = 'info'):
+        if self.progress:
+            self.progress.log(message.strip('\n'), level)
+        else:
+            print(message)
+
+    def _scraper(self, uri: str) -> ConferenceScraper:
+        return ConferenceScraper(uri, progress=self.progress, fetcher=self.fetcher)
+
+    def discover(self, landing_url: str = LANDING_URL) -> int:
+        """Walk the landing and archive pages, recording every conference found
+
+        Pages are re-read on every run (so new conferences show up), but within
+        a run each page is fetched once and the frontier is checkpointed after
+        each page. Returns the number of newly found conferences.
+        """
+        state = self.state
+        known = len(state.conferences)
+        if not state.frontier:
+            # A fresh round: start again from the landing page
+            state.seen = set()
+            state.add_page(landing_url)
+
+        while state.frontier:
+            uri = state.frontier[0]
+            try:
+                page = self._scraper(uri).fetch_conference_data()
+                body = page['content']['body']
+            except Exception as e:
+                self._log(f"  Error fetching {uri}: {e}", 'warning')
+                body = ''
+
+            for link in CONFERENCE_LINK_PATTERN.findall(body):
+                state.add_conference(link)
+            for link in INDEX_LINK_PATTERN.findall(body):
+                state.add_page(link)
+
+            state.frontier.pop(0)
+            state.save()
+
+        found = len(state.conferences) - known
+        self._log(f"\nDiscovered {len(state.conferences)} conferences ({found} new)")
+        return found
+
+    def _paths(self, info: Dict):
+        base = os.path.join(self.output_dir, info['name'])
+        return f"{base}.json", f"{base}.talks.jsonl"
+
+    def scrape_conference(self, uri: str):
+        """Scrape one conference, checkpointing each talk as it completes"""
+        info = self.state.conferences[uri]
+        output_path, checkpoint_path = self._paths(info)
+        self._log(f"\n{info['name']}  ({uri})")
+
+        scraper = self._scraper(uri)
+        conference_title, talk_links = scraper.fetch_talk_links()
+
+        # Talks scraped by an earlier, interrupted run
+        scraped = {}
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        talk = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by the interruption
+                    scraped[talk['url']] = talk
+            self._log(f"Resuming: {len(scraped)} talks already scraped")
+
+        remaining = [talk for talk in talk_links if talk['url'] not in scraped]
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+            for talk in scraper.iter_talks(remaining, max_workers=self.max_workers):
+                checkpoint.write(json.dumps(talk, ensure_ascii=False) + '\n')
+                checkpoint.flush()
+                scraped[talk['url']] = talk
+
+        talks = [scraped[talk['url']] for talk in talk_links if talk['url'] in scraped]
+        conference_data = {
+            'conference_title': conference_title,
+            'talks': talks,
+            'scraped_at': datetime.now().isoformat()
+        }
+        conference_data[HASHES_KEY] = conference_tree(conference_data)
+        _write_json_atomic(output_path, conference_data)
+
+        failed = len(talk_links) - len(talks)
+        info.update(talks=len(talks), failed=failed, status='done' if not failed else 'incomplete',
+                    scraped_at=datetime.now().isoformat())
+        self.state.save()
+        if not failed:
+            os.remove(checkpoint_path)
+        self._log(f"\nSaved {len(talks)} talks to {output_path}" +
+                  (f" ({failed} failed, will retry on the next run)" if failed else ""))
+
+    def run(self, limit: Optional[int] = None):
+        """Discover conferences, then scrape every one not yet done"""
+        self.discover()
+        pending = self.state.pending_conferences()
+        if limit is not None:
+            pending = pending[:limit]
+        self._log(f"{len(pending)} conferences to scrape")
+        if self.progress:
+            self.progress.start('conferences', total=len(pending), unit='conferences')
+
+        for uri in pending:
+            try:
+                self.scrape_conference(uri)
+            except Exception as e:
+                # Leave it pending; the crawl carries on with the next conference
+                self._log(f"\nError scraping {uri}: {e}", 'error')
+            if self.progress:
+                self.progress.advance('conferences', item=uri)
+        if self.progress:
+            self.progress.finish('conferences')
+
+
+def main():
+    """Main function for crawling the conference archive"""
+    parser = argparse.ArgumentParser(description="Discover and scrape every general conference")
+    parser.add_argument('--output-dir', default="archive", help="where conference JSON and crawl state go")
+    parser.add_argument('--workers', type=int, default=4, help="talks fetched concurrently (default: 4)")
+    parser.add_argument('--limit', type=int, help="scrape at most this many conferences per round")
+    parser.add_argument('--every', type=float, metavar='HOURS',
+                        help="keep running, starting a new round every HOURS hours")
+    parser.add_argument('--progress', choices=MODES, help="report progress as counters instead of log lines")
+    add_fetcher_arguments(parser)
+    args = parser.parse_args()
+
+    fetcher = fetcher_from_args(args)
+
+    progress = ProgressReporter(args.progress) if args.progress else None
+    crawler = ArchiveCrawler(args.output_dir, max_workers=args.workers, progress=progress, fetcher=fetcher)
+    while True:
+        crawler.run(limit=args.limit)
+        if progress:
+            progress.close()
+        if not args.every:
+            break
+        crawler._log(f"\nNext round in {args.every} hours ({datetime.now().isoformat()})")
+        time.sleep(args.every * 3600)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,988 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the General Conference tools
+
+This script runs small, self-contained benchmarks on synthetic conference data,
+so they need no network access.
+
+Usage:
+    python benchmark.py [benchmark_name ...]
+
+Benchmarks with a budget (startup) or a check (streaming) make the script
+exit with status 1 when they exceed or fail it, so the suite can run as a check.
+
+Example:
+    python benchmark.py memory index_parser
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+
+def make_synthetic_conference(num_talks: int = 40, paragraphs: int = 30,
+                              images: int = 2, footnotes: int = 20) -> Dict:
+    """Build conference data shaped like ConferenceScraper.scrape_all_talks output"""
+    talks = []
+    for t in range(num_talks):
+        session = t // 8 + 1
+        structured_content = []
+        for p in range(paragraphs):
+            if p and p % 10 == 0:
+                structured_content.append({'type': 'header', 'level': 2, 'content': f"Section {p // 10}"})
+            marker = f"{{{{FOOTNOTE:{p + 1}}}}}" if p < footnotes else ''
+            text = (f"Paragraph {p} of talk {t}. Brothers and sisters, faith in the Lord Jesus Christ "
+                    f"is the first principle of the gospel and a source of strength and peace.{marker}")
+            structured_content.append({'type': 'text', 'content': text})
+            if p < images:
+                structured_content.append({
+                    'type': 'image',
+                    'url': f"https://example.org/images/talk{t}_{p}.jpg",
+                    'alt': f"Image {p}",
+                    'title': '',
+                    'description': '',
+                    'width': '1200',
+                    'height': '800',
+                    'credit': 'Photo courtesy of the Church'
+                })
+        talks.append({
+            'url': f"/study/general-conference/2025/04/{session}{t % 8 + 1}speaker{t}",
+            'speaker': f"Speaker {t}",
+            'title': f"Talk Title {t}",
+            'type': 'general-conference-talk',
+            'content': '\n\n'.join(item['content'] for item in structured_content if item['type'] == 'text'),
+            'structured_content': structured_content,
+            'footnotes': [{'marker': f"{n + 1}.", 'id': f"note{n + 1}",
+                           'text': f"Doctrine and Covenants {n + 1}:{n + 2}."}
+                          for n in range(footnotes)],
+            'author_role': 'Of the Quorum of the Twelve Apostles',
+        })
+    return {
+        'conference_title': 'April 2025 general conference',
+        'talks': talks,
+        'scraped_at': '2025-04-07T12:00:00'
+    }
+
+
+def make_synthetic_index_page(num_talks: int = 40, talks_per_session: int = 8, close_items: bool = True) -> str:
+    """Build a conference index page body shaped like the site's (nested session lists)
+
+    close_items=False leaves out the optional </li> end tags of talk entries.
+    """
+    end_li = '</li>' if close_items else ''
+    parts = ['<header><h1>General Conference</h1></header>\n<nav><ul class="doc-map">\n']
+    for t in range(num_talks):
+        session = t // talks_per_session + 1
+        if t % talks_per_session == 0:
+            if t:
+                parts.append('</ul></li>\n')
+            parts.append(
+                f'<li data-content-type="general-conference-session" class="list-tile">'
+                f'<a href="/study/general-conference/2025/04/session-{session}?lang=eng">'
+                f'<div class="tile"><p class="title">Session {session} &amp; Choir</p></div></a>\n<ul class="doc-map">\n')
+        if t % talks_per_session == 3:
+            # Video-only entry without a talk page of its own
+            parts.append(
+                f'<li data-content-type="video"><a href="/media/video/{t}?lang=eng">'
+                f'<div class="tile"><p class="title">Video {t}</p></div></a></li>\n')
+        content_type = 'general-conference-business' if t % talks_per_session == 1 else 'general-conference-talk'
+        parts.append(
+            f'<li data-content-type="{content_type}" class="list-tile">'
+            f'<a href="/study/general-conference/2025/04/{session}{t % talks_per_session}speaker{t}?lang=eng">'
+            f'<div class="tile"><img src="/images/{t}.jpg" alt="" width="128" height="72">'
+            f'<div class="text"><p class="title">Talk Title {t}</p><p class="primaryMeta">Speaker {t}</p>'
+            f'<p class="description">A short summary of talk {t} that is shown under the title.</p>'
+            f'</div></div></a>{end_li}\n')
+    parts.append('</ul></li>\n</ul></nav>\n<footer>Footer</footer>')
+    return ''.join(parts)
+
+
+def _regex_parse_talk_links(html_body: str) -> List[Dict[str, str]]:
+    """The previous regex-based parse_talk_links, kept as the benchmark baseline"""
+    talks = []
+    talk_items = re.findall(
+        r'<li[^>]*data-content-type="(general-conference-talk|general-conference-business)"[^>]*>(.*?)</li>',
+        html_body,
+        re.DOTALL
+    )
+    for content_type, item_html in talk_items:
+        url_match = re.search(r'href="([^"]+)"', item_html)
+        if not url_match:
+            continue
+        url = url_match.group(1).split('?')[0]
+        if 'session' in url:
+            continue
+        speaker_match = re.search(r'<p class="primaryMeta">([^<]+)</p>', item_html)
+        speaker = speaker_match.group(1).strip() if speaker_match else 'Unknown'
+        title_match = re.search(r'<p class="title">([^<]+)</p>', item_html)
+        title = title_match.group(1).strip() if title_match else 'Untitled'
+        title_lower = title.lower()
+        if 'sustaining' in title_lower or 'audit' in title_lower:
+            continue
+        talks.append({'url': url, 'speaker': speaker, 'title': title, 'type': content_type})
+    return talks
+
+
+def _best_time(func, repeat: int = 5) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _measure_allocation(build):
+    """Return (result, bytes allocated) for building an object graph"""
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def bench_memory():
+    """Compare memory per talk for plain dicts versus the talk_model records"""
+    from talk_model import Conference
+
+    num_talks = 200
+    serialized = json.dumps(make_synthetic_conference(num_talks))
+
+    dict_data, dict_bytes = _measure_allocation(lambda: json.loads(serialized))
+    model, model_bytes = _measure_allocation(lambda: Conference.from_dict(json.loads(serialized)))
+
+    assert model.to_dict() == dict_data, "talk_model round trip is not lossless"
+
+    print(f"memory: {num_talks} talks")
+    print(f"  dicts:  {dict_bytes / num_talks / 1024:8.1f} KiB per talk")
+    print(f"  model:  {model_bytes / num_talks / 1024:8.1f} KiB per talk "
+          f"({100 * (1 - model_bytes / dict_bytes):.0f}% less)")
+
+
+def bench_index_parser():
+    """Compare the streaming conference index parser with the previous regex"""
+    from conference_scraper import ConferenceScraper
+
+    scraper = ConferenceScraper.__new__(ConferenceScraper)
+    print("index parser: talks per page, regex vs ConferenceIndexParser")
+    for num_talks in (40, 400, 4000):
+        page = make_synthetic_index_page(num_talks)
+        parsed = scraper.parse_talk_links(page)
+        assert len(parsed) == num_talks, f"parsed {len(parsed)} of {num_talks} talks"
+        assert [talk['url'] for talk in parsed] == [talk['url'] for talk in _regex_parse_talk_links(page)]
+        regex_time = _best_time(lambda: _regex_parse_talk_links(page))
+        parser_time = _best_time(lambda: scraper.parse_talk_links(page))
+        print(f"  {num_talks:5d} talks ({len(page) / 1024:7.0f} KiB): regex {regex_time * 1000:8.2f} ms, "
+              f"parser {parser_time * 1000:8.2f} ms")
+
+    # Without the optional </li> end tags the regex runs each entry on to the
+    # next </li> and merges entries, losing talks
+    print("  without </li> end tags (talks found):")
+    for num_talks in (40, 400):
+        page = make_synthetic_index_page(num_talks, close_items=False)
+        print(f"  {num_talks:5d} talks: regex {len(_regex_parse_talk_links(page)):5d}, "
+              f"parser {len(scraper.parse_talk_links(page)):5d}")
+
+
+def _make_test_images(count: int, width: int = 2400, height: int = 1600) -> Dict[str, bytes]:
+    """url -> JPEG (plus one PNG with transparency) photo-like test images"""
+    from PIL import Image as PILImage
+
+    images = {}
+    for i in range(count):
+        noise = PILImage.effect_noise((width, height), 40 + i)
+        gradient = PILImage.linear_gradient('L').resize((width, height))
+        image = PILImage.merge('RGB', (noise, gradient, gradient.transpose(PILImage.FLIP_LEFT_RIGHT)))
+        buffer = io.BytesIO()
+        if i == 0:
+            image.putalpha(gradient)
+            image.save(buffer, 'PNG')
+        else:
+            image.save(buffer, 'JPEG', quality=90)
+        images[f"https://example.org/images/photo{i}"] = buffer.getvalue()
+    return images
+
+
+def bench_epub():
+    """EPUB build time for a synthetic conference with cached images"""
+    import contextlib
+    from epub_generator import ConferenceEPUBGenerator
+
+    images = list(_make_test_images(8, width=600, height=400).values())  # Web-sized
+    conference = make_synthetic_conference(40, paragraphs=30, images=2, footnotes=20)
+    image_cache = {}
+    for talk in conference['talks']:
+        for block in talk['structured_content']:
+            if block['type'] == 'image':
+                image_cache[block['url']] = io.BytesIO(images[len(image_cache) % len(images)])
+    output = os.path.join(tempfile.gettempdir(), 'bench_epub.epub')
+
+    def build():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ConferenceEPUBGenerator(conference, image_cache=image_cache).generate_epub(output)
+
+    elapsed = _best_time(build, repeat=5)
+    print(f"epub: {len(conference['talks'])} talks, {len(image_cache)} cached images")
+    print(f"  build {elapsed * 1000:.0f} ms (best of 5), {os.path.getsize(output) / 1024:.0f} KiB")
+    os.remove(output)
+
+
+def bench_streaming() -> bool:
+    """Layout fed talk by talk, as the pipelined scrape does, with one talk failing to scrape"""
+    import contextlib
+    from pdf_generator import ConferencePDFGenerator
+
+    conference = make_synthetic_conference(24, paragraphs=20, images=0)
+    talks = conference['talks']
+    missing = 8  # The first talk of session 2, so its session page is missing too
+
+    def stream(skip=None):
+        for i, talk in enumerate(talks):
+            if i != skip:
+                yield talk
+
+    def build(skip=None):
+        generator = ConferencePDFGenerator(conference, fetcher=None)
+        output = io.BytesIO()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate_pdf(output, talks=stream(skip), toc_talks=talks)
+        return generator
+
+    elapsed = _best_time(build, repeat=3)
+    try:
+        generator = build(missing)
+    except ValueError as e:  # An unresolved TOC link fails the whole build
+        print(f"streaming: build with talk {missing + 1} missing failed: {e}")
+        return False
+    keys = (generator._talk_key(missing + 1), generator._session_key('2'))
+    ok = all(key in generator.bookmark_pages for key in keys)
+    print(f"streaming: {len(talks)} talks, {generator.page_count} pages")
+    print(f"  build {elapsed * 1000:.0f} ms (best of 3)")
+    print(f"  talk {missing + 1} missing from the stream: "
+          + ("its TOC links resolve" if ok else f"{', '.join(keys)} not defined"))
+    return ok
+
+
+def bench_images():
+    """Time the image pipeline against embedding the downloaded images as they are"""
+    import contextlib
+    from PIL import ImageFile
+    from reportlab.platypus import Image
+    from fetchers import Fetcher
+    from pdf_generator import ConferencePDFGenerator
+    from image_pipeline import declared_size, fit_size, prepare_image
+
+    images = _make_test_images(6)
+    urls = list(images)
+
+    class MemoryFetcher(Fetcher):
+        def fetch(self, url):
+            return images[url]
+
+    class LegacyGenerator(ConferencePDFGenerator):
+        """Opens each image with PIL for its size and hands ReportLab the original bytes"""
+
+        def _create_image_flowable(self, image_info, max_width=310, max_height=310):
+            from PIL import Image as PILImage
+            buffer = self._download_image(image_info['url'])
+            buffer.seek(0)
+            width, height = fit_size(*PILImage.open(buffer).size, max_width, max_height)
+            buffer.seek(0)
+            return Image(buffer, width=width, height=height)
+
+    # Count full decodes by wrapping PIL's loader
+    decodes = [0]
+    original_load = ImageFile.ImageFile.load
+
+    def counting_load(image):
+        if image.tile:  # Pixel data still to be decoded
+            decodes[0] += 1
+        return original_load(image)
+
+    conference = make_synthetic_conference(12, paragraphs=10, images=0, footnotes=0)
+    for t, talk in enumerate(conference['talks']):
+        url = urls[t % len(urls)]
+        talk['structured_content'].insert(1, {'type': 'image', 'url': url, 'alt': '', 'title': '',
+                                              'description': '', 'width': '2400', 'height': '1600',
+                                              'credit': ''})
+
+    print(f"images: {len(conference['talks'])} talks, {len(urls)} distinct 2400x1600 images")
+    ImageFile.ImageFile.load = counting_load
+    try:
+        for name, generator_class in (('original bytes', LegacyGenerator), ('pipeline', ConferencePDFGenerator)):
+            generator = generator_class(conference, fetcher=MemoryFetcher())
+            decodes[0] = 0
+            output = os.path.join(tempfile.gettempdir(), f"bench_images_{generator_class.__name__}.pdf")
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator.generate_pdf(output, include_toc=False, include_index=False)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:15s} build {elapsed * 1000:7.0f} ms, {decodes[0]:2d} decodes, "
+                  f"{os.path.getsize(output) / 1024:7.0f} KiB")
+            os.remove(output)
+
+        # Where the pipeline's time goes, per image
+        print("  pipeline stages per image:")
+        for url in urls:
+            data = images[url]
+            start = time.perf_counter()
+            size = declared_size({'width': '2400', 'height': '1600'})
+            width, height = fit_size(size[0], size[1], 310, 310)
+            sized = time.perf_counter()
+            prepared = prepare_image(data, width, height)
+            prepared_at = time.perf_counter()
+            print(f"    {url.rsplit('/', 1)[-1]:7s} size {1e6 * (sized - start):5.0f} us, "
+                  f"decode+resize+encode {1000 * (prepared_at - sized):6.1f} ms, "
+                  f"{len(data) / 1024:6.0f} -> {len(prepared.data) / 1024:4.0f} KiB")
+    finally:
+        ImageFile.ImageFile.load = original_load
+
+
+def bench_dedup():
+    """Images shared across a document: the same bytes under many URLs, and re-encoded or resized copies"""
+    import contextlib
+    from PIL import Image as PILImage
+    from fetchers import Fetcher
+    from pdf_generator import ConferencePDFGenerator
+    from image_pipeline import ImageDeduplicator
+
+    # Photo-like pictures: smooth shapes plus grain (pure noise has no structure a perceptual hash can see)
+    pictures = []
+    for i in range(4):
+        shapes = PILImage.effect_noise((24, 16), 80 + 20 * i).resize((1200, 800), PILImage.BICUBIC)
+        grain = PILImage.effect_noise((1200, 800), 20)
+        gradient = PILImage.linear_gradient('L').resize((1200, 800))
+        pictures.append(PILImage.merge('RGB', (shapes, PILImage.blend(shapes, grain, 0.2), gradient)))
+
+    images = {}
+    for i, image in enumerate(pictures):
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        images[f"https://example.org/photo{i}.jpg"] = buffer.getvalue()
+        # The same picture as another site would serve it: re-encoded, and at a different size
+        for variant, copy in (('reencoded', image), ('resized', image.resize((1080, 720), PILImage.LANCZOS))):
+            buffer = io.BytesIO()
+            copy.save(buffer, 'JPEG', quality=75)
+            images[f"https://example.org/photo{i}-{variant}.jpg"] = buffer.getvalue()
+
+    class MemoryFetcher(Fetcher):
+        def fetch(self, url):
+            return images[url.split('?')[0]]
+
+    class NoSharing(ImageDeduplicator):
+        def get_or_prepare(self, data, aspect, settings, prepare):
+            return prepare()
+
+    # Each talk shows one of the pictures under its own URL (as the content API does for reused images)
+    urls = list(images)
+    conference = make_synthetic_conference(24, paragraphs=10, images=0, footnotes=0)
+    for t, talk in enumerate(conference['talks']):
+        talk['structured_content'].insert(1, {'type': 'image', 'url': f"{urls[t % len(urls)]}?talk={t}",
+                                              'alt': '', 'title': '', 'description': '',
+                                              'width': '1200', 'height': '800', 'credit': ''})
+
+    print(f"dedup: {len(conference['talks'])} talks, {len(urls)} image files of {len(pictures)} pictures")
+    for name, dedup in (('no sharing', NoSharing()), ('content hash', ImageDeduplicator()),
+                        ('+ perceptual', ImageDeduplicator(perceptual=True))):
+        generator = ConferencePDFGenerator(conference, fetcher=MemoryFetcher(), image_dedup=dedup)
+        output = os.path.join(tempfile.gettempdir(), "bench_dedup.pdf")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate_pdf(output, include_toc=False, include_index=False)
+        elapsed = time.perf_counter() - start
+        report = generator.image_report
+        print(f"  {name:13s} build {elapsed * 1000:6.0f} ms, {report['placements']:2d} placed, "
+              f"{report['embedded']:2d} embedded ({report['embedded_bytes'] / 1024:5.0f} KiB), "
+              f"saved {report['saved_bytes'] / 1024:5.0f} KiB, PDF {os.path.getsize(output) / 1024:5.0f} KiB")
+        os.remove(output)
+
+
+def bench_snapshot_diff():
+    """Diffing two scrapes of a conference by hash tree, against diffing their JSON files"""
+    import copy
+    import difflib
+    from snapshot_diff import conference_tree, diff_snapshots
+
+    old = make_synthetic_conference(40)
+    new = copy.deepcopy(old)
+    new['talks'][3]['title'] = 'A Revised Title'
+    new['talks'][17]['structured_content'][4]['content'] += ' (edited)'
+    new['talks'][29]['footnotes'].append({'marker': '99.', 'id': 'note99', 'text': 'Alma 32:21.'})
+
+    build = _best_time(lambda: conference_tree(new), repeat=3)
+    old_tree, new_tree = conference_tree(old), conference_tree(new)
+    walk = _best_time(lambda: diff_snapshots(old, new, old_tree, new_tree))
+    same = _best_time(lambda: diff_snapshots(old, old, old_tree, old_tree))
+    fresh = _best_time(lambda: diff_snapshots(old, new), repeat=3)
+    old_lines = json.dumps(old, indent=2).splitlines()
+    new_lines = json.dumps(new, indent=2).splitlines()
+    text = _best_time(lambda: list(difflib.unified_diff(old_lines, new_lines, n=0)), repeat=1)
+
+    diff = diff_snapshots(old, new, old_tree, new_tree)
+    print(f"snapshot diff: {len(old['talks'])} talks, {len(diff.changed)} changed")
+    print(f"  hash tree of one snapshot        {build * 1000:8.1f} ms")
+    print(f"  diff by hash tree                {walk * 1000:8.2f} ms ({diff.talks_compared} talks walked)")
+    print(f"  unchanged conference             {same * 1000:8.3f} ms")
+    print(f"  both trees rebuilt, then diffed  {fresh * 1000:8.1f} ms")
+    print(f"  unified diff of the JSON files   {text * 1000:8.1f} ms ({len(new_lines)} lines)")
+
+
+def make_synthetic_archive(num_conferences: int = 80, talks_per_conference: int = 35,
+                           words_per_talk: int = 2500, vocabulary: int = 30000) -> List[Dict]:
+    """Conferences with Zipf-distributed words, drifting term use and scripture footnotes, twice a year"""
+    import random
+
+    rng = random.Random(7)
+    syllables = ['ba', 'ke', 'li', 'mo', 'nu', 'ra', 'se', 'to', 'vi', 'zo', 'an', 'el', 'or']
+    words = sorted({''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+                    for _ in range(vocabulary * 2)})[:vocabulary]
+    rng.shuffle(words)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    books = ['Alma', '1 Nephi', 'Mosiah', 'John', 'Matthew', 'Doctrine and Covenants', 'Moroni', 'Psalm']
+    speakers = [f"Speaker {i}" for i in range(120)]
+
+    conferences = []
+    for c in range(num_conferences):
+        year, month = 1985 + c // 2, ('April', 'October')[c % 2]
+        # A few terms rise over the years and a few fall
+        weights[10] *= 1.01
+        weights[11] /= 1.01
+        talks = []
+        for t in range(talks_per_conference):
+            text = ' '.join(rng.choices(words, weights, k=words_per_talk))
+            talks.append({
+                'url': f"/study/general-conference/{year}/{4 if month == 'April' else 10}/{t}talk",
+                'speaker': rng.choice(speakers),
+                'title': f"Talk {t}",
+                'structured_content': [{'type': 'text', 'content': text}],
+                'footnotes': [{'marker': f"{n + 1}.", 'id': f"note{n + 1}",
+                               'text': f"See {rng.choice(books)} {rng.randint(1, 30)}:{rng.randint(1, 20)}."}
+                              for n in range(rng.randint(5, 40))],
+            })
+        conferences.append({'conference_title': f"{month} {year} general conference", 'talks': talks})
+    return conferences
+
+
+def bench_analytics():
+    """Corpus statistics from the term store against the same statistics as Python loops over the JSON"""
+    from collections import Counter
+    from analytics import TermStore, build_reports, scripture_references, talk_text
+    from content_utils import STOP_WORDS, WORD_PATTERN
+
+    conferences = make_synthetic_archive()
+    num_talks = sum(len(conference['talks']) for conference in conferences)
+
+    start = time.perf_counter()
+    store = TermStore.build(conferences)
+    tokenize = time.perf_counter() - start
+    path = os.path.join(tempfile.gettempdir(), 'bench_analytics.npz')
+    store.save(path)
+    load = _best_time(lambda: TermStore.load(path), repeat=3)
+    reports = _best_time(lambda: build_reports(TermStore.load(path)), repeat=3)
+
+    def python_loops():
+        """Word counts, citations, speaker terms and yearly rates with dicts and Counters"""
+        by_speaker, by_year, year_words, citations = {}, {}, Counter(), Counter()
+        for conference in conferences:
+            year = conference['conference_title'].split()[1]
+            for talk in conference['talks']:
+                words = WORD_PATTERN.findall(talk_text(talk))
+                year_words[year] += len(words)
+                content = [word for word in words if len(word) > 2 and word not in STOP_WORDS]
+                by_speaker.setdefault(talk['speaker'], Counter()).update(content)
+                by_year.setdefault(year, Counter()).update(content)
+                for footnote in talk['footnotes']:
+                    citations.update(scripture_references(footnote['text']))
+        return ({speaker: counts.most_common(10) for speaker, counts in by_speaker.items()},
+                citations.most_common(25))
+
+    loops = _best_time(python_loops, repeat=1)
+    print(f"analytics: {len(conferences)} conferences, {num_talks} talks, {len(store.tokens):,} words, "
+          f"{len(store.terms):,} terms, store {os.path.getsize(path) / 2**20:.1f} MiB")
+    print(f"  tokenize into the store (once) {tokenize * 1000:8.0f} ms")
+    print(f"  load the saved store           {load * 1000:8.0f} ms")
+    print(f"  load + all reports             {reports * 1000:8.0f} ms")
+    print(f"  Python loops over the JSON     {loops * 1000:8.0f} ms (speaker terms and citations only)")
+    os.remove(path)
+
+
+def bench_related():
+    """Build the related talks table, then add one conference incrementally and in a full rebuild"""
+    from analytics import TermStore
+    from related_talks import RelatedTalks, update_related
+
+    conferences = make_synthetic_archive()
+    earlier, latest = conferences[:-1], conferences[-1]
+    quiet = lambda message: None
+
+    def build(archive):
+        table = RelatedTalks()
+        store = update_related(table, TermStore(), archive, log=quiet)
+        return table, store
+
+    start = time.perf_counter()
+    table, store = build(earlier)
+    full = time.perf_counter() - start
+
+    start = time.perf_counter()
+    update_related(table, store, [latest], log=quiet)
+    incremental = time.perf_counter() - start
+
+    rebuild = _best_time(lambda: build(conferences), repeat=1)
+    urls = list(table.talks)
+    lookup = _best_time(lambda: [table.get(url) for url in urls], repeat=3)
+    print(f"related: {len(conferences)} conferences, {len(table.talks)} talks, k={table.k}")
+    print(f"  build from {len(earlier)} conferences      {full * 1000:8.0f} ms")
+    print(f"  add one conference (incremental) {incremental * 1000:8.0f} ms")
+    print(f"  add one conference (rebuild)     {rebuild * 1000:8.0f} ms")
+    print(f"  look up every talk               {lookup * 1000:8.1f} ms ({lookup / len(urls) * 1e6:.1f} us per talk)")
+
+
+# Where bench_text_metrics looks for a TrueType font (BENCH_TTF=path picks one)
+FONT_DIRS = ('/usr/share/fonts', '/usr/local/share/fonts', '/Library/Fonts', '/System/Library/Fonts',
+             'C:\\Windows\\Fonts')
+
+
+def _truetype_font() -> str:
+    """A TrueType font file to benchmark with: $BENCH_TTF, DejaVu Serif, or any .ttf in FONT_DIRS ('' if none)"""
+    found = []
+    for directory in FONT_DIRS:
+        for root, _, files in os.walk(directory):
+            found.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith('.ttf'))
+    preferred = [path for path in found if os.path.basename(path) == 'DejaVuSerif.ttf']
+    return os.environ.get('BENCH_TTF') or (preferred + found + [''])[0]
+
+
+def bench_text_metrics():
+    """Paragraph layout with ReportLab's stringWidth against the cached text measurer, Type 1 and TrueType"""
+    import contextlib
+    from reportlab import rl_config
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from pdf_generator import ConferencePDFGenerator
+    from text_metrics import TextMeasurer
+
+    # A text-heavy conference: Zipf-distributed words in paragraphs of 80, eight talks per session
+    conference = make_synthetic_archive(num_conferences=1, talks_per_conference=32, words_per_talk=3000)[0]
+    for t, talk in enumerate(conference['talks']):
+        words = talk['structured_content'][0]['content'].split()
+        talk['structured_content'] = [{'type': 'text', 'content': ' '.join(words[i:i + 80])}
+                                      for i in range(0, len(words), 80)]
+        talk['session_number'] = str(t // 8 + 1)
+        talk['session'] = f"Session {t // 8 + 1}"
+    paragraphs = sum(len(talk['structured_content']) for talk in conference['talks'])
+
+    def build(generator, outputs, name):
+        output = os.path.join(tempfile.gettempdir(), f"bench_text_{name}.pdf")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate_pdf(output, include_toc=False, include_index=False)
+        with open(output, 'rb') as f:
+            outputs[name] = f.read()
+        os.remove(output)
+
+    class Recorder:
+        """Measures like ReportLab, keeping every call (the width lookups of one document)"""
+
+        def __init__(self):
+            self.calls = []
+
+        def string_width(self, *args):
+            self.calls.append(args)
+            return pdfmetrics.stringWidth(*args)
+
+    def replay(string_width, calls):
+        for args in calls:
+            string_width(*args)
+
+    def compare(label, generator, repeat=3):
+        measurer, outputs = generator.text_measurer, {}
+        recorder = generator.text_measurer = Recorder()
+        build(generator, outputs, 'recorded')
+        calls = recorder.calls
+        fresh = TextMeasurer()
+        widths = _best_time(lambda: replay(pdfmetrics.stringWidth, calls), repeat)
+        widths_cold = _best_time(lambda: (fresh.clear(), replay(fresh.string_width, calls)), repeat)
+        widths_warm = _best_time(lambda: replay(fresh.string_width, calls), repeat)
+
+        generator.text_measurer = None
+        uncached = _best_time(lambda: build(generator, outputs, 'reportlab'), repeat)
+        generator.text_measurer = measurer
+        # Cold: every document starts with an empty cache; warm: the widths of earlier documents are kept
+        cold = _best_time(lambda: (measurer.clear(), build(generator, outputs, 'cold')), repeat)
+        stats = measurer.stats()
+        warm = _best_time(lambda: build(generator, outputs, 'warm'), repeat)
+        same = outputs['recorded'] == outputs['reportlab'] == outputs['cold'] == outputs['warm']
+        print(f"  {label}: word widths alone, then whole documents")
+        print(f"    ReportLab stringWidth      {widths * 1000:6.0f} ms  {uncached * 1000:6.0f} ms")
+        print(f"    cached, cold               {widths_cold * 1000:6.0f} ms  {cold * 1000:6.0f} ms "
+              f"({widths / widths_cold:.1f}x, {uncached / cold:.2f}x)")
+        print(f"    cached, warm (batch runs)  {widths_warm * 1000:6.0f} ms  {warm * 1000:6.0f} ms "
+              f"({widths / widths_warm:.1f}x, {uncached / warm:.2f}x)")
+        print(f"    {stats['lookups']:,} lookups per document, {stats['hit_rate'] * 100:.1f}% hits cold; "
+              f"output {'identical' if same else 'DIFFERENT'}")
+
+    rl_config.invariant = 1  # Identical documents give identical bytes
+    print(f"text_metrics: {len(conference['talks'])} talks, {paragraphs} paragraphs, best of 3")
+    generator = ConferencePDFGenerator(conference, fetcher=None)
+    compare(f"fonts {', '.join(generator._fonts)}", generator)
+
+    font_path = _truetype_font()
+    if font_path:
+        pdfmetrics.registerFont(TTFont('BenchTrueType', font_path))
+        fonts, ConferencePDFGenerator._fonts = ConferencePDFGenerator._fonts, ('BenchTrueType',) * 3
+        try:
+            generator = ConferencePDFGenerator(conference, fetcher=None)
+        finally:
+            ConferencePDFGenerator._fonts = fonts
+        compare(f"TrueType {os.path.basename(font_path)}", generator)
+    else:
+        print("  TrueType: no .ttf font found (set BENCH_TTF to one)")
+    rl_config.invariant = 0
+
+
+def bench_linearize():
+    """Plain against linearized output: total size and bytes (and seconds on a slow link) to the first page"""
+    import contextlib
+    from fetchers import Fetcher
+    from pdf_generator import ConferencePDFGenerator
+    from pdf_linearize import first_page_bytes, linearize_backend, linearize_pdf
+
+    backend = linearize_backend()
+    if backend is None:
+        print("linearize: skipped (needs pikepdf or the qpdf tool)")
+        return
+
+    images = list(_make_test_images(8).values())
+
+    class MemoryFetcher(Fetcher):
+        def fetch(self, url):
+            return images[int(url.rsplit('_', 1)[-1].split('.')[0]) * 5 % len(images)]
+
+    conference = make_synthetic_conference(40, paragraphs=30, images=2, footnotes=20)
+    link_speed = 1e6 / 8  # Bytes per second on a 1 Mbit/s mobile connection
+
+    print(f"linearize: {len(conference['talks'])} talks with images, table of contents and index ({backend})")
+    outputs = {}
+    for name, linearize in (('plain', False), ('linearized', True)):
+        generator = ConferencePDFGenerator(conference, fetcher=MemoryFetcher(), linearize=linearize)
+        output = os.path.join(tempfile.gettempdir(), f"bench_linearize_{name}.pdf")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate_pdf(output)
+        elapsed = time.perf_counter() - start
+        with open(output, 'rb') as f:
+            outputs[name] = data = f.read()
+        first = first_page_bytes(data)
+        print(f"  {name:10s} build {elapsed * 1000:6.0f} ms, {len(data) / 1024:6.0f} KiB, first page after "
+              f"{first / 1024:6.0f} KiB ({first / link_speed:5.2f} s at 1 Mbit/s, whole file {len(data) / link_speed:5.2f} s)")
+        os.remove(output)
+
+    # The post-processing stage on its own
+    output = io.BytesIO(outputs['plain'])
+    post = _best_time(lambda: linearize_pdf(io.BytesIO(outputs['plain'])), repeat=3)
+    report = linearize_pdf(output)
+    print(f"  post-processing {post * 1000:.0f} ms; {100 * (1 - report['bytes_after'] / report['bytes_before']):.1f}% "
+          f"smaller, first page {report['first_page_before'] / report['first_page_after']:.0f}x sooner")
+
+
+def bench_watch():
+    """Watch mode: a full render against the edit-to-PDF time of one edited talk, and of five"""
+    import shutil
+    import contextlib
+    from fetchers import Fetcher
+    from watch_render import WatchSession, pikepdf
+
+    if pikepdf is None:
+        print("watch: skipped (needs pikepdf)")
+        return
+
+    images = list(_make_test_images(8).values())
+
+    class MemoryFetcher(Fetcher):
+        def fetch(self, url):
+            return images[int(url.rsplit('_', 1)[-1].split('.')[0]) * 5 % len(images)]
+
+    conference = make_synthetic_conference(40, paragraphs=30, images=2, footnotes=20)
+    tmp_dir = tempfile.mkdtemp()
+    input_path, output = os.path.join(tmp_dir, 'conference.json'), os.path.join(tmp_dir, 'conference.pdf')
+
+    def save(edit_talks):
+        for number in edit_talks:
+            block = conference['talks'][number]['structured_content'][4]
+            block['content'] = block['content'].replace('peace', 'joy', 1)
+        with open(input_path, 'w', encoding='utf-8') as f:
+            json.dump(conference, f)
+        os.utime(input_path, (time.time(), time.time() + len(edit_talks)))  # A new mtime, however fast
+
+    save([])
+    messages = []
+    session = WatchSession(input_path, output, fetcher=MemoryFetcher(), log=messages.append)
+    print(f"watch: {len(conference['talks'])} talks with images, table of contents and index")
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        session.full_render()
+        full = time.perf_counter() - start
+        timings = []
+        for edit_talks in ([7], [3, 12, 20, 28, 35]):
+            save(edit_talks)
+            start = time.perf_counter()
+            session.check()
+            timings.append((len(edit_talks), time.perf_counter() - start))
+    print(f"  full render       {full * 1000:6.0f} ms, {session.generator.page_count} pages")
+    for count, elapsed in timings:
+        print(f"  {count} talk{'s' if count > 1 else ' '} edited     {elapsed * 1000:6.0f} ms ({full / elapsed:.0f}x faster)")
+    print(f"  {messages[-1]}")
+    shutil.rmtree(tmp_dir)
+
+
+def _decode_stream(image) -> float:
+    """Seconds to decode a PreparedImage's stream to pixels, as a reader must on each page turn"""
+    import zlib
+    from PIL import Image as PILImage
+
+    start = time.perf_counter()
+    if image.filter == 'DCTDecode':
+        PILImage.open(io.BytesIO(image.data)).load()
+    else:
+        zlib.decompress(image.data)
+    return time.perf_counter() - start
+
+
+def bench_eink():
+    """Compare the colour and e-ink rendering profiles (size, build time, decode cost, warm image store)"""
+    import shutil
+    import contextlib
+    from fetchers import Fetcher
+    from pdf_generator import ConferencePDFGenerator
+    from image_pipeline import PreparedImageStore
+    from render_profile import color_profile, eink_profile
+
+    images = _make_test_images(6, 1200, 800)
+    urls = list(images)
+
+    class MemoryFetcher(Fetcher):
+        def fetch(self, url):
+            return images[url]
+
+    conference = make_synthetic_conference(12, paragraphs=10, images=0, footnotes=0)
+    for t, talk in enumerate(conference['talks']):
+        talk['structured_content'].insert(1, {'type': 'image', 'url': urls[t % len(urls)], 'alt': '', 'title': '',
+                                              'description': '', 'width': '1200', 'height': '800',
+                                              'credit': ''})
+
+    def build(profile, image_store=None):
+        generator = ConferencePDFGenerator(conference, fetcher=MemoryFetcher(), profile=profile,
+                                           image_store=image_store)
+        output = os.path.join(tempfile.gettempdir(), "bench_eink.pdf")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.generate_pdf(output, include_toc=False, include_index=False)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(output)
+        os.remove(output)
+        prepared = [entry[0] for entry in generator.prepared_images.values() if entry]
+        return elapsed, size, prepared
+
+    print(f"eink: {len(conference['talks'])} talks, {len(urls)} distinct 1200x800 images")
+    for name, profile in (('color', color_profile()), ('eink 8-bit', eink_profile(8)),
+                          ('eink 4-bit', eink_profile(4)), ('eink 2-bit', eink_profile(2)),
+                          ('eink 1-bit', eink_profile(1))):
+        elapsed, size, prepared = build(profile)
+        image_bytes = sum(len(image.data) for image in prepared)
+        decode = sum(_decode_stream(image) for image in prepared)
+        print(f"  {name:11s} build {elapsed * 1000:6.0f} ms, pdf {size / 1024:5.0f} KiB "
+              f"(images {image_bytes / 1024:4.0f} KiB), decode all images {decode * 1000:5.1f} ms")
+
+    store_dir = tempfile.mkdtemp(prefix='bench_eink_store_')
+    try:
+        cold, _, _ = build(eink_profile(), PreparedImageStore(store_dir))
+        warm, _, _ = build(eink_profile(), PreparedImageStore(store_dir))
+        print(f"  image store: first run {cold * 1000:.0f} ms, next run {warm * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(store_dir)
+
+
+def _synthetic_site(num_talks: int = 40, image_bytes: Dict[str, bytes] = None):
+    """A fetcher serving a synthetic conference's content API pages (and images) from memory"""
+    from urllib.parse import parse_qs, urlparse
+    from fetchers import Fetcher, FetchError
+
+    conference_uri = '/general-conference/2025/04'
+    index = {'meta': {'title': 'April 2025 general conference'},
+             'content': {'body': make_synthetic_index_page(num_talks)}}
+    image_urls = list(image_bytes or {})
+
+    def talk_page(t):
+        paragraphs = ''.join(
+            f'<p data-aid="{p}">Paragraph {p} of talk {t}. Brothers and sisters, faith in the Lord Jesus '
+            f'Christ is the first principle of the gospel.<sup class="marker" data-value="{p + 1}">{p + 1}</sup></p>'
+            for p in range(20))
+        image = ''
+        if image_urls:
+            image = (f'<figure><img src="{image_urls[t % len(image_urls)]}" alt="" data-width="1200" '
+                     f'data-height="800"><div class="credit">Photo</div></figure>')
+        notes = ''.join(f'<li data-marker="{n + 1}." id="note{n + 1}"><p>Doctrine and Covenants {n + 1}:1.</p></li>'
+                        for n in range(20))
+        body = (f'<header><p class="author-role">Of the Seventy</p></header><div class="body-block">{image}'
+                f'{paragraphs}</div><footer><p class="title">Notes</p><ol>{notes}</ol></footer>')
+        return {'meta': {'title': f'Talk Title {t}'}, 'content': {'body': body}}
+
+    class SyntheticSite(Fetcher):
+        def fetch(self, url):
+            if url in (image_bytes or {}):
+                return image_bytes[url]
+            uri = parse_qs(urlparse(url).query).get('uri', [''])[0]
+            if uri == conference_uri:
+                return json.dumps(index).encode('utf-8')
+            match = re.search(r'speaker(\d+)$', uri)
+            if not match:
+                raise FetchError(f"{url}: not in the synthetic site")
+            return json.dumps(talk_page(int(match.group(1)))).encode('utf-8')
+
+    return SyntheticSite()
+
+
+def bench_render_service():
+    """Request latency of the render service on localhost: cold, warm talks and cached PDFs"""
+    import threading
+    import urllib.request
+    from render_service import RenderServer, RenderService
+
+    service = RenderService(fetcher=_synthetic_site(40, _make_test_images(6, 1200, 800)))
+    server = RenderServer(service, '127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conference = '/study/general-conference/2025/04'
+
+    def get(query):
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{server.url}/pdf?conference={conference}{query}") as response:
+            body = response.read()
+            cache = response.headers.get('X-Render-Cache')
+        return (time.perf_counter() - start) * 1000, len(body), cache
+
+    try:
+        print(f"render service on {server.url}")
+        for name, query in (('session 1 (cold: scrape + images)', '&session=1'),
+                            ('session 1 again', '&session=1'),
+                            ('session 2 (warm talks)', '&session=2'),
+                            ('3 picked talks', '&talks=2,9,17'),
+                            ('session 2 e-ink', '&session=2&eink=4'),
+                            ('whole conference', ''),
+                            ('whole conference again', '')):
+            elapsed, size, cache = get(query)
+            print(f"  {name:34s} {elapsed:7.0f} ms  {size / 1024:5.0f} KiB  cache {cache}")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# Startup budget of generate_conference_pdf.py, in ms over a bare interpreter start.
+# Loading ReportLab and PIL alone takes well over these, so they catch any
+# import that drags the rendering stack back into a path that doesn't render.
+STARTUP_BUDGET_MS = {
+    'usage': 100,   # No arguments: print the usage and exit
+    'scrape': 150,  # Everything the scrape command imports
+}
+
+# Modules the usage and scrape paths must not import
+HEAVY_MODULES = ('reportlab', 'PIL', 'asyncio', 'urllib.request')
+
+
+def _startup_ms(args: List[str], runs: int = 7) -> float:
+    """Best wall time of running the interpreter with args, in ms"""
+    import subprocess
+
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_startup() -> bool:
+    """CLI startup time per command, checked against STARTUP_BUDGET_MS"""
+    import subprocess
+
+    scrape_imports = "import generate_conference_pdf, conference_scraper"
+    cases = (
+        ('usage', ['generate_conference_pdf.py']),
+        ('scrape', ['-c', scrape_imports]),
+        ('render', ['-c', scrape_imports + ", pdf_generator"]),
+    )
+    interpreter = _startup_ms(['-c', 'pass'])
+    print(f"startup: bare interpreter {interpreter:.0f} ms")
+
+    ok = True
+    for name, args in cases:
+        elapsed = _startup_ms(args) - interpreter
+        budget = STARTUP_BUDGET_MS.get(name)
+        verdict = ''
+        if budget is not None:
+            verdict = f"(budget {budget} ms) " + ("ok" if elapsed <= budget else "OVER BUDGET")
+            ok = ok and elapsed <= budget
+        print(f"  {name:7s} +{elapsed:5.0f} ms {verdict}")
+
+    check = (f"import sys; {scrape_imports}; "
+             f"print(' '.join(m for m in sys.modules if m.startswith({HEAVY_MODULES!r})))")
+    loaded = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+    if loaded:
+        print(f"  scrape path imports heavy modules: {' '.join(sorted(loaded))}")
+        ok = False
+    return ok
+
+
+BENCHMARKS = {
+    'memory': bench_memory,
+    'index_parser': bench_index_parser,
+    'streaming': bench_streaming,
+    'images': bench_images,
+    'epub': bench_epub,
+    'eink': bench_eink,
+    'dedup': bench_dedup,
+    'render_service': bench_render_service,
+    'snapshot_diff': bench_snapshot_diff,
+    'analytics': bench_analytics,
+    'related': bench_related,
+    'text_metrics': bench_text_metrics,
+    'linearize': bench_linearize,
+    'watch': bench_watch,
+    'startup': bench_startup,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"Available: {', '.join(BENCHMARKS)}")
+        sys.exit(1)
+
+    # Benchmarks with a budget or a check return False when it is exceeded or fails
+    failed = []
+    for name in names:
+        start = time.perf_counter()
+        if BENCHMARKS[name]() is False:
+            failed.append(name)
+        print(f"  ({time.perf_counter() - start:.2f}s)\n")
+    if failed:
+        print(f"Over budget or failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
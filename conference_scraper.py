@@ -6,7 +6,8 @@ This script scrapes talks from Church of Jesus Christ General Conference pages
 and generates formatted PDF documents.
 
 Usage:
-    python conference_scraper.py <conference_url>
+    python conference_scraper.py [--progress human|quiet|jsonl] [--cache DIR | --fixtures DIR | --record DIR]
+                                 [--profile[=DIR] [--profile-cpu-only]] <conference_url>
     
 Example:
     python conference_scraper.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng
@@ -15,11 +16,16 @@ Example:
 import sys
 import re
 import json
-import urllib.request
 from html.parser import HTMLParser
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional, Union
+from collections import deque
 from datetime import datetime
 from html import unescape
+from talk_model import Conference, Talk
+from snapshot_diff import HASHES_KEY, conference_tree
+from progress import progress_from_argv
+from profiling import profiled, profiler_from_argv, stage
+from fetchers import DEFAULT_HEADERS, HTTPFetcher, fetcher_from_argv
 
 
 def strip_html_tags(html_text: str) -> str:
@@ -195,18 +201,187 @@ class HTMLContentExtractor(HTMLParser):
         return self.content_parts, self.footnotes
 
 
+class ConferenceIndexParser:
+    """Extract talk entries and their sessions from a conference index page
+
+    Works in a single streaming pass: one compiled pattern scans for the few
+    tags that matter (li, ul, ol, a, p and comments), and <li> entries are
+    tracked on a stack, so nested session lists, unclosed <li> tags and
+    entries without speakers are handled in linear time without
+    backtracking. Each entry is emitted in document order as soon as its own
+    link and text are complete (when a nested entry starts or it closes), so
+    talks always see the session they are listed under. The page may be fed
+    in chunks.
+    """
+
+    TALK_TYPES = ('general-conference-talk', 'general-conference-business')
+    TAG_PATTERN = re.compile(r'<!--.*?-->|<(/?)(li|ul|ol|a|p)\b([^>]*)>', re.IGNORECASE | re.DOTALL)
+    ATTR_PATTERNS = {
+        name: re.compile(r'(?:^|\s)' + name + r'\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))', re.IGNORECASE)
+        for name in ('data-content-type', 'href', 'class')
+    }
+
+    def __init__(self):
+        self.talks = []
+        self.session_title = None
+        self.session_number = 0
+        self.list_depth = 0  # Depth of nested <ul>/<ol> lists
+        self.items = []  # Stack of open <li> entries
+        self.capture = None  # Field of the innermost entry receiving text ('title' or 'speaker')
+        self.pending = ''  # Unscanned tail of the previous chunk (a tag cut in half)
+
+    def feed(self, data: str):
+        """Scan a chunk of the page"""
+        data = self.pending + data
+        # Hold back a trailing, unfinished tag until the next chunk
+        cut = data.rfind('<')
+        if cut == -1 or data.find('>', cut) != -1:
+            cut = len(data)
+        self.pending = data[cut:]
+        self._scan(data[:cut])
+
+    def close(self):
+        """Finish the page, closing any entries left open"""
+        if self.pending:
+            self._scan(self.pending)
+            self.pending = ''
+        while self.items:
+            self._close_item()
+
+    def _scan(self, data: str):
+        last = 0
+        for match in self.TAG_PATTERN.finditer(data):
+            if self.capture:
+                self.handle_data(data[last:match.start()])
+            last = match.end()
+            closing, tag, attr_text = match.groups()
+            if not tag:
+                continue  # Comment
+            tag = tag.lower()
+            if closing:
+                self.handle_endtag(tag)
+            else:
+                self.handle_starttag(tag, attr_text)
+        if self.capture:
+            self.handle_data(data[last:])
+
+    def _attr(self, attr_text: str, name: str) -> Optional[str]:
+        """Value of one attribute from a tag's attribute text (entities decoded)"""
+        match = self.ATTR_PATTERNS[name].search(attr_text)
+        if not match:
+            return None
+        value = next(v for v in match.groups() if v is not None)
+        return unescape(value) if '&' in value else value
+
+    def handle_starttag(self, tag, attr_text):
+        if tag in ('ul', 'ol'):
+            self.list_depth += 1
+        elif tag == 'li':
+            # An unclosed sibling <li> ends where the next one starts
+            if self.items and self.items[-1]['depth'] == self.list_depth:
+                self._close_item()
+            if self.items:
+                self._emit(self.items[-1])
+            self.items.append({
+                'depth': self.list_depth,
+                'type': self._attr(attr_text, 'data-content-type'),
+                'url': None,
+                'title': [],
+                'speaker': [],
+                'emitted': False,
+            })
+        elif self.items and not self.items[-1]['emitted']:
+            item = self.items[-1]
+            if tag == 'a' and item['url'] is None:
+                item['url'] = (self._attr(attr_text, 'href') or '').split('?')[0]
+            elif tag == 'p':
+                classes = (self._attr(attr_text, 'class') or '').split()
+                if 'title' in classes:
+                    self.capture = 'title'
+                elif 'primaryMeta' in classes:
+                    self.capture = 'speaker'
+
+    def handle_endtag(self, tag):
+        if tag == 'p':
+            self.capture = None
+        elif tag == 'li':
+            if self.items:
+                self._close_item()
+        elif tag in ('ul', 'ol'):
+            while self.items and self.items[-1]['depth'] >= self.list_depth:
+                self._close_item()
+            self.list_depth = max(self.list_depth - 1, 0)
+
+    def handle_data(self, data):
+        if self.capture and self.items:
+            self.items[-1][self.capture].append(data)
+
+    def _close_item(self):
+        self.capture = None
+        self._emit(self.items.pop())
+
+    def _emit(self, item):
+        """Record a finished entry as a session or a talk (once)"""
+        if item['emitted'] or not item['type']:
+            return
+        item['emitted'] = True
+        self.capture = None
+        content_type = item['type']
+        url = item['url'] or ''
+        title = strip_html_tags(''.join(item['title']))
+
+        # Session overviews start a new session grouping
+        if 'session' in content_type or 'session' in url:
+            self.session_number += 1
+            self.session_title = title or f"Session {self.session_number}"
+            return
+
+        # Video-only entries and anything else without a talk page are skipped
+        if content_type not in self.TALK_TYPES or not url:
+            return
+
+        # Skip sustaining and audit reports
+        title = title or 'Untitled'
+        title_lower = title.lower()
+        if 'sustaining' in title_lower or 'audit' in title_lower:
+            return
+
+        talk_info = {
+            'url': url,
+            'speaker': strip_html_tags(''.join(item['speaker'])) or 'Unknown',
+            'title': title,
+            'type': content_type
+        }
+        if self.session_title:
+            talk_info['session'] = self.session_title
+            talk_info['session_number'] = str(self.session_number)
+        self.talks.append(talk_info)
+
+
 class ConferenceScraper:
     """Scrapes General Conference talks from churchofjesuschrist.org"""
     
     BASE_URL = "https://www.churchofjesuschrist.org"
     API_BASE = "https://www.churchofjesuschrist.org/study/api/v3/language-pages/type/content"
     
-    def __init__(self, conference_url: str):
+    def __init__(self, conference_url: str, progress=None, fetcher=None):
         self.conference_url = conference_url
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-        }
-        
+        self.headers = dict(DEFAULT_HEADERS)
+        self.progress = progress  # Optional progress.ProgressReporter
+        # All network access goes through the fetcher (see fetchers.py)
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher(self.headers)
+
+    def _log(self, message: str, level: Optional[str] = None):
+        """Print a message, or hand it to the progress reporter if there is one
+
+        Messages without a level are per-item details, which the reporter's
+        counters replace.
+        """
+        if not self.progress:
+            print(message)
+        elif level:
+            self.progress.log(message.strip(), level)
+
     def extract_uri_from_url(self, url: str) -> str:
         """Extract the URI path from a full URL"""
         # Remove base URL and query parameters
@@ -218,85 +393,47 @@ class ConferenceScraper:
             uri = uri[6:]  # Remove '/study'
 
         return uri
-        
+
+    def api_url(self, url: str) -> str:
+        """Content API URL for a page URL or URI"""
+        return f"{self.API_BASE}?lang=eng&uri={self.extract_uri_from_url(url)}"
+
     def fetch_conference_data(self) -> Dict:
         """Fetch the main conference page data"""
-        uri = self.extract_uri_from_url(self.conference_url)
-        api_url = f"{self.API_BASE}?lang=eng&uri={uri}"
-        
-        print(f"Fetching conference data from: {api_url}")
-        req = urllib.request.Request(api_url, headers=self.headers)
-        
-        with urllib.request.urlopen(req) as response:
-            data = json.loads(response.read().decode('utf-8'))
-            return data
-            
+        api_url = self.api_url(self.conference_url)
+
+        self._log(f"Fetching conference data from: {api_url}", 'info')
+        return json.loads(self.fetcher.fetch(api_url).decode('utf-8'))
+
+
     def parse_talk_links(self, html_body: str) -> List[Dict[str, str]]:
-        """Parse talk links, speakers, and titles from the conference page HTML"""
-        talks = []
-
-        # Extract all talk entries - look for <li> tags with data-content-type
-        # First, find all talk/business items
-        talk_items = re.findall(
-            r'<li[^>]*data-content-type="(general-conference-talk|general-conference-business)"[^>]*>(.*?)</li>',
-            html_body,
-            re.DOTALL
-        )
-
-        for content_type, item_html in talk_items:
-            # Extract URL
-            url_match = re.search(r'href="([^"]+)"', item_html)
-            if not url_match:
-                continue
-            url = url_match.group(1).split('?')[0]
-
-            # Skip session overviews
-            if 'session' in url:
-                continue
-
-            # Extract speaker (primaryMeta)
-            speaker_match = re.search(r'<p class="primaryMeta">([^<]+)</p>', item_html)
-            speaker = speaker_match.group(1).strip() if speaker_match else 'Unknown'
-
-            # Extract title
-            title_match = re.search(r'<p class="title">([^<]+)</p>', item_html)
-            title = title_match.group(1).strip() if title_match else 'Untitled'
-
-            # Skip sustaining and audit reports
-            title_lower = title.lower()
-            if 'sustaining' in title_lower or 'audit' in title_lower:
-                continue
-
-            talk_info = {
-                'url': url,
-                'speaker': speaker,
-                'title': title,
-                'type': content_type
-            }
-            talks.append(talk_info)
+        """Parse talk links, speakers, titles and sessions from the conference page HTML
+
+        Each talk is tagged with the session it is listed under ('session' is
+        the session title, 'session_number' its position on the page). Talks
+        on pages without session entries get no session keys and the
+        generators fall back to the URL.
+        """
+        parser = ConferenceIndexParser()
+        parser.feed(html_body)
+        parser.close()
+        return parser.talks
 
-        return talks
-        
     def fetch_talk_content(self, talk_url: str) -> Optional[Dict]:
         """Fetch the full content of a single talk"""
-        # Remove /study prefix if present
-        uri = talk_url
-        if uri.startswith('/study'):
-            uri = uri[6:]
+        self._log(f"  Fetching: {self.extract_uri_from_url(talk_url)}")
 
-        api_url = f"{self.API_BASE}?lang=eng&uri={uri}"
-
-        print(f"  Fetching: {uri}")
-        req = urllib.request.Request(api_url, headers=self.headers)
-        
         try:
-            with urllib.request.urlopen(req) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                return data
+            raw = self.fetcher.fetch(self.api_url(talk_url))
+            if self.progress:
+                self.progress.advance('scrape', n=0, nbytes=len(raw))
+            return json.loads(raw.decode('utf-8'))
         except Exception as e:
-            print(f"  Error fetching {talk_url}: {e}")
+            self._log(f"  Error fetching {talk_url}: {e}", 'warning')
             return None
-            
+
+
+    @profiled('extract_content_from_html')
     def extract_content_from_html(self, html: str) -> Dict:
         """Extract text and images from HTML content"""
         # Extract author role/title if present
@@ -391,60 +528,163 @@ class ConferenceScraper:
             'author_role': author_role
         }
         
-    def scrape_all_talks(self) -> List[Dict]:
-        """Scrape all talks from the conference"""
+    def fetch_talk_links(self):
+        """Fetch the conference page and return (conference_title, talk_links)"""
         # Get conference page
         conference_data = self.fetch_conference_data()
-        
+
         # Extract conference title and metadata
         conference_title = conference_data['meta'].get('title', 'General Conference')
-        print(f"\nConference: {conference_title}")
-        print("="*80)
-        
+        self._log(f"\nConference: {conference_title}", 'info')
+        self._log("="*80)
+
         # Parse talk links
         html_body = conference_data['content']['body']
         talk_links = self.parse_talk_links(html_body)
-        
-        print(f"\nFound {len(talk_links)} talks to scrape")
-        print("="*80)
-        
-        # Fetch each talk's content
-        talks = []
-        for i, talk_info in enumerate(talk_links, 1):
-            print(f"\n[{i}/{len(talk_links)}] {talk_info['speaker']}: {talk_info['title']}")
-
-            talk_data = self.fetch_talk_content(talk_info['url'])
-            if talk_data:
-                # Extract text content and images
-                body_html = talk_data['content']['body']
-                content_data = self.extract_content_from_html(body_html)
-
-                talk_info['content'] = content_data['text']
-                talk_info['structured_content'] = content_data['structured_content']
-                talk_info['footnotes'] = content_data.get('footnotes', [])
-                talk_info['author_role'] = content_data.get('author_role')
-                talk_info['full_data'] = talk_data
-
-                # Count images and footnotes
-                image_count = sum(1 for item in content_data['structured_content'] if item['type'] == 'image')
-                footnote_count = len(content_data.get('footnotes', []))
-                if image_count > 0:
-                    print(f"  Found {image_count} image(s)")
-                if footnote_count > 0:
-                    print(f"  Found {footnote_count} footnote(s)")
-
-                talks.append(talk_info)
-                
-        return {
+
+        self._log(f"\nFound {len(talk_links)} talks to scrape", 'info')
+        self._log("="*80)
+
+        return conference_title, talk_links
+
+    def scrape_talk(self, talk_info: Dict) -> Optional[Dict]:
+        """Fetch and extract a single talk, filling in its content fields"""
+        talk_data = self.fetch_talk_content(talk_info['url'])
+        if not talk_data:
+            return None
+        return self.parse_talk(talk_info, talk_data)
+
+    def parse_talk(self, talk_info: Dict, talk_data: Dict) -> Dict:
+        """Fill in a talk's content fields from its content API response (no I/O)"""
+        # Extract text content and images
+        body_html = talk_data['content']['body']
+        content_data = self.extract_content_from_html(body_html)
+
+        talk_info['content'] = content_data['text']
+        talk_info['structured_content'] = content_data['structured_content']
+        talk_info['footnotes'] = content_data.get('footnotes', [])
+        talk_info['author_role'] = content_data.get('author_role')
+        talk_info['full_data'] = talk_data
+
+        # Count images and footnotes
+        image_count = sum(1 for item in content_data['structured_content'] if item['type'] == 'image')
+        footnote_count = len(content_data.get('footnotes', []))
+        if image_count > 0:
+            self._log(f"  Found {image_count} image(s)")
+        if footnote_count > 0:
+            self._log(f"  Found {footnote_count} footnote(s)")
+
+        return talk_info
+
+    def iter_talks(self, talk_links: List[Dict], max_workers: int = 4,
+                   prepare: Optional[Callable[[Dict], None]] = None) -> Iterator[Dict]:
+        """Scrape talks concurrently, yielding each one in conference order
+
+        Up to max_workers talks are fetched and extracted in worker threads,
+        with a bounded read-ahead window. If given, prepare(talk) also runs in
+        the worker (e.g. to prefetch the talk's images) before it is yielded.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        def work(i, talk_info):
+            self._log(f"\n[{i}/{len(talk_links)}] {talk_info['speaker']}: {talk_info['title']}")
+            with stage('scrape_talk'):
+                talk = self.scrape_talk(talk_info)
+                if talk and prepare:
+                    prepare(talk)
+            if self.progress:
+                self.progress.advance('scrape', item=f"{talk_info['speaker']}: {talk_info['title']}")
+            return talk
+
+        if self.progress:
+            self.progress.start('scrape', total=len(talk_links), unit='talks')
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending = deque()
+            links = enumerate(talk_links, 1)
+            window = max_workers * 2
+
+            for i, talk_info in links:
+                pending.append(pool.submit(work, i, talk_info))
+                if len(pending) >= window:
+                    break
+
+            while pending:
+                talk = pending.popleft().result()
+                next_link = next(links, None)
+                if next_link:
+                    pending.append(pool.submit(work, *next_link))
+                if talk:
+                    yield talk
+
+        if self.progress:
+            self.progress.finish('scrape')
+
+    async def scrape_talks_async(self, talk_links: List[Dict], fetcher) -> List[Dict]:
+        """Scrape talks from asyncio code with a fetchers.AsyncFetcher, in conference order
+
+        Failed talks are left out, as in iter_talks.
+        """
+        import asyncio
+
+        async def scrape(talk_info):
+            try:
+                talk_data = await fetcher.fetch_json(self.api_url(talk_info['url']))
+            except Exception as e:
+                self._log(f"  Error fetching {talk_info['url']}: {e}", 'warning')
+                return None
+            return self.parse_talk(talk_info, talk_data)
+
+        talks = await asyncio.gather(*(scrape(talk_info) for talk_info in talk_links))
+        return [talk for talk in talks if talk]
+
+    def scrape_all_talks(self, as_model: bool = False) -> Union[Dict, Conference]:
+        """Scrape all talks from the conference
+
+        Returns the conference as a dict, or as a compact talk_model.Conference
+        when as_model is True (each talk is converted as soon as it is scraped),
+        with its content hash tree under snapshot_diff.HASHES_KEY.
+        """
+        with stage('scrape', snapshot=True):
+            conference_title, talk_links = self.fetch_talk_links()
+
+            # Fetch each talk's content
+            talks = []
+            if self.progress:
+                self.progress.start('scrape', total=len(talk_links), unit='talks')
+            for i, talk_info in enumerate(talk_links, 1):
+                self._log(f"\n[{i}/{len(talk_links)}] {talk_info['speaker']}: {talk_info['title']}")
+                item = f"{talk_info['speaker']}: {talk_info['title']}"
+
+                with stage('scrape_talk'):
+                    talk_info = self.scrape_talk(talk_info)
+                if talk_info:
+                    talks.append(Talk.from_dict(talk_info) if as_model else talk_info)
+                if self.progress:
+                    self.progress.advance('scrape', item=item)
+            if self.progress:
+                self.progress.finish('scrape')
+
+        # The hash tree lets later scrapes be diffed (snapshot_diff.py) without reading every talk
+        if as_model:
+            conference = Conference(conference_title, talks, datetime.now().isoformat())
+            conference.extra[HASHES_KEY] = conference_tree(conference)
+            return conference
+
+        conference_data = {
             'conference_title': conference_title,
             'talks': talks,
             'scraped_at': datetime.now().isoformat()
         }
-
+        conference_data[HASHES_KEY] = conference_tree(conference_data)
+        return conference_data
 
 def main():
+    progress = progress_from_argv(sys.argv)
+    fetcher = fetcher_from_argv(sys.argv)
+    profiler = profiler_from_argv(sys.argv, 'scrape', progress)
     if len(sys.argv) < 2:
-        print("Usage: python conference_scraper.py <conference_url>")
+        print("Usage: python conference_scraper.py [--progress human|quiet|jsonl] "
+              "[--cache DIR | --fixtures DIR | --record DIR] [--profile[=DIR] [--profile-cpu-only]] <conference_url>")
         print("\nExample:")
         print("  python conference_scraper.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng")
         sys.exit(1)
@@ -452,8 +692,16 @@ def main():
     conference_url = sys.argv[1]
     
     # Scrape the conference
-    scraper = ConferenceScraper(conference_url)
-    conference_data = scraper.scrape_all_talks()
+    scraper = ConferenceScraper(conference_url, progress=progress, fetcher=fetcher)
+    if profiler:
+        profiler.start()
+    try:
+        conference_data = scraper.scrape_all_talks()
+    finally:
+        if profiler:
+            profiler.stop()
+    if progress:
+        progress.close()
     
     # Save to JSON file
     output_filename = f"conference_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
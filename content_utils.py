@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Shared Content Helpers for General Conference Output Formats
+
+This module holds the talk-content logic shared by the PDF generator and the
+other exporters: conference dates, session grouping, paragraph splitting and
+duplicate-paragraph filtering. It has no third-party dependencies.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# Footnote marker inserted by HTMLContentExtractor, e.g. {{FOOTNOTE:3}}
+FOOTNOTE_PATTERN = re.compile(r'\{\{FOOTNOTE:(\d+)\}\}')
+
+# Words too common to be worth indexing
+STOP_WORDS = frozenset("""a an and are as at be but by for from has have he her his i in is it its
+of on or our she that the their them they this to was we were will with you your""".split())
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+MONTH_NAMES = ['', 'January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def extract_conference_date(conference_data: Dict) -> str:
+    """Extract conference date from conference title (e.g., 'April 2025')"""
+    conference_title = conference_data.get('conference_title', '')
+
+    # Try to extract month and year from title
+    # Expected format: "April 2025 General Conference" or similar
+    match = re.search(r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})', conference_title)
+    if match:
+        return f"{match.group(1)} {match.group(2)}"
+
+    # Fallback: try to get from first talk URL if available
+    talks = conference_data.get('talks', [])
+    if talks and 'url' in talks[0]:
+        url = talks[0]['url']
+        # URL format: .../general-conference/2025/04/...
+        match = re.search(r'/general-conference/(\d{4})/(\d{2})/', url)
+        if match:
+            year = match.group(1)
+            month_num = int(match.group(2))
+            if 1 <= month_num <= 12:
+                return f"{MONTH_NAMES[month_num]} {year}"
+
+    return ""
+
+
+# Conference page URLs, e.g. /study/general-conference/2025/04
+CONFERENCE_URL_PATTERN = re.compile(r'/general-conference/(\d{4})/(\d{2})(?=[/?#"]|$)')
+
+
+def conference_name_from_url(url: str) -> Optional[str]:
+    """'.../general-conference/2025/04' -> '2025_April' (None if not a conference URL)"""
+    match = CONFERENCE_URL_PATTERN.search(url)
+    if not match:
+        return None
+    year, month_num = match.group(1), int(match.group(2))
+    month_name = MONTH_NAMES[month_num] if 1 <= month_num <= 12 else match.group(2)
+    return f"{year}_{month_name}"
+
+
+def extract_session_number(talk_url: str) -> str:
+    """Extract session number from talk URL"""
+    # URLs are like /study/general-conference/2025/04/13holland
+    # The first digit of the number indicates the session (1=Sat AM, 2=Sat PM, etc.)
+    match = re.search(r'/(\d+)[a-z]', talk_url)
+    if match:
+        full_number = match.group(1)
+        return full_number[0]  # Return first digit as session number
+    return '0'
+
+
+def get_session_name(session_number: str) -> str:
+    """Map session number to session name"""
+    session_names = {
+        '1': 'Saturday Morning Session',
+        '2': 'Saturday Afternoon Session',
+        '3': 'Sunday Evening Session',
+        '4': 'Sunday Morning Session',
+        '5': 'Sunday Afternoon Session'
+    }
+    return session_names.get(session_number, f'Session {session_number}')
+
+
+def talk_session(talk: Dict) -> Tuple[str, str]:
+    """Return (session_id, session_name) for a talk; session_id is '0' if unknown
+
+    Uses the session the scraper read from the conference page when present,
+    falling back to guessing from the talk URL for data scraped before that.
+    """
+    session_name = talk.get('session')
+    if session_name:
+        session_id = talk.get('session_number') or re.sub(r'[^a-z0-9]+', '-', session_name.lower()).strip('-')
+        return str(session_id), session_name
+    session_number = extract_session_number(talk.get('url', ''))
+    return session_number, get_session_name(session_number)
+
+
+def split_into_paragraphs(text: str) -> List[str]:
+    """Split text into paragraphs"""
+    # Split by double newlines
+    paragraphs = text.split('\n\n')
+
+    # Clean up each paragraph
+    cleaned = []
+    for para in paragraphs:
+        para = para.strip()
+        if para:
+            # Replace single newlines with spaces
+            para = para.replace('\n', ' ')
+            # Remove extra spaces
+            para = ' '.join(para.split())
+            cleaned.append(para)
+
+    return cleaned
+
+
+# Common role/title lines that appear after the speaker name
+ROLE_KEYWORDS = [
+    'president of the church',
+    'first counselor in the first presidency',
+    'second counselor in the first presidency',
+    'acting president of the quorum of the twelve apostles',
+    'president of the quorum of the twelve apostles',
+    'of the quorum of the twelve apostles',
+    'of the seventy',
+    'first counselor in the',
+    'second counselor in the',
+    'presidency of the seventy',
+    'general authority seventy',
+    'young women general president',
+    'young men general president',
+    'primary general president',
+    'relief society general president',
+    'sunday school general president'
+]
+
+
+def should_skip_paragraph(para_text: str, title: str, speaker: str, author_role: Optional[str] = None) -> bool:
+    """Check if a paragraph should be skipped (duplicate title/speaker info)"""
+    para_clean = para_text.strip().lower()
+    title_clean = title.strip().lower()
+    speaker_clean = speaker.strip().lower()
+
+    # Skip if paragraph matches title exactly
+    if para_clean == title_clean:
+        return True
+
+    # Skip if paragraph matches speaker name (with or without "By")
+    if para_clean == speaker_clean or para_clean == f"by {speaker_clean}":
+        return True
+
+    # Skip if paragraph starts with "By" and contains speaker name
+    if para_clean.startswith("by ") and speaker_clean in para_clean:
+        return True
+
+    # Skip if paragraph matches the author role that was already displayed
+    if author_role:
+        author_role_clean = author_role.strip().lower()
+        if para_clean == author_role_clean:
+            return True
+
+    # Skip common role/title lines that appear after speaker name
+    for keyword in ROLE_KEYWORDS:
+        if keyword in para_clean:
+            return True
+
+    return False
+
+
+def iter_talk_blocks(talk: Dict):
+    """Yield a talk's body as ('paragraph', text, is_first), ('header', text, level) and ('image', item, None)
+
+    Paragraphs duplicating the title, speaker or role are dropped and the
+    first remaining paragraph is flagged so it can be styled as the lead.
+    Falls back to the plain 'content' text for talks without structured_content.
+    """
+    title = talk.get('title', 'Untitled')
+    speaker = talk.get('speaker', 'Unknown')
+    author_role = talk.get('author_role')
+
+    structured_content = talk.get('structured_content', [])
+    if not structured_content:
+        structured_content = [{'type': 'text', 'content': talk.get('content', '')}]
+
+    first_paragraph_added = False
+    for item in structured_content:
+        if item['type'] == 'text':
+            for para_text in split_into_paragraphs(item['content']):
+                if should_skip_paragraph(para_text, title, speaker, author_role):
+                    continue
+                yield 'paragraph', para_text, not first_paragraph_added
+                first_paragraph_added = True
+
+        elif item['type'] == 'header':
+            header_text = item.get('content', '')
+            # Skip if header matches the talk title (duplicate)
+            if header_text.strip().lower() == title.strip().lower():
+                continue
+            yield 'header', header_text, item.get('level', 2)
+            # Headers come after the intro
+            first_paragraph_added = True
+
+        elif item['type'] == 'image':
+            yield 'image', item, None
+
+
+def footnote_number(footnote: Dict) -> str:
+    """Return a footnote's marker without its trailing period ('3.' -> '3')"""
+    return footnote.get('marker', '').rstrip('.')
+
+
+def split_footnote_markers(text: str):
+    """Yield (text, footnote_number) pairs; footnote_number is None after the last marker
+
+    'Faith{{FOOTNOTE:1}} and hope' -> ('Faith', '1'), (' and hope', None)
+    """
+    last = 0
+    for match in FOOTNOTE_PATTERN.finditer(text):
+        yield text[last:match.start()], match.group(1)
+        last = match.end()
+    yield text[last:], None
+
+
+def conference_slug(conference_data: Dict) -> str:
+    """Short file-system friendly name for a conference, e.g. '2025_April'"""
+    date = extract_conference_date(conference_data)
+    if date:
+        month, year = date.split()
+        return f"{year}_{month}"
+    title = conference_data.get('conference_title', '') or 'conference'
+    return re.sub(r'[^A-Za-z0-9]+', '_', title).strip('_')
+
+
+def talk_slug(talk: Dict, talk_number: int) -> str:
+    """File-system friendly name for a talk, taken from the end of its URL"""
+    slug = talk.get('url', '').rstrip('/').rsplit('/', 1)[-1]
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '-', slug).strip('-')
+    return slug or f"talk_{talk_number:03d}"
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+EPUB Generator for General Conference Talks
+
+This module writes reflowable EPUB 3 ebooks from the same scraped conference
+data used by the PDF generator. Talks are written to the archive one at a
+time, so memory use does not grow with the size of the conference. With a
+related talks table (see related_talks.py) each talk ends with links to its
+related talks.
+
+Usage:
+    python epub_generator.py [--progress human|quiet|jsonl] [--related FILE] <conference_data.json> [output.epub]
+"""
+
+import io
+import sys
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from html import escape
+from typing import Dict, Iterable, List, Optional
+from talk_model import load_conference
+from fetchers import HTTPFetcher
+from progress import progress_from_argv
+from related_talks import RelatedTalks, related_from_argv
+from content_utils import (split_footnote_markers, extract_conference_date, talk_session,
+                           iter_talk_blocks, footnote_number)
+
+
+CONTAINER_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+# Mirrors the colours and hierarchy of the PDF styles in pdf_generator.py
+STYLESHEET = """body { font-family: serif; line-height: 1.4; }
+h1, h2, h3, h4 { font-family: sans-serif; color: #003366; }
+h1.talk-title { font-size: 1.6em; margin-bottom: 0.2em; }
+p.speaker { font-family: sans-serif; font-weight: bold; margin: 0; }
+p.author-role { font-style: italic; margin: 0; }
+p.conference-date { color: #5A7FA5; margin-top: 0; }
+p.highlight { font-style: italic; color: #486581; font-size: 1.15em; }
+p { text-align: justify; margin: 0 0 0.5em 0; }
+a.noteref { color: #2D83AE; text-decoration: none; }
+figure { margin: 1em 0; text-align: center; }
+figure img { max-width: 100%; }
+figcaption { font-style: italic; font-size: 0.8em; color: #666666; }
+section.notes { font-size: 0.9em; margin-top: 2em; }
+section.notes h2 { font-size: 1.1em; }
+.cover, .session { text-align: center; margin-top: 30%; }
+.cover .disclaimer { color: #E0E0E0; font-size: 0.6em; margin-top: 40%; }
+"""
+
+XHTML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" lang="en" xml:lang="en">
+<head>
+<meta charset="UTF-8"/>
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="style.css"/>
+</head>
+<body>
+"""
+
+XHTML_FOOTER = """</body>
+</html>
+"""
+
+IMAGE_TYPES = [
+    (b'\xff\xd8', 'jpg', 'image/jpeg'),
+    (b'\x89PNG', 'png', 'image/png'),
+    (b'GIF8', 'gif', 'image/gif'),
+    (b'RIFF', 'webp', 'image/webp'),
+]
+
+
+class ConferenceEPUBGenerator:
+    """Generates an EPUB ebook from conference data (a dict or a talk_model.Conference)"""
+
+    def __init__(self, conference_data: Dict, image_cache: Optional[Dict] = None, fetcher=None,
+                 related: Optional[RelatedTalks] = None, progress=None):
+        self.conference_data = conference_data
+        self.progress = progress  # Optional progress.ProgressReporter
+        self.conference_date = extract_conference_date(conference_data)
+        # url -> BytesIO, the same shape as ConferencePDFGenerator.image_cache so it can be shared
+        self.image_cache = image_cache if image_cache is not None else {}
+        # Images are downloaded through the fetcher (see fetchers.py)
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher(timeout=10)
+        # Optional neighbour table; each talk in it ends with links to its related talks
+        self.related = related
+
+    def _log(self, message: str, level: Optional[str] = None):
+        """Print a message, or hand it to the progress reporter if there is one (details only print)"""
+        if not self.progress:
+            print(message)
+        elif level:
+            self.progress.log(message.strip(), level)
+
+    def _download_image(self, url: str) -> Optional[bytes]:
+        """Return an image's bytes from the cache, downloading it if needed"""
+        buffer = self.image_cache.get(url)
+        if buffer is None:
+            try:
+                buffer = io.BytesIO(self.fetcher.fetch(url))
+            except Exception as e:
+                self._log(f"    Warning: Failed to download image from {url}: {e}", 'warning')
+                return None
+            self.image_cache[url] = buffer
+            if self.progress:
+                self.progress.advance('images', nbytes=buffer.getbuffer().nbytes)
+        return buffer.getvalue()
+
+    def _format_text(self, text: str, refs_seen: set) -> str:
+        """Escape text for XHTML and turn footnote markers into note references"""
+        parts = []
+        for segment, num in split_footnote_markers(text):
+            parts.append(escape(segment.replace('\xa0', ' '), quote=False))
+            if num:
+                # Only the first reference to a note gets the id the backlink targets
+                ref_id = '' if num in refs_seen else f' id="ref-{num}"'
+                refs_seen.add(num)
+                parts.append(f'<sup><a class="noteref" epub:type="noteref"{ref_id} href="#note-{num}">{num}</a></sup>')
+        return ''.join(parts)
+
+    def _talk_xhtml(self, talk: Dict, add_image) -> str:
+        """Render a talk as an XHTML document"""
+        title = talk.get('title', 'Untitled')
+        speaker = talk.get('speaker', 'Unknown')
+        author_role = talk.get('author_role')
+
+        html = [XHTML_HEADER.format(title=escape(title))]
+        html.append(f'<h1 class="talk-title">{escape(title)}</h1>\n')
+        html.append(f'<p class="speaker">By {escape(speaker)}</p>\n')
+        if author_role:
+            html.append(f'<p class="author-role">{escape(author_role)}</p>\n')
+        if self.conference_date:
+            html.append(f'<p class="conference-date">{escape(self.conference_date)}</p>\n')
+
+        refs_seen = set()
+        for kind, value, extra in iter_talk_blocks(talk):
+            if kind == 'paragraph':
+                css_class = ' class="highlight"' if extra else ''
+                html.append(f'<p{css_class}>{self._format_text(value, refs_seen)}</p>\n')
+            elif kind == 'header':
+                level = min(max(extra, 2), 4)
+                html.append(f'<h{level}>{self._format_text(value, refs_seen)}</h{level}>\n')
+            elif kind == 'image':
+                href = add_image(value.get('url', ''))
+                if href:
+                    alt = value.get('alt', '') or value.get('title', '')
+                    html.append(f'<figure><img src="{href}" alt="{escape(alt)}"/>')
+                    caption = value.get('credit', '')
+                    if caption:
+                        html.append(f'<figcaption>{escape(caption)}</figcaption>')
+                    html.append('</figure>\n')
+
+        footnotes = [note for note in talk.get('footnotes', []) if footnote_number(note) and note.get('text')]
+        if footnotes:
+            html.append('<section class="notes" epub:type="footnotes">\n<h2>Notes</h2>\n')
+            for footnote in footnotes:
+                num = footnote_number(footnote)
+                backlink = f' <a href="#ref-{num}">↩</a>' if num in refs_seen else ''
+                html.append(f'<aside epub:type="footnote" id="note-{num}"><p><b>{num}.</b> '
+                            f'{escape(footnote["text"], quote=False)}{backlink}</p></aside>\n')
+            html.append('</section>\n')
+
+        related = self.related.get(talk.get('url', '')) if self.related else []
+        if related:
+            html.append('<section class="notes related">\n<h2>Related Talks</h2>\n<ul>\n')
+            for other in related:
+                html.append(f'<li><a href="{escape(other["link"])}">{escape(other["title"])}</a>, '
+                            f'{escape(other["speaker"])} ({escape(other["conference"])})</li>\n')
+            html.append('</ul>\n</section>\n')
+
+        html.append(XHTML_FOOTER)
+        return ''.join(html)
+
+    def _cover_xhtml(self) -> str:
+        date = f'<h2>{escape(self.conference_date)}</h2>\n' if self.conference_date else ''
+        return (XHTML_HEADER.format(title='General Conference') +
+                '<div class="cover">\n<h1>General Conference</h1>\n' + date +
+                '<p class="disclaimer">This is not an official church production</p>\n</div>\n' +
+                XHTML_FOOTER)
+
+    def _session_xhtml(self, session_name: str) -> str:
+        date = f'<p class="conference-date">{escape(self.conference_date)}</p>\n' if self.conference_date else ''
+        return (XHTML_HEADER.format(title=escape(session_name)) +
+                f'<div class="session">\n<h1>{escape(session_name)}</h1>\n{date}</div>\n' +
+                XHTML_FOOTER)
+
+    def _nav_xhtml(self, toc: List) -> str:
+        """Build the EPUB 3 navigation document (sessions with nested talks)"""
+        html = [XHTML_HEADER.format(title='Contents'), '<nav epub:type="toc" id="toc">\n<h1>Contents</h1>\n<ol>\n']
+        for href, label, children in toc:
+            html.append(f'<li><a href="{href}">{escape(label)}</a>')
+            if children:
+                html.append('\n<ol>\n')
+                for child_href, child_label, _ in children:
+                    html.append(f'<li><a href="{child_href}">{escape(child_label)}</a></li>\n')
+                html.append('</ol>\n')
+            html.append('</li>\n')
+        html.append('</ol>\n</nav>\n')
+        html.append(XHTML_FOOTER)
+        return ''.join(html)
+
+    def _toc_ncx(self, toc: List, book_id: str, title: str) -> str:
+        """Build the EPUB 2 NCX table of contents for older readers"""
+        points = []
+        order = 0
+        for href, label, children in toc:
+            order += 1
+            points.append(f'<navPoint id="nav{order}" playOrder="{order}"><navLabel><text>{escape(label)}</text></navLabel>'
+                          f'<content src="{href}"/>')
+            for child_href, child_label, _ in children:
+                order += 1
+                points.append(f'<navPoint id="nav{order}" playOrder="{order}"><navLabel><text>{escape(child_label)}</text>'
+                              f'</navLabel><content src="{child_href}"/></navPoint>')
+            points.append('</navPoint>')
+        return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">\n'
+                f'<head><meta name="dtb:uid" content="{book_id}"/></head>\n'
+                f'<docTitle><text>{escape(title)}</text></docTitle>\n<navMap>\n' +
+                '\n'.join(points) + '\n</navMap>\n</ncx>\n')
+
+    def _content_opf(self, manifest: List, spine: List, book_id: str, title: str) -> str:
+        items = '\n'.join(f'    <item id="{item_id}" href="{href}" media-type="{media_type}"{props}/>'
+                          for item_id, href, media_type, props in manifest)
+        itemrefs = '\n'.join(f'    <itemref idref="{item_id}"/>' for item_id in spine)
+        modified = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="book-id">{book_id}</dc:identifier>
+    <dc:title>{escape(title)}</dc:title>
+    <dc:language>en</dc:language>
+    <meta property="dcterms:modified">{modified}</meta>
+  </metadata>
+  <manifest>
+{items}
+  </manifest>
+  <spine toc="ncx">
+{itemrefs}
+  </spine>
+</package>
+"""
+
+    def generate_epub(self, output_filename: str, talks: Optional[Iterable[Dict]] = None):
+        """Generate the EPUB, writing each talk to the archive as soon as it is rendered
+
+        Like ConferencePDFGenerator.generate_pdf, talks may be any iterable,
+        including a generator that is still scraping.
+        """
+        self._log(f"\nGenerating EPUB: {output_filename}", 'info')
+        self._log("="*80)
+
+        if talks is None:
+            talks = self.conference_data.get('talks', [])
+        if self.progress:
+            self.progress.start('render', total=len(talks) if hasattr(talks, '__len__') else None, unit='talks')
+        title = f"General Conference {self.conference_date}".strip()
+        book_id = f"urn:uuid:{uuid.uuid4()}"
+
+        manifest = [
+            ('nav', 'nav.xhtml', 'application/xhtml+xml', ' properties="nav"'),
+            ('ncx', 'toc.ncx', 'application/x-dtbncx+xml', ''),
+            ('css', 'style.css', 'text/css', ''),
+        ]
+        spine = []
+        toc = []  # (href, label, children)
+        images = {}  # url -> href inside the book
+
+        with zipfile.ZipFile(output_filename, 'w', zipfile.ZIP_DEFLATED) as book:
+            # The mimetype entry must come first and be stored uncompressed
+            book.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+            book.writestr('META-INF/container.xml', CONTAINER_XML)
+            book.writestr('OEBPS/style.css', STYLESHEET)
+
+            def add_document(item_id: str, content: str) -> str:
+                href = f"{item_id}.xhtml"
+                book.writestr(f"OEBPS/{href}", content)
+                manifest.append((item_id, href, 'application/xhtml+xml', ''))
+                spine.append(item_id)
+                return href
+
+            def add_image(url: str) -> Optional[str]:
+                if not url:
+                    return None
+                if url not in images:
+                    image_data = self._download_image(url)
+                    if not image_data:
+                        return None
+                    ext, media_type = 'jpg', 'image/jpeg'
+                    for magic, magic_ext, magic_type in IMAGE_TYPES:
+                        if image_data.startswith(magic):
+                            ext, media_type = magic_ext, magic_type
+                            break
+                    item_id = f"img{len(images) + 1:04d}"
+                    href = f"images/{item_id}.{ext}"
+                    # Images are already compressed, so store them as-is
+                    book.writestr(f"OEBPS/{href}", image_data, compress_type=zipfile.ZIP_STORED)
+                    manifest.append((item_id, href, media_type, ''))
+                    images[url] = href
+                return images[url]
+
+            add_document('cover', self._cover_xhtml())
+
+            current_session = None
+            current_children = None
+            sessions = 0  # Session numbers can repeat (a session resumed later), so documents are numbered
+            for i, talk in enumerate(talks, 1):
+                speaker = talk.get('speaker', 'Unknown')
+                talk_title = talk.get('title', 'Untitled')
+
+                # Check if we're starting a new session
+                session_number, session_name = talk_session(talk)
+                if session_number != current_session and session_number != '0':
+                    current_session = session_number
+                    sessions += 1
+                    href = add_document(f"session_{sessions}", self._session_xhtml(session_name))
+                    current_children = []
+                    toc.append((href, session_name, current_children))
+
+                self._log(f"  [{i}] {speaker}: {talk_title}")
+                href = add_document(f"talk_{i:03d}", self._talk_xhtml(talk, add_image))
+                if self.progress:
+                    self.progress.advance('render', item=f"{speaker}: {talk_title}")
+                entry = (href, f"{speaker}: {talk_title}", [])
+                if current_children is not None:
+                    current_children.append(entry)
+                else:
+                    toc.append(entry)
+
+            book.writestr('OEBPS/nav.xhtml', self._nav_xhtml(toc))
+            book.writestr('OEBPS/toc.ncx', self._toc_ncx(toc, book_id, title))
+            book.writestr('OEBPS/content.opf', self._content_opf(manifest, spine, book_id, title))
+
+        if self.progress:
+            self.progress.finish('render')
+        self._log(f"\n{'='*80}")
+        self._log(f"EPUB generated successfully: {output_filename}", 'info')
+        self._log(f"{'='*80}")
+
+
+def main():
+    """Main function for standalone EPUB generation from JSON"""
+    progress = progress_from_argv(sys.argv)
+    related = related_from_argv(sys.argv)
+    if len(sys.argv) < 2:
+        print("Usage: python epub_generator.py [--progress human|quiet|jsonl] [--related FILE] "
+              "<conference_data.json> [output.epub]")
+        sys.exit(1)
+
+    input_file = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else "conference_output.epub"
+
+    # Load conference data
+    if not progress:
+        print(f"Loading conference data from: {input_file}")
+    conference_data = load_conference(input_file)
+
+    # Generate EPUB
+    generator = ConferenceEPUBGenerator(conference_data, related=related, progress=progress)
+    generator.generate_epub(output_file)
+    if progress:
+        progress.close()
+
+
+if __name__ == '__main__':
+    main()
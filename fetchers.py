@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Pluggable Fetchers for the General Conference Tools
+
+All network access of the scraper and the generators goes through a fetcher:
+an object with a fetch(url) method returning the response body as bytes (and
+raising FetchError on failure). Swapping the fetcher changes where data comes
+from without touching any parsing code:
+
+    HTTPFetcher       live HTTP with urllib (the default)
+    DiskCacheFetcher  wraps another fetcher and keeps every response on disk
+    FixtureFetcher    replays responses recorded on disk, never touching the
+                      network (or records them first, with record_from)
+    AsyncFetcher      asyncio front end for any fetcher, with bounded concurrency
+
+Any object with the same fetch(url) -> bytes method (e.g. a pooled client
+used in production) can be passed instead.
+
+Example:
+    fetcher = FixtureFetcher('tests/fixtures', record_from=HTTPFetcher())
+    scraper = ConferenceScraper(conference_url, fetcher=fetcher)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+# urllib.request, asyncio and concurrent.futures are imported where they are
+# used: together they take longer to import than the rest of a scrape's startup
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+}
+
+
+class FetchError(Exception):
+    """A URL could not be fetched"""
+
+
+class Fetcher(ABC):
+    """Base class: fetch(url) returns the response body as bytes or raises FetchError"""
+
+    @abstractmethod
+    def fetch(self, url: str) -> bytes:
+        """The response body of url"""
+
+    def fetch_json(self, url: str):
+        """Fetch a URL and decode its body as JSON"""
+        body = self.fetch(url)
+        try:
+            return json.loads(body.decode('utf-8'))
+        except ValueError as e:
+            raise FetchError(f"Invalid JSON from {url}: {e}") from e
+
+
+class HTTPFetcher(Fetcher):
+    """Live HTTP(S) with urllib"""
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, timeout: float = 30):
+        self.headers = headers if headers is not None else dict(DEFAULT_HEADERS)
+        self.timeout = timeout
+
+    def fetch(self, url: str) -> bytes:
+        import urllib.request
+
+        req = urllib.request.Request(url, headers=self.headers)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.read()
+        except Exception as e:
+            raise FetchError(f"{url}: {e}") from e
+
+
+class _ResponseStore:
+    """Response bodies on disk, one file per URL plus a readable url -> file index"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.json')
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.index = {}
+
+    @staticmethod
+    def file_name(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def path(self, url: str) -> str:
+        return os.path.join(self.directory, self.file_name(url))
+
+    def get(self, url: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        path = self.path(url)
+        try:
+            if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url: str, body: bytes):
+        path = self.path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self.index.get(url) != self.file_name(url):
+                self.index[url] = self.file_name(url)
+                tmp_index = f"{self.index_path}.tmp"
+                with open(tmp_index, 'w', encoding='utf-8') as f:
+                    json.dump(self.index, f, indent=1, sort_keys=True)
+                os.replace(tmp_index, self.index_path)
+
+
+class DiskCacheFetcher(Fetcher):
+    """Serves responses from a disk cache, fetching (and storing) misses with another fetcher
+
+    max_age (seconds) makes older entries count as misses; None keeps them forever.
+    """
+
+    def __init__(self, cache_dir: str, fetcher: Optional[Fetcher] = None, max_age: Optional[float] = None):
+        self.store = _ResponseStore(cache_dir)
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher()
+        self.max_age = max_age
+
+    def fetch(self, url: str) -> bytes:
+        body = self.store.get(url, self.max_age)
+        if body is None:
+            body = self.fetcher.fetch(url)
+            self.store.put(url, body)
+        return body
+
+
+class FixtureFetcher(Fetcher):
+    """Replays recorded responses from a fixture directory, without any network access
+
+    With record_from (another fetcher), URLs missing from the fixtures are
+    fetched and recorded, which is how a fixture set is made in the first place.
+    """
+
+    def __init__(self, fixture_dir: str, record_from: Optional[Fetcher] = None):
+        self.store = _ResponseStore(fixture_dir)
+        self.record_from = record_from
+
+    def fetch(self, url: str) -> bytes:
+        body = self.store.get(url)
+        if body is not None:
+            return body
+        if self.record_from is None:
+            raise FetchError(f"{url}: not in fixtures ({self.store.directory})")
+        body = self.record_from.fetch(url)
+        self.store.put(url, body)
+        return body
+
+
+class AsyncFetcher:
+    """asyncio front end for a (blocking) fetcher
+
+    Fetches run in a thread pool, at most max_concurrency at a time, so any
+    fetcher above (or a custom client) can be awaited from asyncio code.
+    """
+
+    def __init__(self, fetcher: Optional[Fetcher] = None, max_concurrency: int = 8):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher()
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphores = {}  # event loop -> semaphore
+
+    def _semaphore(self):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[loop]
+
+    async def fetch(self, url: str) -> bytes:
+        import asyncio
+
+        async with self._semaphore():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.fetcher.fetch, url)
+
+    async def fetch_json(self, url: str):
+        body = await self.fetch(url)
+        try:
+            return json.loads(body.decode('utf-8'))
+        except ValueError as e:
+            raise FetchError(f"Invalid JSON from {url}: {e}") from e
+
+    async def fetch_all(self, urls: Iterable[str]) -> List:
+        """Fetch many URLs concurrently; failures come back as FetchError instances"""
+        import asyncio
+
+        return await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def directory(value: str) -> str:
+    """argparse type of the source options: a directory path, not an empty string"""
+    if not value:
+        raise ValueError("empty path")
+    return value
+
+
+def add_fetcher_arguments(parser):
+    """Add the mutually exclusive --cache, --fixtures and --record DIR options to an argparse parser
+
+    --cache keeps live responses on disk, --fixtures replays recorded ones
+    offline, and --record records fixtures while fetching live.
+    """
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--cache', metavar='DIR', type=directory, help="keep every response in a disk cache")
+    group.add_argument('--fixtures', metavar='DIR', type=directory,
+                       help="replay recorded responses (no network)")
+    group.add_argument('--record', metavar='DIR', type=directory,
+                       help="record live responses as fixtures")
+
+
+def fetcher_from_args(args) -> Optional[Fetcher]:
+    """The fetcher the add_fetcher_arguments options ask for; None means the caller's default (live HTTP)"""
+    if args.cache:
+        return DiskCacheFetcher(args.cache)
+    if args.fixtures:
+        return FixtureFetcher(args.fixtures)
+    if args.record:
+        return FixtureFetcher(args.record, record_from=HTTPFetcher())
+    return None
+
+
+def fetcher_from_argv(argv) -> Optional[Fetcher]:
+    """Remove the --cache, --fixtures or --record DIR option from argv and build the fetcher
+
+    For scripts that read sys.argv by hand; a missing directory or two source
+    options print the usage and exit, as argparse does.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]), add_help=False, allow_abbrev=False)
+    add_fetcher_arguments(parser)
+    args, rest = parser.parse_known_args(argv[1:])
+    argv[1:] = rest
+    return fetcher_from_args(args)
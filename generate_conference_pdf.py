@@ -3,107 +3,309 @@
 Complete General Conference PDF Generator
 
 This script combines web scraping and PDF generation to create formatted
-PDF documents from General Conference talks.
+PDF documents from General Conference talks. It has three commands:
+
+    all     scrape a conference and generate its PDF (the default)
+    scrape  scrape a conference into a JSON file only
+    render  generate a PDF from scraped JSON (several files make a compilation)
+
+Only what a command needs is imported: ReportLab and PIL are loaded by the
+commands that render, so usage errors and scrape-only runs start quickly.
 
 Usage:
-    python generate_conference_pdf.py <conference_url> [output_pdf]
-    
+    python generate_conference_pdf.py [all] [options] <conference_url> [output_pdf]
+    python generate_conference_pdf.py scrape [options] <conference_url> [output_json]
+    python generate_conference_pdf.py render [options] <conference_data.json> [more_data.json ...] [output_pdf]
+
+Options:
+    --progress human|quiet|jsonl          progress counters instead of log lines
+    --profile[=DIR] [--profile-cpu-only]  CPU and allocation profiles per stage (default: profile/)
+    --cache DIR | --fixtures DIR | --record DIR   where pages and images come from
+    --eink [BITS] --image-cache DIR       (all, render) e-ink profile and prepared image store
+    --similar-images                      (all, render) embed look-alike images once too
+    --related FILE                        (all, render) end talks with related talks (see related_talks.py)
+    --linearize                           (all, render) fast first-page display over slow downloads
+
 Example:
     python generate_conference_pdf.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng 2025_April.pdf
+    python generate_conference_pdf.py scrape https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng
+    python generate_conference_pdf.py render --eink Output/2025_April.json
 """
 
 import sys
 import os
 import json
+import argparse
 from datetime import datetime
-from conference_scraper import ConferenceScraper
-from pdf_generator import ConferencePDFGenerator
+from content_utils import conference_name_from_url
+from fetchers import add_fetcher_arguments, fetcher_from_args
+
+
+COMMANDS = ('all', 'scrape', 'render')
+
+# Where outputs go when only a file name (or nothing) is given
+OUTPUT_DIR = "Output"
 
 
 def extract_conference_name(url: str) -> str:
     """Extract a readable conference name from the URL"""
-    # Extract year and month from URL
     # Example: /general-conference/2025/04 -> 2025_April
-    import re
-    match = re.search(r'/general-conference/(\d{4})/(\d{2})', url)
-    if match:
-        year = match.group(1)
-        month_num = match.group(2)
-        
-        # Convert month number to name
-        months = {
-            '04': 'April',
-            '10': 'October'
-        }
-        month_name = months.get(month_num, month_num)
-        
-        return f"{year}_{month_name}"
-    
+    conference_name = conference_name_from_url(url)
+    if conference_name:
+        return conference_name
+
     return f"conference_{datetime.now().strftime('%Y%m%d')}"
 
 
-def main():
-    """Main function"""
+def output_path(requested: str, default_name: str) -> str:
+    """The requested output path, or default_name; bare file names go in the Output directory"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = requested or default_name
+    if not os.path.dirname(path):
+        path = os.path.join(OUTPUT_DIR, path)
+    return path
 
-    print("="*80)
-    print("General Conference PDF Generator")
-    print("="*80)
 
-    # Parse arguments
-    if len(sys.argv) < 2:
-        print("\nUsage: python generate_conference_pdf.py <conference_url> [output_pdf]")
-        print("\nExample:")
-        print("  python generate_conference_pdf.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng")
-        print("  python generate_conference_pdf.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng 2025_April.pdf")
-        sys.exit(1)
+def make_progress(args):
+    if not args.progress:
+        return None
+    from progress import ProgressReporter
+    return ProgressReporter(args.progress)
 
-    conference_url = sys.argv[1]
 
-    # Create Output directory if it doesn't exist
-    output_dir = "Output"
-    os.makedirs(output_dir, exist_ok=True)
+def make_render_options(args) -> dict:
+    """Generator keyword arguments (profile, image_store, image_dedup, related, linearize) for the rendering commands"""
+    from render_profile import eink_profile
+    from image_pipeline import ImageDeduplicator, PreparedImageStore
+    from related_talks import RelatedTalks
+    return {
+        'profile': eink_profile(args.eink) if args.eink else None,
+        'image_store': PreparedImageStore(args.image_cache) if args.image_cache else None,
+        'image_dedup': ImageDeduplicator(perceptual=args.similar_images),
+        'related': RelatedTalks.load(args.related) if args.related else None,
+        'linearize': args.linearize,
+    }
 
-    # Determine output filename
-    if len(sys.argv) > 2:
-        output_pdf = sys.argv[2]
-        # If user provided a filename without directory, put it in Output
-        if not os.path.dirname(output_pdf):
-            output_pdf = os.path.join(output_dir, output_pdf)
-    else:
-        conference_name = extract_conference_name(conference_url)
-        output_pdf = os.path.join(output_dir, f"{conference_name}.pdf")
-
-    print(f"\nConference URL: {conference_url}")
-    print(f"Output PDF: {output_pdf}")
-    print()
-    
-    # Step 1: Scrape the conference
-    print("\n" + "="*80)
-    print("STEP 1: Scraping Conference Data")
-    print("="*80)
-
-    scraper = ConferenceScraper(conference_url)
+
+def make_logger(progress):
+    def log(message=''):
+        # Status goes to the progress reporter when one was asked for (minus the rules)
+        if progress:
+            if message.strip('\n='):
+                progress.log(message.strip('\n'))
+        else:
+            print(message)
+    return log
+
+
+def run_scrape(args, progress):
+    """Scrape a conference into JSON"""
+    from conference_scraper import ConferenceScraper
+
+    log = make_logger(progress)
+    output_json = output_path(args.output, f"{extract_conference_name(args.conference_url)}.json")
+
+    scraper = ConferenceScraper(args.conference_url, progress=progress, fetcher=fetcher_from_args(args))
     conference_data = scraper.scrape_all_talks()
 
-    # Step 2: Generate PDF
-    print("\n" + "="*80)
-    print("STEP 2: Generating PDF")
-    print("="*80)
-    
-    generator = ConferencePDFGenerator(conference_data)
-    generator.generate_pdf(output_pdf)
-    
+    with open(output_json, 'w', encoding='utf-8') as f:
+        json.dump(conference_data, f, indent=2, ensure_ascii=False)
+
+    log(f"\n{'='*80}")
+    log(f"Scraped {len(conference_data['talks'])} talks to: {output_json}")
+    log(f"{'='*80}")
+
+
+def run_render(args, progress):
+    """Generate a PDF (or, from several files, a compilation) from scraped JSON"""
+    from pdf_generator import ConferencePDFGenerator, ImageCache
+    from talk_model import load_conference
+
+    inputs = list(args.inputs)
+    requested = inputs.pop() if len(inputs) > 1 and inputs[-1].lower().endswith('.pdf') else None
+    default_name = os.path.splitext(os.path.basename(inputs[0]))[0] + '.pdf' if len(inputs) == 1 else 'compilation.pdf'
+    output_pdf = output_path(requested, default_name)
+
+    fetcher = fetcher_from_args(args)
+    options = make_render_options(args)
+
+    if len(inputs) > 1:
+        generator = ConferencePDFGenerator(image_cache=ImageCache(), progress=progress, fetcher=fetcher, **options)
+        generator.generate_compilation_pdf(output_pdf, inputs)
+    else:
+        generator = ConferencePDFGenerator(load_conference(inputs[0]), progress=progress, fetcher=fetcher,
+                                           **options)
+        generator.generate_pdf(output_pdf)
+
+
+def run_all(args, progress):
+    """Scrape a conference and generate its PDF in one pipeline"""
+    from conference_scraper import ConferenceScraper
+    from pdf_generator import ConferencePDFGenerator
+
+    fetcher = fetcher_from_args(args)
+    options = make_render_options(args)
+    log = make_logger(progress)
+
+    log("="*80)
+    log("General Conference PDF Generator")
+    log("="*80)
+
+    conference_url = args.conference_url
+    output_pdf = output_path(args.output, f"{extract_conference_name(conference_url)}.pdf")
+
+    log(f"\nConference URL: {conference_url}")
+    log(f"Output PDF: {output_pdf}")
+    log()
+
+    # Scrape and render as a pipeline: talks are fetched, extracted and have
+    # their images downloaded in worker threads while the PDF is laid out
+    log("\n" + "="*80)
+    log("Scraping Conference Data and Generating PDF")
+    log("="*80)
+
+    scraper = ConferenceScraper(conference_url, progress=progress, fetcher=fetcher)
+    conference_title, talk_links = scraper.fetch_talk_links()
+
+    conference_data = {
+        'conference_title': conference_title,
+        'talks': [],
+        'scraped_at': datetime.now().isoformat()
+    }
+    generator = ConferencePDFGenerator(conference_data, progress=progress, fetcher=fetcher, **options)
+
+    def scraped_talks():
+        for talk in scraper.iter_talks(talk_links, prepare=generator.prefetch_images):
+            conference_data['talks'].append(talk)
+            yield talk
+
+    generator.generate_pdf(output_pdf, talks=scraped_talks(), toc_talks=talk_links)
+
     # Summary
-    print("\n" + "="*80)
-    print("COMPLETE!")
-    print("="*80)
-    print(f"\nConference: {conference_data['conference_title']}")
-    print(f"Total talks: {len(conference_data['talks'])}")
-    print(f"\nOutput file:")
-    print(f"  - PDF: {output_pdf}")
-    print("\n" + "="*80)
+    log("\n" + "="*80)
+    log("COMPLETE!")
+    log("="*80)
+    log(f"\nConference: {conference_data['conference_title']}")
+    log(f"Total talks: {len(conference_data['talks'])}")
+    log(f"\nOutput file:")
+    log(f"  - PDF: {output_pdf}")
+    log("\n" + "="*80)
+
+
+class JoinedValueFormatter(argparse.HelpFormatter):
+    """Shows options whose value can only be joined on with '=' (metavar '[=DIR]') as --option[=DIR]"""
+
+    @staticmethod
+    def _joined(action) -> bool:
+        return bool(action.metavar) and action.metavar.startswith('[=')
+
+    def _format_action_invocation(self, action):
+        if self._joined(action):
+            return ', '.join(option + action.metavar for option in action.option_strings)
+        return super()._format_action_invocation(action)
+
+    def _format_usage(self, usage, actions, groups, prefix):
+        text = super()._format_usage(usage, actions, groups, prefix)
+        for action in filter(self._joined, actions):
+            for option in action.option_strings:
+                text = text.replace(f"{option} {action.metavar}", option + action.metavar)
+        return text
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--progress', choices=('human', 'quiet', 'jsonl'),
+                        help="report progress as counters instead of log lines")
+    # Only --profile=DIR: after a bare --profile (made --profile=profile by main) a DIR would be the URL
+    common.add_argument('--profile', metavar='[=DIR]',
+                        help="write CPU and allocation profiles per stage to DIR (default: profile/); "
+                             "join DIR on with '='")
+    common.add_argument('--profile-cpu-only', action='store_true',
+                        help="with --profile, skip allocation tracing (which slows the run) for true timings")
+
+    source = argparse.ArgumentParser(add_help=False)
+    add_fetcher_arguments(source)
+
+    rendering = argparse.ArgumentParser(add_help=False)
+    # A bare --eink has become --eink=4 by the time this parses (see main)
+    rendering.add_argument('--eink', type=int, nargs='?', const=4, choices=(1, 2, 4, 8), metavar='BITS',
+                           help="render for e-ink readers, images dithered to BITS (1, 2, 4 or 8); "
+                                "a bare --eink means 4")
+    rendering.add_argument('--image-cache', metavar='DIR', help="keep prepared images on disk across runs")
+    rendering.add_argument('--similar-images', action='store_true',
+                           help="also embed images that look the same (re-encoded or resized copies) once")
+    rendering.add_argument('--related', metavar='FILE',
+                           help="end each talk with links to its related talks from this neighbour table")
+    rendering.add_argument('--linearize', action='store_true',
+                           help="linearize the PDF with compressed object streams, so readers downloading it "
+                                "show the first page early (needs pikepdf or qpdf)")
+
+    parser = argparse.ArgumentParser(description="Scrape General Conference talks and generate PDFs",
+                                     formatter_class=JoinedValueFormatter)
+    commands = parser.add_subparsers(dest='command', metavar='{all,scrape,render}')
+
+    all_parser = commands.add_parser('all', parents=[common, source, rendering],
+                                     formatter_class=JoinedValueFormatter,
+                                     help="scrape a conference and generate its PDF (default)")
+    all_parser.add_argument('conference_url')
+    all_parser.add_argument('output', nargs='?', help="output PDF (default: Output/<year>_<month>.pdf)")
+    all_parser.set_defaults(run=run_all)
+
+    scrape_parser = commands.add_parser('scrape', parents=[common, source],
+                                        formatter_class=JoinedValueFormatter, help="scrape a conference into JSON")
+    scrape_parser.add_argument('conference_url')
+    scrape_parser.add_argument('output', nargs='?', help="output JSON (default: Output/<year>_<month>.json)")
+    scrape_parser.set_defaults(run=run_scrape)
+
+    render_parser = commands.add_parser('render', parents=[common, source, rendering],
+                                        formatter_class=JoinedValueFormatter,
+                                        help="generate a PDF from scraped JSON files")
+    render_parser.add_argument('inputs', nargs='+', metavar='file',
+                               help="conference JSON files, optionally followed by the output PDF")
+    render_parser.set_defaults(run=run_render)
+    return parser
+
+
+def main(argv=None):
+    """Main function"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Without a command, behave as before: scrape and generate the PDF
+    if argv and argv[0] not in COMMANDS and argv[0] not in ('-h', '--help'):
+        argv.insert(0, 'all')
+    if '--eink' in argv:  # Only rendering runs pay for importing the profiles
+        from render_profile import expand_bare_eink
+        argv = expand_bare_eink(argv)
+    parser = build_parser()
+    # A bare --profile takes the default (an optional value would swallow the URL),
+    # so a directory after it would be read as the URL or input file
+    for arg, following in zip(argv, argv[1:]):
+        if arg == '--profile' and os.path.isdir(following):
+            parser.error(f"give the profile directory as --profile={following}")
+    argv = ['--profile=profile' if arg == '--profile' else arg for arg in argv]
+
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.print_help()
+        print("\nExample:")
+        print("  python generate_conference_pdf.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng")
+        print("  python generate_conference_pdf.py https://www.churchofjesuschrist.org/study/general-conference/2025/04?lang=eng 2025_April.pdf")
+        sys.exit(1)
+
+    progress = make_progress(args)
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler(args.profile, args.command, progress, memory=not args.profile_cpu_only)
+        profiler.start()
+    # A failed run still writes its profile; that's when one is needed most
+    try:
+        args.run(args, progress)
+    finally:
+        if profiler:
+            profiler.stop()
+    if progress:
+        progress.close()
 
 
 if __name__ == '__main__':
     main()
-
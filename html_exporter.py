@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Static HTML Site Exporter for General Conference Talks
+
+This module turns scraped conference data (one conference or a whole archive)
+into a static website: a page per talk, a session index per conference, an
+archive index, responsive image variants and a precomputed client-side search
+index. Pages are rendered in parallel, and re-exports only rewrite talks whose
+content hash changed since the last run. With a related talks table (see
+related_talks.py) each talk page ends with links to its related talks.
+
+Usage:
+    python html_exporter.py [--progress human|quiet|jsonl] [--related FILE] <output_dir> <conference_data.json> [more_data.json ...]
+"""
+
+import io
+import os
+import sys
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from html import escape
+from typing import Dict, List, Optional, Tuple
+from talk_model import load_conference
+from fetchers import HTTPFetcher
+from progress import progress_from_argv
+from related_talks import RelatedTalks, related_from_argv
+from content_utils import (split_footnote_markers, extract_conference_date, talk_session,
+                           iter_talk_blocks, footnote_number, conference_slug,
+                           talk_slug, STOP_WORDS, WORD_PATTERN)
+
+
+# Bump when the page markup changes so every page is rewritten on the next export
+TEMPLATE_VERSION = '1'
+
+# Widths (in pixels) of the responsive image variants
+IMAGE_WIDTHS = (480, 960, 1440)
+
+STYLESHEET = """body { font-family: Georgia, serif; line-height: 1.5; max-width: 42em; margin: 0 auto; padding: 1em; }
+h1, h2, h3, h4, nav, .speaker { font-family: Helvetica, Arial, sans-serif; color: #003366; }
+.speaker { font-weight: bold; color: black; margin: 0; }
+.author-role { font-style: italic; margin: 0; }
+.conference-date { color: #5A7FA5; margin-top: 0; }
+.highlight { font-style: italic; color: #486581; font-size: 1.15em; }
+p { text-align: justify; }
+sup a { color: #2D83AE; text-decoration: none; }
+figure { margin: 1.5em 0; text-align: center; }
+figure img { max-width: 100%; height: auto; }
+figcaption { font-style: italic; font-size: 0.8em; color: #666666; }
+.notes { font-size: 0.9em; border-top: 1px solid #ccc; margin-top: 2em; }
+.notes li { margin-bottom: 0.4em; }
+nav a { margin-right: 1em; }
+#search { width: 100%; font-size: 1em; padding: 0.4em; }
+#results li { margin-bottom: 0.3em; }
+"""
+
+# Looks words up in the precomputed inverted index (search-index.json), skipping the
+# words _index_terms leaves out (STOP_WORDS is filled in below)
+SEARCH_SCRIPT = """(function () {
+  var box = document.getElementById('search'), list = document.getElementById('results');
+  if (!box) return;
+  var root = box.getAttribute('data-root'), index = null, stopWords = STOP_WORDS;
+  var has = function (object, key) { return Object.prototype.hasOwnProperty.call(object, key); };
+  fetch(root + 'search-index.json').then(function (r) { return r.json(); }).then(function (data) { index = data; });
+  box.addEventListener('input', function () {
+    list.innerHTML = '';
+    if (!index) return;
+    var words = (box.value.toLowerCase().match(/[a-z0-9']+/g) || []).filter(function (word) {
+      return word.length > 2 && !has(stopWords, word);
+    }), hits = null;
+    words.forEach(function (word) {
+      var postings = has(index.terms, word) ? index.terms[word] : [];
+      hits = hits === null ? postings : hits.filter(function (id) { return postings.indexOf(id) >= 0; });
+    });
+    (hits || []).slice(0, 50).forEach(function (id) {
+      var doc = index.docs[id], li = document.createElement('li'), a = document.createElement('a');
+      a.href = root + doc[0];
+      a.textContent = doc[1] + ' \\u2014 ' + doc[2] + ' (' + doc[3] + ')';
+      li.appendChild(a);
+      list.appendChild(li);
+    });
+  });
+})();
+""".replace('STOP_WORDS', json.dumps(dict.fromkeys(sorted(STOP_WORDS), 1)))
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<link rel="stylesheet" href="{root}style.css">
+</head>
+<body>
+<nav><a href="{root}index.html">All conferences</a>{nav}</nav>
+{body}
+</body>
+</html>
+"""
+
+
+def _talk_hash(talk: Dict, conference_date: str, related: List = ()) -> str:
+    """Content hash of everything that appears on a talk's page"""
+    content = {key: talk[key] for key in talk.keys() if key != 'full_data'}
+    page = [TEMPLATE_VERSION, conference_date, content]
+    if related:  # Pages without related talks keep the hashes they had before the table existed
+        page.append([[href, other['title'], other['speaker'], other['conference']] for href, other in related])
+    payload = json.dumps(page, sort_keys=True, default=lambda record: record.to_dict())
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _write_if_changed(path: str, content: str) -> bool:
+    """Write a text file unless it already has exactly this content"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+
+class StaticSiteExporter:
+    """Exports conference data to a static, searchable HTML site"""
+
+    def __init__(self, output_dir: str, image_cache: Optional[Dict] = None, max_workers: int = 8,
+                 fetcher=None, related: Optional[RelatedTalks] = None, progress=None):
+        self.output_dir = output_dir
+        self.progress = progress  # Optional progress.ProgressReporter
+        self.max_workers = max_workers
+        # url -> BytesIO, the same shape as ConferencePDFGenerator.image_cache so it can be shared
+        self.image_cache = image_cache if image_cache is not None else {}
+        # Images are downloaded through the fetcher (see fetchers.py)
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher(timeout=10)
+        self.manifest_path = os.path.join(output_dir, 'manifest.json')
+        # Optional neighbour table; talk pages end with links to their related talks
+        self.related = related
+
+    def _log(self, message: str, level: Optional[str] = None):
+        """Print a message, or hand it to the progress reporter if there is one (details only print)"""
+        if not self.progress:
+            print(message)
+        elif level:
+            self.progress.log(message.strip(), level)
+
+    def _load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'pages': {}, 'images': {}}
+
+    def _download_image(self, url: str) -> Optional[bytes]:
+        """Return an image's bytes from the cache, downloading it if needed"""
+        buffer = self.image_cache.get(url)
+        if buffer is None:
+            try:
+                buffer = io.BytesIO(self.fetcher.fetch(url))
+            except Exception as e:
+                self._log(f"    Warning: Failed to download image from {url}: {e}", 'warning')
+                return None
+            self.image_cache[url] = buffer
+        return buffer.getvalue()
+
+    def _make_image_variants(self, url: str) -> List[Tuple[str, int]]:
+        """Resize an image to the responsive widths; returns [(href, width), ...] smallest first"""
+        from PIL import Image as PILImage  # Only needed when there are new images
+
+        image_data = self._download_image(url)
+        if not image_data:
+            return []
+
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        try:
+            image = PILImage.open(io.BytesIO(image_data))
+            image.load()
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+
+            variants = []
+            widths = [w for w in IMAGE_WIDTHS if w < image.width] + [min(image.width, IMAGE_WIDTHS[-1])]
+            # Resize from the largest variant down so each step starts from a smaller image
+            for width in sorted(set(widths), reverse=True):
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), PILImage.LANCZOS)
+                href = f"images/{name}-{width}.jpg"
+                image.save(os.path.join(self.output_dir, href), 'JPEG', quality=82, optimize=True)
+                variants.append((href, width))
+            return variants[::-1]
+        except Exception as e:
+            self._log(f"    Warning: Failed to process image {url}: {e}", 'warning')
+            return []
+
+    def _format_text(self, text: str, refs_seen: set) -> str:
+        """Escape text for HTML and turn footnote markers into links to the notes"""
+        parts = []
+        for segment, num in split_footnote_markers(text):
+            parts.append(escape(segment.replace('\xa0', ' '), quote=False))
+            if num:
+                # Only the first reference to a note gets the id the backlink targets
+                ref_id = '' if num in refs_seen else f' id="ref-{num}"'
+                refs_seen.add(num)
+                parts.append(f'<sup><a{ref_id} href="#note-{num}">{num}</a></sup>')
+        return ''.join(parts)
+
+    def _related_links(self, talk: Dict, site_paths: Dict) -> List[Tuple[str, Dict]]:
+        """(href, related talk) pairs: talks in the site link to their page, others to the Church's site"""
+        if not self.related:
+            return []
+        links = []
+        for other in self.related.get(talk.get('url', '')):
+            path = site_paths.get(other['url'])
+            links.append((f"../{path}" if path else other['link'], other))
+        return links
+
+    def _talk_page(self, talk: Dict, conference_date: str, images: Dict, nav: str, related: List = ()) -> str:
+        """Render a talk as a standalone HTML page"""
+        title = talk.get('title', 'Untitled')
+        speaker = talk.get('speaker', 'Unknown')
+        author_role = talk.get('author_role')
+
+        html = [f'<h1>{escape(title)}</h1>\n', f'<p class="speaker">By {escape(speaker)}</p>\n']
+        if author_role:
+            html.append(f'<p class="author-role">{escape(author_role)}</p>\n')
+        if conference_date:
+            html.append(f'<p class="conference-date">{escape(conference_date)}</p>\n')
+
+        refs_seen = set()
+        for kind, value, extra in iter_talk_blocks(talk):
+            if kind == 'paragraph':
+                css_class = ' class="highlight"' if extra else ''
+                html.append(f'<p{css_class}>{self._format_text(value, refs_seen)}</p>\n')
+            elif kind == 'header':
+                level = min(max(extra, 2), 4)
+                html.append(f'<h{level}>{self._format_text(value, refs_seen)}</h{level}>\n')
+            elif kind == 'image':
+                variants = images.get(value.get('url', ''))
+                if variants:
+                    srcset = ', '.join(f"../{href} {width}w" for href, width in variants)
+                    alt = value.get('alt', '') or value.get('title', '')
+                    html.append(f'<figure><img src="../{variants[0][0]}" srcset="{srcset}" '
+                                f'sizes="(max-width: 42em) 100vw, 42em" alt="{escape(alt)}" loading="lazy">')
+                    caption = value.get('credit', '')
+                    if caption:
+                        html.append(f'<figcaption>{escape(caption)}</figcaption>')
+                    html.append('</figure>\n')
+
+        footnotes = [note for note in talk.get('footnotes', []) if footnote_number(note) and note.get('text')]
+        if footnotes:
+            html.append('<section class="notes">\n<h2>Notes</h2>\n<ol>\n')
+            for footnote in footnotes:
+                num = footnote_number(footnote)
+                backlink = f' <a href="#ref-{num}">↩</a>' if num in refs_seen else ''
+                html.append(f'<li id="note-{num}" value="{num}">{escape(footnote["text"], quote=False)}{backlink}</li>\n')
+            html.append('</ol>\n</section>\n')
+
+        if related:
+            html.append('<section class="notes related">\n<h2>Related Talks</h2>\n<ul>\n')
+            for href, other in related:
+                html.append(f'<li><a href="{escape(href)}">{escape(other["title"])}</a>, '
+                            f'{escape(other["speaker"])} ({escape(other["conference"])})</li>\n')
+            html.append('</ul>\n</section>\n')
+
+        return PAGE_TEMPLATE.format(title=escape(f"{title} - {speaker}"), root='../', nav=nav, body=''.join(html))
+
+    def _index_terms(self, talk: Dict) -> set:
+        """Distinct searchable words of a talk (title, speaker and body text)"""
+        text = ' '.join([talk.get('title', ''), talk.get('speaker', '')] +
+                        [value for kind, value, _ in iter_talk_blocks(talk) if kind != 'image'])
+        text = ''.join(segment for segment, _ in split_footnote_markers(text.lower()))
+        return {word for word in WORD_PATTERN.findall(text) if len(word) > 2 and word not in STOP_WORDS}
+
+    def export(self, conferences) -> Dict[str, int]:
+        """Export one conference or a list of conferences; returns page/image counts"""
+        if isinstance(conferences, dict) or hasattr(conferences, 'to_dict'):
+            conferences = [conferences]
+
+        os.makedirs(os.path.join(self.output_dir, 'images'), exist_ok=True)
+        manifest = self._load_manifest()
+        old_pages = manifest['pages']
+        new_pages = {}
+        stats = {'written': 0, 'unchanged': 0, 'images': 0}
+
+        # Plan every talk page and find which ones changed
+        planned = []  # (talk, date, path)
+        jobs = []  # (talk, date, path, related links) of the changed pages
+        site_paths = {}  # Talk URL -> page, for related talk links within the site
+        archive = []  # (slug, title, date, [(session_name, [(href, talk), ...]), ...])
+        for conference in conferences:
+            slug = conference_slug(conference)
+            date = extract_conference_date(conference)
+            os.makedirs(os.path.join(self.output_dir, slug), exist_ok=True)
+
+            sessions = []
+            current_session = None
+            for i, talk in enumerate(conference.get('talks', []), 1):
+                session_number, session_name = talk_session(talk)
+                if not sessions or (session_number != current_session and session_number != '0'):
+                    current_session = session_number
+                    name = session_name if session_number != '0' else 'Talks'
+                    sessions.append((name, []))
+
+                path = f"{slug}/{talk_slug(talk, i)}.html"
+                sessions[-1][1].append((path, talk))
+                planned.append((talk, date, path))
+                if talk.get('url'):
+                    site_paths[talk['url']] = path
+
+            archive.append((slug, conference.get('conference_title', slug), date, sessions))
+
+        for talk, date, path in planned:
+            related = self._related_links(talk, site_paths)
+            talk_hash = _talk_hash(talk, date, related)
+            new_pages[path] = talk_hash
+            if old_pages.get(path) == talk_hash and os.path.exists(os.path.join(self.output_dir, path)):
+                stats['unchanged'] += 1
+            else:
+                jobs.append((talk, date, path, related))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Responsive variants for images that changed pages use and we haven't made yet
+            images = manifest['images']
+            new_urls = sorted({item['url'] for talk, _, _, _ in jobs
+                               for item in talk.get('structured_content', [])
+                               if item['type'] == 'image' and item.get('url') and item['url'] not in images})
+            if self.progress:
+                self.progress.start('images', total=len(new_urls), unit='images')
+            for url, variants in zip(new_urls, pool.map(self._make_image_variants, new_urls)):
+                if variants:
+                    images[url] = variants
+                    stats['images'] += 1
+                if self.progress:
+                    self.progress.advance('images', item=url)
+            if self.progress:
+                self.progress.finish('images')
+                self.progress.start('render', total=len(jobs), unit='pages')
+
+            # Render and write the changed talk pages in parallel
+            def write_page(job):
+                talk, date, path, related = job
+                slug = path.split('/', 1)[0]
+                nav = f'<a href="index.html">{escape(date or slug)}</a>'
+                page = self._talk_page(talk, date, images, nav, related)
+                with open(os.path.join(self.output_dir, path), 'w', encoding='utf-8') as f:
+                    f.write(page)
+                self._log(f"  Wrote {path}")
+                if self.progress:
+                    self.progress.advance('render', item=path)
+
+            list(pool.map(write_page, jobs))
+            stats['written'] = len(jobs)
+            if self.progress:
+                self.progress.finish('render')
+
+        self._write_indexes(archive)
+        self._write_search_index(archive)
+
+        manifest['pages'] = {**old_pages, **new_pages}
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        self._log(f"\nSite exported to {self.output_dir}: {stats['written']} page(s) written, "
+                  f"{stats['unchanged']} unchanged, {stats['images']} new image(s)", 'info')
+        return stats
+
+    def _write_indexes(self, archive: List):
+        """Write the per-conference session indexes, the archive index and shared assets"""
+        _write_if_changed(os.path.join(self.output_dir, 'style.css'), STYLESHEET)
+        _write_if_changed(os.path.join(self.output_dir, 'search.js'), SEARCH_SCRIPT)
+
+        for slug, title, date, sessions in archive:
+            html = [f'<h1>{escape(title)}</h1>\n']
+            for session_name, talks in sessions:
+                html.append(f'<h2>{escape(session_name)}</h2>\n<ul>\n')
+                for path, talk in talks:
+                    href = path.split('/', 1)[1]
+                    html.append(f'<li><a href="{href}">{escape(talk.get("title", "Untitled"))}</a> '
+                                f'&mdash; {escape(talk.get("speaker", "Unknown"))}</li>\n')
+                html.append('</ul>\n')
+            page = PAGE_TEMPLATE.format(title=escape(title), root='../', nav='', body=''.join(html))
+            _write_if_changed(os.path.join(self.output_dir, slug, 'index.html'), page)
+
+        # Archive index: newest conferences first, merged with any exported earlier
+        index_path = os.path.join(self.output_dir, 'conferences.json')
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                known = {entry[0]: entry for entry in json.load(f)}
+        except (FileNotFoundError, ValueError):
+            known = {}
+        for slug, title, date, _ in archive:
+            known[slug] = [slug, title, date]
+        entries = sorted(known.values(), reverse=True)
+        _write_if_changed(index_path, json.dumps(entries, indent=2))
+
+        html = ['<h1>General Conference</h1>\n',
+                '<input id="search" type="search" placeholder="Search talks" data-root="">\n<ul id="results"></ul>\n',
+                '<h2>Conferences</h2>\n<ul>\n']
+        for slug, title, date in entries:
+            html.append(f'<li><a href="{slug}/index.html">{escape(title)}</a></li>\n')
+        html.append('</ul>\n<script src="search.js"></script>\n')
+        page = PAGE_TEMPLATE.format(title='General Conference', root='', nav='', body=''.join(html))
+        _write_if_changed(os.path.join(self.output_dir, 'index.html'), page)
+
+    def _write_search_index(self, archive: List):
+        """Build the inverted index the search box uses: term -> sorted document ids
+
+        Documents from earlier exports of other conferences are kept, so an
+        archive can be exported one conference at a time.
+        """
+        index_path = os.path.join(self.output_dir, 'search-index.json')
+        exported = {slug for slug, _, _, _ in archive}
+        docs, doc_terms = [], []
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            kept = {}
+            for doc_id, doc in enumerate(previous['docs']):
+                if doc[0].split('/', 1)[0] not in exported:
+                    kept[doc_id] = len(docs)
+                    docs.append(doc)
+                    doc_terms.append(set())
+            for term, postings in previous['terms'].items():
+                for doc_id in postings:
+                    if doc_id in kept:
+                        doc_terms[kept[doc_id]].add(term)
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        for slug, title, date, sessions in archive:
+            for _, talks in sessions:
+                for path, talk in talks:
+                    docs.append([path, talk.get('title', 'Untitled'), talk.get('speaker', 'Unknown'), date or title])
+                    doc_terms.append(self._index_terms(talk))
+
+        terms = {}
+        for doc_id, words in enumerate(doc_terms):
+            for word in words:
+                terms.setdefault(word, []).append(doc_id)
+
+        index = {'docs': docs, 'terms': dict(sorted(terms.items()))}
+        _write_if_changed(index_path, json.dumps(index, separators=(',', ':')))
+
+
+def main():
+    """Main function for exporting a static site from JSON files"""
+    progress = progress_from_argv(sys.argv)
+    related = related_from_argv(sys.argv)
+    if len(sys.argv) < 3:
+        print("Usage: python html_exporter.py [--progress human|quiet|jsonl] [--related FILE] "
+              "<output_dir> <conference_data.json> [more_data.json ...]")
+        sys.exit(1)
+
+    output_dir = sys.argv[1]
+    conferences = []
+    for input_file in sys.argv[2:]:
+        if not progress:
+            print(f"Loading conference data from: {input_file}")
+        conferences.append(load_conference(input_file))
+
+    StaticSiteExporter(output_dir, related=related, progress=progress).export(conferences)
+    if progress:
+        progress.close()
+
+
+if __name__ == '__main__':
+    main()
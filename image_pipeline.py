@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Image Preparation for Embedding in Output Documents
+
+Downloaded talk images are usually much larger than they are shown. This
+module turns an image's bytes into a stream that is ready to embed at its
+display size, decoding each image at most once:
+
+    - the display size comes from the declared width/height when the API
+      supplied them, else from the image header (no pixel decode)
+    - JPEGs that are already small enough are passed through untouched;
+      ReportLab embeds JPEG data as is, so they are never decoded at all
+    - anything else is decoded once (JPEGs at a reduced scale via PIL's
+      draft mode), flattened onto white, converted to the output colour
+      space and resized in the same step, then re-encoded as JPEG
+    - for e-ink output, grayscale images can instead be dithered down to
+      1, 2 or 4 bits per pixel and stored losslessly (Flate), which a slow
+      reader draws much faster than a JPEG
+
+Prepared images can be kept in a PreparedImageStore on disk, so later runs
+skip the work entirely, and an ImageDeduplicator maps images seen before
+(same bytes, or optionally the same picture re-encoded or resized) to the
+PreparedImage already made for them, so a document embeds each image once.
+"""
+
+import io
+import os
+import math
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from PIL import Image as PILImage
+
+
+# Resolution images are resampled to for print (pixels per inch)
+DEFAULT_DPI = 150
+
+# Pass JPEGs through unchanged unless they are this much larger than needed
+PASSTHROUGH_SLACK = 1.5
+
+JPEG_QUALITY = 85
+
+# Gray levels below 8 bits per pixel that PDF (and PIL's packers) support
+QUANTIZE_BITS = (1, 2, 4)
+
+COLOR_SPACES = {'RGB': 'DeviceRGB', 'L': 'DeviceGray'}
+
+
+class PreparedImage:
+    """An encoded image stream ready to embed as a PDF image XObject
+
+    filter is 'DCTDecode' (data is a JPEG file) or 'FlateDecode' (data is
+    zlib-compressed samples, bits per pixel, rows padded to whole bytes).
+    """
+
+    __slots__ = ('data', 'width', 'height', 'color_space', 'bits', 'filter')
+
+    def __init__(self, data: bytes, width: int, height: int, color_space: str = 'DeviceRGB',
+                 bits: int = 8, filter: str = 'DCTDecode'):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.color_space = color_space
+        self.bits = bits
+        self.filter = filter
+
+    def to_bytes(self) -> bytes:
+        """Serialize as a one-line header followed by the stream"""
+        header = f"{self.filter} {self.color_space} {self.bits} {self.width} {self.height}\n"
+        return header.encode('ascii') + self.data
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> 'PreparedImage':
+        header, _, data = blob.partition(b'\n')
+        filter_name, color_space, bits, width, height = header.decode('ascii').split()
+        return cls(data, int(width), int(height), color_space, int(bits), filter_name)
+
+
+class PreparedImageStore:
+    """Prepared images kept on disk, shared across runs (and processes)
+
+    Entries are keyed by the source image's content plus every setting that
+    affects the result, so a changed image or profile never hits a stale entry.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data: bytes, *settings) -> str:
+        digest = hashlib.sha1(data)
+        digest.update(repr(settings).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[PreparedImage]:
+        try:
+            with open(os.path.join(self.directory, key), 'rb') as f:
+                return PreparedImage.from_bytes(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, image: PreparedImage):
+        path = os.path.join(self.directory, key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(image.to_bytes())
+        os.replace(tmp_path, path)
+
+
+def declared_size(image_info: Dict) -> Optional[Tuple[int, int]]:
+    """(width, height) in pixels as declared by the content API, if usable"""
+    try:
+        width = int(image_info.get('width') or 0)
+        height = int(image_info.get('height') or 0)
+    except (TypeError, ValueError):
+        return None
+    if width > 0 and height > 0:
+        return width, height
+    return None
+
+
+def fit_size(width: float, height: float, max_width: float, max_height: float) -> Tuple[float, float]:
+    """Scale (width, height) down (never up) to fit the box, keeping the aspect ratio"""
+    width_scale = max_width / width if width > max_width else 1.0
+    height_scale = max_height / height if height > max_height else 1.0
+    scale = min(width_scale, height_scale)
+    return width * scale, height * scale
+
+
+def _flatten(image: PILImage.Image, mode: str) -> PILImage.Image:
+    """Convert to mode ('RGB' or 'L'), compositing any transparency onto white"""
+    if image.mode == 'P':
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    if image.mode in ('RGBA', 'LA'):
+        background = PILImage.new('RGB', image.size, 'white')
+        background.paste(image.convert('RGBA'), mask=image.getchannel('A'))
+        image = background
+    if image.mode != mode:
+        image = image.convert(mode)
+    return image
+
+
+def perceptual_hash(data: bytes) -> int:
+    """64-bit difference hash: images that look the same (re-encoded, resized) differ in a few bits
+
+    JPEGs are decoded at 1/8 scale at most, so this is much cheaper than a full decode.
+    """
+    image = PILImage.open(io.BytesIO(data))
+    if image.format == 'JPEG':
+        image.draft('L', (64, 64))
+    small = _flatten(image, 'L').resize((9, 8), PILImage.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return value
+
+
+def _hash_bands(bands: int, bits: int = 64) -> List[Tuple[int, int]]:
+    """(shift, mask) of each of bands near-equal slices of a bits-bit hash"""
+    slices, shift = [], 0
+    for band in range(bands):
+        width = bits // bands + (band < bits % bands)
+        slices.append((shift, (1 << width) - 1))
+        shift += width
+    return slices
+
+
+class ImageDeduplicator:
+    """Maps images seen before to the PreparedImage made for them
+
+    Images match when their bytes are identical (content hash) or, with
+    perceptual=True, when their perceptual hashes are at most max_distance
+    bits apart and their aspect ratios agree. Matches are only made between
+    images prepared with the same settings (e.g. profile and display size).
+    Thread safe, since images are prepared in worker threads.
+
+    Perceptual hashes are indexed by max_distance + 1 slices: two hashes that
+    close agree exactly on at least one slice, so a lookup only compares the
+    images sharing a slice with it. With max_bytes, the least recently used
+    images are forgotten once their prepared streams add up to more (a
+    long-running service); by default every image is kept.
+    """
+
+    def __init__(self, perceptual: bool = False, max_distance: int = 4, max_bytes: Optional[int] = None):
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        # (sha1 of the bytes, settings) -> (PreparedImage, its look entry or None), least recently used first
+        self.by_content = OrderedDict()
+        # (slice, slice bits, settings) -> [(perceptual hash, aspect ratio, settings, PreparedImage)]
+        self.by_look = {}
+        self._bands = _hash_bands(max_distance + 1)
+        self.content_matches = 0
+        self.perceptual_matches = 0
+        self._lock = threading.Lock()
+
+    def _look_keys(self, look: int, settings):
+        return [(band, (look >> shift) & mask, settings) for band, (shift, mask) in enumerate(self._bands)]
+
+    def _similar(self, look: int, aspect: float, settings) -> Optional[PreparedImage]:
+        for key in self._look_keys(look, settings):
+            for other_look, other_aspect, _, prepared in self.by_look.get(key, ()):
+                if abs(other_aspect - aspect) <= 0.01 * aspect and bin(other_look ^ look).count('1') <= self.max_distance:
+                    return prepared
+        return None
+
+    def _remember(self, content_key, prepared: PreparedImage, entry=None):
+        if content_key in self.by_content:
+            return
+        self.by_content[content_key] = (prepared, entry)
+        self.total_bytes += len(prepared.data)
+        if entry is not None:
+            for key in self._look_keys(entry[0], entry[2]):
+                self.by_look.setdefault(key, []).append(entry)
+        while self.max_bytes is not None and self.total_bytes > self.max_bytes and len(self.by_content) > 1:
+            _, (evicted, evicted_entry) = self.by_content.popitem(last=False)
+            self.total_bytes -= len(evicted.data)
+            if evicted_entry is not None:
+                for key in self._look_keys(evicted_entry[0], evicted_entry[2]):
+                    entries = self.by_look[key]
+                    entries.remove(evicted_entry)
+                    if not entries:
+                        del self.by_look[key]
+
+    def get_or_prepare(self, data: bytes, aspect: float, settings, prepare) -> PreparedImage:
+        """The PreparedImage of a matching image seen before, else prepare() (and remember it)"""
+        content_key = (hashlib.sha1(data).hexdigest(), settings)
+        with self._lock:
+            known = self.by_content.get(content_key)
+            if known is not None:
+                self.by_content.move_to_end(content_key)
+                self.content_matches += 1
+                return known[0]
+
+        look = None
+        if self.perceptual:
+            look = perceptual_hash(data)
+            with self._lock:
+                prepared = self._similar(look, aspect, settings)
+                if prepared is not None:
+                    self.perceptual_matches += 1
+                    self._remember(content_key, prepared)
+                    return prepared
+
+        prepared = prepare()
+        with self._lock:
+            self._remember(content_key, prepared, (look, aspect, settings, prepared) if look is not None else None)
+        return prepared
+
+
+class PreparedImageCache(OrderedDict):
+    """(url, max width, max height) -> (PreparedImage, width, height) or None, bounded like ImageCache
+
+    A drop-in for a generator's prepared_images dict when it lives as long as
+    a service: the least recently used entries go once the prepared streams
+    add up to more than max_bytes. get() is the thread safe way to read it.
+    """
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(entry) -> int:
+        return len(entry[0].data) if entry else 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            self.move_to_end(key)
+            return super().__getitem__(key)
+
+    def __setitem__(self, key, entry):
+        with self._lock:
+            if key in self:
+                self.total_bytes -= self._size(super().__getitem__(key))
+            super().__setitem__(key, entry)
+            self.total_bytes += self._size(entry)
+            while self.total_bytes > self.max_bytes and len(self) > 1:
+                _, evicted = self.popitem(last=False)
+                self.total_bytes -= self._size(evicted)
+
+
+def quantize_gray(image: PILImage.Image, bits: int) -> bytes:
+    """Dither a grayscale image to 2**bits evenly spaced levels and pack the samples
+
+    Returns the samples as PDF expects them for BitsPerComponent bits:
+    left to right, each row padded to a whole byte, 0 = black.
+    """
+    if bits not in QUANTIZE_BITS:
+        raise ValueError(f"Unsupported bit depth: {bits} (expected one of {QUANTIZE_BITS})")
+    levels = 2 ** bits
+    palette = PILImage.new('P', (1, 1))
+    palette.putpalette([round(i * 255 / (levels - 1)) for i in range(levels) for _ in range(3)])
+    # Palette index i is gray level i, so the packed indices are the samples
+    quantized = image.convert('RGB').quantize(palette=palette, dither=PILImage.Dither.FLOYDSTEINBERG)
+    return quantized.tobytes('raw', f'P;{bits}')
+
+
+def prepare_image(data: bytes, display_width: float, display_height: float, dpi: int = DEFAULT_DPI,
+                  mode: str = 'RGB', bits: int = 8, quality: int = JPEG_QUALITY) -> PreparedImage:
+    """Prepare an image for display at display_width x display_height points at dpi
+
+    With bits=8 the result is a JPEG in mode ('RGB' or 'L'); fewer bits give
+    dithered grayscale samples, Flate compressed. The input is decoded at most
+    once, and not at all when it is already a suitable JPEG (in the requested
+    mode and not much larger than needed).
+    """
+    if bits != 8:
+        mode = 'L'
+    target = (max(1, math.ceil(display_width / 72 * dpi)), max(1, math.ceil(display_height / 72 * dpi)))
+    image = PILImage.open(io.BytesIO(data))  # Reads the header only
+
+    if (bits == 8 and image.format == 'JPEG' and image.mode == mode
+            and image.width <= target[0] * PASSTHROUGH_SLACK and image.height <= target[1] * PASSTHROUGH_SLACK):
+        return PreparedImage(data, image.width, image.height, COLOR_SPACES[mode])
+
+    if image.format == 'JPEG':
+        # Let the decoder skip detail that resizing would throw away anyway
+        image.draft(mode if mode in ('RGB', 'L') else None, target)
+    image = _flatten(image, mode)
+    if image.width > target[0] or image.height > target[1]:
+        image.thumbnail(target, PILImage.LANCZOS, reducing_gap=3.0)
+
+    if bits != 8:
+        samples = zlib.compress(quantize_gray(image, bits))
+        return PreparedImage(samples, image.width, image.height, 'DeviceGray', bits, 'FlateDecode')
+
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=quality)
+    return PreparedImage(output.getvalue(), image.width, image.height, COLOR_SPACES[mode])
+
+
+def image_store_from_argv(argv) -> Optional[PreparedImageStore]:
+    """Remove '--image-cache DIR' (or '--image-cache=DIR') from argv and open the store
+
+    Returns None when the option isn't given, so images are prepared on every run.
+    """
+    for i, arg in enumerate(argv):
+        if arg == '--image-cache' and i + 1 < len(argv):
+            directory = argv[i + 1]
+            del argv[i:i + 2]
+            return PreparedImageStore(directory)
+        if arg.startswith('--image-cache='):
+            del argv[i]
+            return PreparedImageStore(arg.split('=', 1)[1])
+    return None
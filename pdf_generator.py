@@ -13,29 +13,46 @@ A4 = (612,792) # A4 size in points (8.5x11 inches) US Letter
 B5 = (498, 708) # B5 paper, I found this to work great digitally
 PAGE_SIZE = A4
 from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image, Frame, PageTemplate, Flowable
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Frame, PageTemplate, Flowable
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfdoc import PDFImageXObject
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas as pdfgen_canvas
-import json
 import sys
 import re
-import urllib.request
 import io
+import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from PIL import Image as PILImage
+from talk_model import Conference, load_conference
+from content_utils import (extract_conference_date, extract_session_number, get_session_name,
+                           split_into_paragraphs, should_skip_paragraph, iter_talk_blocks,
+                           footnote_number, talk_session)
+from talk_index import build_speaker_index, build_topic_index
+from progress import progress_from_argv
+from profiling import profiled, profiler_from_argv, stage
+from related_talks import RelatedTalks, related_from_argv
+from text_metrics import measuring_text, shared_text_measurer
+from pdf_linearize import describe as describe_linearized, linearize_pdf, require_linearize_backend
+from fetchers import HTTPFetcher
+from image_pipeline import (ImageDeduplicator, PreparedImage, PreparedImageStore, declared_size, fit_size,
+                            image_store_from_argv, prepare_image)
+from render_profile import RenderProfile, color_profile, profile_from_argv
 
 
 class BookmarkFlowable(Flowable):
     """A flowable that adds a bookmark to the PDF outline"""
 
-    def __init__(self, key, title, level=0):
+    def __init__(self, key, title, level=0, header=None):
         Flowable.__init__(self)
         self.key = key
         self.title = title
         self.level = level
+        self.header = header  # (left, right) running header text from here on, if any
         self.height = 0
         self.width = 0
 
@@ -45,19 +62,292 @@ class BookmarkFlowable(Flowable):
         self.canv.addOutlineEntry(self.title, self.key, self.level, closed=False)
 
 
-class ConferencePDFGenerator:
-    """Generates formatted PDF from conference data"""
+class TOCEntryFlowable(Flowable):
+    """A table of contents line whose page number is filled in after layout
+
+    The number is drawn by referencing a form XObject (see
+    ConferenceDocTemplate.define_page_refs) that is only defined once the
+    whole document has been laid out, so a single build gives exact numbers.
+    """
+
+    def __init__(self, text: str, style: ParagraphStyle, key: str):
+        Flowable.__init__(self)
+        self.key = key
+        self.style = style
+        self.para = Paragraph(text, style)
+        self.number_width = 36  # Space reserved for the page number column
+
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        _, self.height = self.para.wrap(availWidth - self.number_width, availHeight)
+        return self.width, self.height
+
+    def draw(self):
+        self.para.drawOn(self.canv, 0, 0)
+        # Page number right-aligned on the last line's baseline
+        self.canv.saveState()
+        self.canv.translate(self.width, self.style.leading - self.style.fontSize)
+        self.canv.doForm(page_ref_form_name(self.key))
+        self.canv.restoreState()
+        # Make the whole entry a link to the bookmark
+        self.canv.linkRect('', self.key, (0, 0, self.width, self.height), relative=1)
+
+
+class PreparedImageFlowable(Flowable):
+    """An image drawn from a PreparedImage, whose stream is embedded as is
+
+    ReportLab's Image flowable decodes in-memory images on every draw (to
+    digest and re-encode the pixels); this one copies the already encoded
+    stream into the PDF, once per document however often it is drawn.
+    """
+
+    def __init__(self, image: PreparedImage, width: float, height: float):
+        Flowable.__init__(self)
+        self.image = image
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = 'CENTER'
+        self.name = f"img_{hashlib.sha1(image.data).hexdigest()}"
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def _xobject(self) -> PDFImageXObject:
+        image = self.image
+        xobject = PDFImageXObject(self.name)
+        xobject.width, xobject.height = image.width, image.height
+        xobject.colorSpace = image.color_space
+        xobject.bitsPerComponent = image.bits
+        # Binary as is: ASCII85 (ReportLab's default for images) adds a quarter
+        # to the size and takes longer to encode than the rest of the page.
+        # _filters is a ReportLab internal (see requirements.txt for the tested versions)
+        xobject.streamContent = image.data
+        xobject._filters = (image.filter,)
+        xobject.mask = None
+        return xobject
+
+    def draw(self):
+        # Registers the XObject as canvas.drawImage does, through ReportLab internals
+        # (_doc, _code, _formsinuse) with no public equivalent; see requirements.txt
+        canv = self.canv
+        reg_name = canv._doc.getXObjectName(self.name)
+        if reg_name not in canv._doc.idToObject:
+            xobject = self._xobject()
+            canv._doc.Reference(xobject, reg_name)
+            canv._doc.addForm(self.name, xobject)
+        canv.saveState()
+        canv.scale(self.drawWidth, self.drawHeight)
+        canv._code.append(f"/{reg_name} Do")
+        canv.restoreState()
+        canv._formsinuse.append(self.name)
+
+
+def page_ref_form_name(key: str) -> str:
+    """Name of the form XObject holding the page number of a bookmark key"""
+    return f"pageref_{key}"
+
+
+class DocumentCanvas(pdfgen_canvas.Canvas):
+    """Canvas that can draw once layout is finished, just before the file is written"""
+
+    def __init__(self, *args, **kwargs):
+        pdfgen_canvas.Canvas.__init__(self, *args, **kwargs)
+        self.before_save = None  # Called as before_save(canvas) by save()
+
+    def save(self):
+        if self.before_save:
+            self.before_save(self)
+        pdfgen_canvas.Canvas.save(self)
+
+
+class ConferenceDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that records bookmark pages and supports page-end drawing"""
+
+    def __init__(self, *args, first_page_number: int = 1, **kwargs):
+        SimpleDocTemplate.__init__(self, *args, **kwargs)
+        self.first_page_number = first_page_number  # Number of the first page (>1 for spliced-in parts)
+        self.bookmark_pages = {}  # Bookmark key -> page number
+        self.on_page_end = None  # Called as on_page_end(canvas, doc) before each page is shown
+        self.on_layout_end = None  # Called as on_layout_end(canvas, doc) after the last page, before saving
+        self.current_header = None  # (left, right) running header of the talk being laid out
+        self.current_header_page = None  # Page the current talk (or session page) started on
+        self.image_uses = {}  # XObject name -> [stream bytes, times drawn]
+        self.text_measurer = None  # Measures words for paragraph wrapping during build (see text_metrics.py)
+
+    def build(self, flowables, **kwargs):
+        kwargs.setdefault('canvasmaker', DocumentCanvas)
+        with measuring_text(self.text_measurer):
+            SimpleDocTemplate.build(self, flowables, **kwargs)
+
+    def beforeDocument(self):
+        if self.on_layout_end:
+            self.canv.before_save = lambda canv: self.on_layout_end(canv, self)
+        # The canvas counts from 1 and increments after each page; it has no public
+        # way to start elsewhere, so this sets the internal counter (see requirements.txt)
+        self.canv._pageNumber = self.first_page_number
+
+    def afterFlowable(self, flowable):
+        if isinstance(flowable, PreparedImageFlowable):
+            uses = self.image_uses.setdefault(flowable.name, [len(flowable.image.data), 0])
+            uses[1] += 1
+        elif isinstance(flowable, BookmarkFlowable):
+            page = self.canv.getPageNumber()
+            self.bookmark_pages[flowable.key] = page
+            self.current_header_page = page
+            self.current_header = flowable.header
+
+    def afterPage(self):
+        if self.on_page_end:
+            self.on_page_end(self.canv, self)
+
+    def define_page_refs(self, keys: Iterable[str], font_name: str, font_size: float):
+        """Define the page number forms referenced by TOCEntryFlowables"""
+        canv = self.canv
+        for key in keys:
+            page = self.bookmark_pages.get(key)
+            canv.beginForm(page_ref_form_name(key), lowerx=-60, lowery=-4, upperx=1, uppery=font_size + 4)
+            canv.setFont(font_name, font_size)
+            canv.drawRightString(0, 0, str(page) if page else '')
+            canv.endForm()
+
+
+class StreamingStory(list):
+    """A story list that pulls flowables from an iterator as doc.build consumes it
+
+    doc.build pops flowables off the front of the story, so keeping only a
+    small read-ahead buffer filled lets layout start before the whole story
+    exists (e.g. while later talks are still being scraped).
+    """
+
+    def __init__(self, chunks, lookahead: int = 32):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._lookahead = lookahead  # Enough for keepWithNext look-ahead
+
+    def _fill(self):
+        while self._chunks is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.extend(next(self._chunks))
+            except StopIteration:
+                self._chunks = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+# Marks a prepared_images miss (None means the image failed to prepare)
+_NOT_PREPARED = object()
 
-    def __init__(self, conference_data: Dict):
-        self.conference_data = conference_data
+
+class ImageCache(OrderedDict):
+    """url -> BytesIO image cache that evicts the least recently used images
+
+    Keeps the total size under max_bytes, so a long compilation run can share
+    one cache across conferences without growing without bound.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __getitem__(self, url):
+        with self._lock:
+            self.move_to_end(url)
+            return super().__getitem__(url)
+
+    def get(self, url, default=None):
+        """The cached image, or default; safe when another thread may evict it"""
+        with self._lock:
+            if url not in self:
+                return default
+            self.move_to_end(url)
+            return super().__getitem__(url)
+
+    def __setitem__(self, url, buffer):
+        with self._lock:
+            if url in self:
+                self.total_bytes -= super().__getitem__(url).getbuffer().nbytes
+            super().__setitem__(url, buffer)
+            self.total_bytes += buffer.getbuffer().nbytes
+            # Evict oldest entries, always keeping the one just added
+            while self.total_bytes > self.max_bytes and len(self) > 1:
+                _, evicted = self.popitem(last=False)
+                self.total_bytes -= evicted.getbuffer().nbytes
+
+
+class ConferencePDFGenerator:
+    """Generates formatted PDF from conference data (a dict or a talk_model.Conference)"""
+
+    # (regular, bold, italic) font names, set by the first generator in the process
+    _fonts = None
+
+    def __init__(self, conference_data: Union[Dict, Conference, None] = None,
+                 image_cache: Optional[Dict] = None, progress=None, fetcher=None,
+                 profile: Optional[RenderProfile] = None, image_store: Optional[PreparedImageStore] = None,
+                 image_dedup: Optional[ImageDeduplicator] = None, related: Optional[RelatedTalks] = None,
+                 linearize: bool = False):
+        self.conference_data = conference_data if conference_data is not None else {}
+        self.progress = progress  # Optional progress.ProgressReporter
+        # Images are downloaded through the fetcher (see fetchers.py)
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher(timeout=10)
+        # Style colours and image settings for the target device (see render_profile.py)
+        self.profile = profile if profile is not None else color_profile()
         self.styles = getSampleStyleSheet()
         self._register_unicode_fonts()
+        # Word widths for paragraph wrapping, cached across talks and documents (see text_metrics.py)
+        self.text_measurer = shared_text_measurer()
         self._setup_custom_styles()
-        self.image_cache = {}  # Cache downloaded images
+        # Cache downloaded images (url -> BytesIO); pass an ImageCache to bound its size
+        self.image_cache = image_cache if image_cache is not None else {}
+        # (url, max width, max height) -> (PreparedImage, width, height) ready to embed
+        self.prepared_images = {}
+        # Optional on-disk store of prepared images, shared across runs
+        self.image_store = image_store
+        # Images already prepared under another URL (same bytes, or similar with perceptual=True)
+        self.image_dedup = image_dedup if image_dedup is not None else ImageDeduplicator()
+        self.image_report = None  # Image sharing figures of the last document built
+        # Optional neighbour table; each talk in it ends with links to its related talks
+        self.related = related
+        # Rewrite finished PDFs for fast first-page display (see pdf_linearize.py); fails early if it can't
+        if linearize:
+            require_linearize_backend()
+        self.linearize = linearize
+        self.linearize_report = None  # Sizes before and after linearizing the last document
+        self.bookmark_pages = {}  # Bookmark key -> page number in the last document built
+        self.page_count = 0  # Pages of the last document built
         self.conference_date = self._extract_conference_date()
+        # Bookmark keys and outline levels; compilations nest each conference one level down
+        self._key_prefix = ''
+        self._outline_level = 0
+
+    def _color(self, hex_color: str) -> colors.Color:
+        """A style colour, as mapped by the rendering profile"""
+        return colors.HexColor(self.profile.color(hex_color))
+
+    def _log(self, message: str, level: Optional[str] = None):
+        """Print a message, or hand it to the progress reporter if there is one
+
+        Messages without a level are per-item details, which the reporter's
+        counters replace.
+        """
+        if not self.progress:
+            print(message)
+        elif level:
+            self.progress.log(message.strip(), level)
 
     def _register_unicode_fonts(self):
         """Register Unicode-compatible fonts for supporting non-Latin characters"""
+        # Font files are parsed and registered once per process
+        if ConferencePDFGenerator._fonts:
+            self.font_regular, self.font_bold, self.font_italic = ConferencePDFGenerator._fonts
+            return
         try:
             # Try to register DejaVu Sans fonts (commonly available on most systems)
             # These fonts support a wide range of Unicode characters including Hebrew, Greek, etc.
@@ -90,7 +380,7 @@ class ConferencePDFGenerator:
                 self.font_bold = 'DejaVuSans-Bold'
                 self.font_italic = 'DejaVuSerif-Italic'
                 fonts_registered = True
-                print("Using DejaVu fonts for Unicode support")
+                self._log("Using DejaVu fonts for Unicode support", 'info')
             except:
                 pass
 
@@ -102,49 +392,28 @@ class ConferencePDFGenerator:
                     self.font_bold = 'ArialUnicode'
                     self.font_italic = 'ArialUnicode'
                     fonts_registered = True
-                    print("Using Arial Unicode font for Unicode support")
+                    self._log("Using Arial Unicode font for Unicode support", 'info')
                 except:
                     pass
 
             # Fallback to standard fonts (won't support all Unicode)
             if not fonts_registered:
-                print("Warning: Could not load Unicode fonts. Non-Latin characters may not display correctly.")
+                self._log("Warning: Could not load Unicode fonts. Non-Latin characters may not display correctly.", 'warning')
                 self.font_regular = 'Times-Roman'
                 self.font_bold = 'Helvetica-Bold'
                 self.font_italic = 'Times-Italic'
 
         except Exception as e:
-            print(f"Warning: Error registering fonts: {e}")
+            self._log(f"Warning: Error registering fonts: {e}", 'warning')
             # Fallback to standard fonts
             self.font_regular = 'Times-Roman'
             self.font_bold = 'Helvetica-Bold'
             self.font_italic = 'Times-Italic'
+        ConferencePDFGenerator._fonts = (self.font_regular, self.font_bold, self.font_italic)
 
     def _extract_conference_date(self) -> str:
         """Extract conference date from conference title (e.g., 'April 2025')"""
-        conference_title = self.conference_data.get('conference_title', '')
-
-        # Try to extract month and year from title
-        # Expected format: "April 2025 General Conference" or similar
-        match = re.search(r'(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})', conference_title)
-        if match:
-            return f"{match.group(1)} {match.group(2)}"
-
-        # Fallback: try to get from first talk URL if available
-        talks = self.conference_data.get('talks', [])
-        if talks and 'url' in talks[0]:
-            url = talks[0]['url']
-            # URL format: .../general-conference/2025/04/...
-            match = re.search(r'/general-conference/(\d{4})/(\d{2})/', url)
-            if match:
-                year = match.group(1)
-                month_num = int(match.group(2))
-                months = ['', 'January', 'February', 'March', 'April', 'May', 'June',
-                         'July', 'August', 'September', 'October', 'November', 'December']
-                if 1 <= month_num <= 12:
-                    return f"{months[month_num]} {year}"
-
-        return ""
+        return extract_conference_date(self.conference_data)
 
     def _setup_custom_styles(self):
         """Setup custom paragraph styles for the PDF"""
@@ -154,7 +423,7 @@ class ConferencePDFGenerator:
             name='ConferenceTitle',
             parent=self.styles['Heading1'],
             fontSize=24,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=30,
             alignment=TA_CENTER,
             fontName=self.font_bold
@@ -165,7 +434,7 @@ class ConferencePDFGenerator:
             name='TalkTitle',
             parent=self.styles['Heading1'],
             fontSize=20,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=8,
             spaceBefore=0,
             alignment=TA_LEFT,
@@ -199,7 +468,7 @@ class ConferencePDFGenerator:
             name='ConferenceDate',
             parent=self.styles['Normal'],
             fontSize=11,
-            textColor=colors.HexColor('#5A7FA5'),
+            textColor=self._color('#5A7FA5'),
             spaceAfter=0,
             alignment=TA_LEFT,
             fontName=self.font_regular
@@ -211,7 +480,7 @@ class ConferencePDFGenerator:
             parent=self.styles['Normal'],
             fontSize=14,
             leading=15,
-            textColor=colors.HexColor('#486581'),
+            textColor=self._color('#486581'),
             alignment=TA_JUSTIFY,
             spaceAfter=10,
             fontName=self.font_italic
@@ -233,7 +502,7 @@ class ConferencePDFGenerator:
             name='SessionHeader',
             parent=self.styles['Heading2'],
             fontSize=14,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=12,
             spaceBefore=20,
             alignment=TA_LEFT,
@@ -245,7 +514,7 @@ class ConferencePDFGenerator:
             name='FootnoteTitle',
             parent=self.styles['Heading3'],
             fontSize=12,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=8,
             spaceBefore=0,
             alignment=TA_LEFT,
@@ -270,7 +539,7 @@ class ConferencePDFGenerator:
             name='ContentH2',
             parent=self.styles['Heading2'],
             fontSize=14,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=8,
             spaceBefore=16,
             alignment=TA_LEFT,
@@ -282,7 +551,7 @@ class ConferencePDFGenerator:
             name='ContentH3',
             parent=self.styles['Heading3'],
             fontSize=12,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=6,
             spaceBefore=12,
             alignment=TA_LEFT,
@@ -294,13 +563,74 @@ class ConferencePDFGenerator:
             name='ContentH4',
             parent=self.styles['Heading3'],
             fontSize=11,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             spaceAfter=5,
             spaceBefore=10,
             alignment=TA_LEFT,
             fontName=self.font_bold
         ))
-        
+
+        # Table of contents entries: sessions and the talks within them
+        self.styles.add(ParagraphStyle(
+            name='TOCSession',
+            parent=self.styles['Normal'],
+            fontSize=12,
+            leading=16,
+            textColor=self._color('#003366'),
+            spaceBefore=10,
+            spaceAfter=2,
+            fontName=self.font_bold
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='TOCEntry',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            leading=13,
+            leftIndent=14,
+            spaceAfter=3,
+            fontName=self.font_regular
+        ))
+
+        # Index appendix: letter headings, speaker/topic names and their talks
+        self.styles.add(ParagraphStyle(
+            name='IndexLetter',
+            parent=self.styles['Normal'],
+            fontSize=14,
+            leading=18,
+            textColor=self._color('#003366'),
+            spaceBefore=10,
+            spaceAfter=4,
+            fontName=self.font_bold
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='IndexName',
+            parent=self.styles['Normal'],
+            fontSize=10,
+            leading=13,
+            spaceBefore=4,
+            fontName=self.font_bold
+        ))
+
+        self.styles.add(ParagraphStyle(
+            name='IndexEntry',
+            parent=self.styles['TOCEntry'],
+            fontSize=9,
+            leading=11,
+            leftIndent=14,
+            spaceAfter=1
+        ))
+
+        # Running header and page footer
+        self.styles.add(ParagraphStyle(
+            name='RunningHeader',
+            parent=self.styles['Normal'],
+            fontSize=8,
+            textColor=self._color('#5A7FA5'),
+            fontName=self.font_regular
+        ))
+
     def _create_cover_page(self, story: List):
         """Create a cover page for the PDF with border and disclaimer"""
         # Add space from top to center content vertically
@@ -312,7 +642,7 @@ class ConferencePDFGenerator:
             parent=self.styles['Normal'],
             fontSize=36,
             alignment=TA_CENTER,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             fontName=self.font_bold,
             spaceAfter=36
         )
@@ -326,7 +656,7 @@ class ConferencePDFGenerator:
                 parent=self.styles['Normal'],
                 fontSize=24,
                 alignment=TA_CENTER,
-                textColor=colors.HexColor('#003366'),
+                textColor=self._color('#003366'),
                 fontName=self.font_regular
             )
             date_text = Paragraph(self.conference_date, date_style)
@@ -341,7 +671,7 @@ class ConferencePDFGenerator:
             parent=self.styles['Normal'],
             fontSize=8,
             alignment=TA_CENTER,
-            textColor=colors.HexColor('#E0E0E0'),  # Very light gray
+            textColor=self._color('#E0E0E0'),  # Very light gray
             fontName=self.font_regular
         )
         disclaimer = Paragraph("This is not an official church production", disclaimer_style)
@@ -352,8 +682,8 @@ class ConferencePDFGenerator:
 
     def _create_session_page(self, story: List, session_name: str, session_key: str):
         """Create a session header page"""
-        # Add bookmark marker for this session (level 0 = top level)
-        bookmark = BookmarkFlowable(session_key, session_name, level=0)
+        # Add bookmark marker for this session (top level, or under its conference)
+        bookmark = BookmarkFlowable(session_key, session_name, level=self._outline_level)
         story.append(bookmark)
 
         # Add some space from top
@@ -364,14 +694,14 @@ class ConferencePDFGenerator:
             name='SessionTitle',
             parent=self.styles['Heading1'],
             fontSize=28,
-            textColor=colors.HexColor('#003366'),
+            textColor=self._color('#003366'),
             alignment=TA_CENTER,
             fontName=self.font_bold,
             spaceAfter=12
         )
 
         # Session title
-        title = Paragraph(session_name, session_title_style)
+        title = Paragraph(self._clean_text_for_pdf(session_name), session_title_style)
         story.append(title)
 
         # Conference date below session title
@@ -381,7 +711,7 @@ class ConferencePDFGenerator:
                 parent=self.styles['Normal'],
                 fontSize=16,
                 alignment=TA_CENTER,
-                textColor=colors.HexColor('#5A7FA5'),
+                textColor=self._color('#5A7FA5'),
                 fontName=self.font_regular
             )
             date_text = Paragraph(self.conference_date, session_date_style)
@@ -392,54 +722,77 @@ class ConferencePDFGenerator:
 
     def _extract_session_number(self, talk_url: str) -> str:
         """Extract session number from talk URL"""
-        # URLs are like /study/general-conference/2025/04/13holland
-        # The first digit of the number indicates the session (1=Sat AM, 2=Sat PM, etc.)
-        match = re.search(r'/(\d+)[a-z]', talk_url)
-        if match:
-            full_number = match.group(1)
-            return full_number[0]  # Return first digit as session number
-        return '0'
+        return extract_session_number(talk_url)
 
     def _get_session_name(self, session_number: str) -> str:
         """Map session number to session name"""
-        session_names = {
-            '1': 'Saturday Morning Session',
-            '2': 'Saturday Afternoon Session',
-            '3': 'Sunday Evening Session',
-            '4': 'Sunday Morning Session',
-            '5': 'Sunday Afternoon Session'
-        }
-        return session_names.get(session_number, f'Session {session_number}')
+        return get_session_name(session_number)
         
-    def _create_table_of_contents(self, story: List):
-        """Create a table of contents"""
+    def _session_key(self, session_number: str) -> str:
+        """Bookmark key of a session, unique across a compilation"""
+        return f"{self._key_prefix}session_{session_number}"
+
+    def _talk_key(self, talk_number: int) -> str:
+        """Bookmark key of a talk, unique across a compilation"""
+        return f"{self._key_prefix}talk_{talk_number}"
+
+    def _session_for_talk(self, talk: Dict) -> Tuple[str, str]:
+        """(session_id, session_name) a talk belongs to; session_id is '0' if unknown"""
+        return talk_session(talk)
+
+    def _create_table_of_contents(self, story: List, talks: List[Dict]):
+        """Create a table of contents with session and talk page numbers"""
         toc_title = Paragraph("Table of Contents", self.styles['ConferenceTitle'])
         story.append(toc_title)
         story.append(Spacer(1, 0.3*inch))
-        
-        # Create TOC entries
-        toc_style = ParagraphStyle(
-            name='TOCEntry',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            leading=16,
-            leftIndent=20
-        )
-        
-        for i, talk in enumerate(self.conference_data['talks'], 1):
-            speaker = talk.get('speaker', 'Unknown')
-            title = talk.get('title', 'Untitled')
-            
-            toc_entry = f"{i}. <b>{title}</b> - {speaker}"
-            story.append(Paragraph(toc_entry, toc_style))
-            story.append(Spacer(1, 6))
-            
+
+        current_session = None
+        for i, talk in enumerate(talks, 1):
+            session_number, session_name = self._session_for_talk(talk)
+            if session_number != current_session and session_number != '0':
+                current_session = session_number
+                session_key = self._session_key(session_number)
+                session_name = self._clean_text_for_pdf(session_name)
+                story.append(TOCEntryFlowable(session_name, self.styles['TOCSession'], session_key))
+                self._page_ref_keys.add(session_key)
+
+            speaker = self._clean_text_for_pdf(talk.get('speaker', 'Unknown'))
+            title = self._clean_text_for_pdf(talk.get('title', 'Untitled'))
+            talk_key = self._talk_key(i)
+            story.append(TOCEntryFlowable(f"<b>{title}</b> - {speaker}", self.styles['TOCEntry'], talk_key))
+            self._page_ref_keys.add(talk_key)
+
         story.append(PageBreak())
-        
+
+    def _create_index_section(self, story: List, heading: str, key: str, index_map):
+        """Add one index (speakers or topics) built by talk_index to the story"""
+        story.append(BookmarkFlowable(key, heading, level=0))
+        story.append(Paragraph(heading, self.styles['ConferenceTitle']))
+
+        for initial, entries in index_map:
+            letter_para = Paragraph(initial, self.styles['IndexLetter'])
+            letter_para.keepWithNext = 1
+            story.append(letter_para)
+            for name, talks in entries:
+                name_para = Paragraph(self._clean_text_for_pdf(name), self.styles['IndexName'])
+                name_para.keepWithNext = 1
+                story.append(name_para)
+                for label, talk_key in talks:
+                    story.append(TOCEntryFlowable(self._clean_text_for_pdf(label), self.styles['IndexEntry'], talk_key))
+                    self._page_ref_keys.add(talk_key)
+
+        story.append(PageBreak())
+
+    def _create_index_appendix(self, story: List, indexed_talks: List, label_suffix=None):
+        """Create the speaker and topic index pages from (talk_key, talk) pairs"""
+        self._create_index_section(story, "Index of Speakers", "index_speakers",
+                                   build_speaker_index(indexed_talks, label_suffix))
+        self._create_index_section(story, "Index of Topics", "index_topics",
+                                   build_topic_index(indexed_talks, label_suffix))
+
     def _clean_text_for_pdf(self, text: str) -> str:
         """Clean and prepare text for PDF rendering"""
         # First, temporarily replace footnote markers to protect them
-        import re
         footnote_markers = {}
         footnote_pattern = r'\{\{FOOTNOTE:(\d+)\}\}'
 
@@ -460,53 +813,49 @@ class ConferencePDFGenerator:
         text = text.replace('\xa0', ' ')
 
         # Now restore footnote markers with proper formatting
+        marker_color = self.profile.color('#2D83AE')
         for marker_id, num in footnote_markers.items():
             # Use ReportLab's super tag for superscript with color
-            formatted_marker = f'<font size="1"> </font><super rise="3"><font color="#2D83AE" size="8">{num}</font></super>'
+            formatted_marker = f'<font size="1"> </font><super rise="3"><font color="{marker_color}" size="8">{num}</font></super>'
             text = text.replace(marker_id, formatted_marker)
 
         return text
         
     def _split_into_paragraphs(self, text: str) -> List[str]:
         """Split text into paragraphs"""
-        # Split by double newlines
-        paragraphs = text.split('\n\n')
-
-        # Clean up each paragraph
-        cleaned = []
-        for para in paragraphs:
-            para = para.strip()
-            if para:
-                # Replace single newlines with spaces
-                para = para.replace('\n', ' ')
-                # Remove extra spaces
-                para = ' '.join(para.split())
-                cleaned.append(para)
-
-        return cleaned
+        return split_into_paragraphs(text)
 
     def _download_image(self, url: str) -> Optional[io.BytesIO]:
         """Download an image from a URL and return as BytesIO"""
-        if url in self.image_cache:
-            return self.image_cache[url]
+        buffer = self.image_cache.get(url)
+        if buffer is not None:
+            return buffer
 
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
-            req = urllib.request.Request(url, headers=headers)
-
-            with urllib.request.urlopen(req, timeout=10) as response:
-                image_data = response.read()
-                image_buffer = io.BytesIO(image_data)
-                self.image_cache[url] = image_buffer
-                return image_buffer
+            image_data = self.fetcher.fetch(url)
+            image_buffer = io.BytesIO(image_data)
+            self.image_cache[url] = image_buffer
+            if self.progress:
+                self.progress.advance('images', nbytes=len(image_data))
+            return image_buffer
         except Exception as e:
-            print(f"    Warning: Failed to download image from {url}: {e}")
+            self._log(f"    Warning: Failed to download image from {url}: {e}", 'warning')
             return None
 
-    def _create_image_flowable(self, image_info: Dict, max_width: float = None, max_height: float = None) -> Optional[Image]:
-        """Create a ReportLab Image flowable from image info"""
+    def prefetch_images(self, talk: Dict):
+        """Download and prepare a talk's images (safe to call from worker threads)"""
+        for item in talk.get('structured_content', []):
+            if item['type'] == 'image' and item.get('url'):
+                self._prepare_image(item)
+
+    def _prepare_image(self, image_info: Dict, max_width: float = None,
+                       max_height: float = None) -> Optional[Tuple[PreparedImage, float, float]]:
+        """Return (PreparedImage, display width, display height) for an image
+
+        The display size comes from the declared width/height when present
+        (else the image header), and the image is decoded at most once, straight
+        to its final size (see image_pipeline). Results are cached per URL and size.
+        """
         # Calculate max dimensions based on B5 page size with margins
         # The actual frame size is smaller due to internal padding in SimpleDocTemplate
         # Frame is 378.0 x 588.0 points, so we use slightly smaller values to be safe
@@ -518,6 +867,11 @@ class ConferencePDFGenerator:
         url = image_info.get('url', '')
         if not url:
             return None
+        key = (url, max_width, max_height)
+        # One lookup: a service's PreparedImageCache may evict entries from other threads
+        prepared = self.prepared_images.get(key, _NOT_PREPARED)
+        if prepared is not _NOT_PREPARED:
+            return prepared
 
         # Download the image
         image_buffer = self._download_image(url)
@@ -525,93 +879,72 @@ class ConferencePDFGenerator:
             return None
 
         try:
-            # Reset buffer position
-            image_buffer.seek(0)
-
-            # Open with PIL to get dimensions
-            pil_image = PILImage.open(image_buffer)
-            img_width, img_height = pil_image.size
-
-            # Calculate scaling to fit within max dimensions while maintaining aspect ratio
-            width_scale = max_width / img_width if img_width > max_width else 1.0
-            height_scale = max_height / img_height if img_height > max_height else 1.0
-            scale = min(width_scale, height_scale)
-
-            display_width = img_width * scale
-            display_height = img_height * scale
-
-            # Reset buffer for ReportLab
-            image_buffer.seek(0)
-
-            # Create ReportLab Image
-            img = Image(image_buffer, width=display_width, height=display_height)
-
-            return img
+            image_data = image_buffer.getvalue()
+            size = declared_size(image_info)
+            if size is None:
+                size = PILImage.open(io.BytesIO(image_data)).size  # Header only, no decode
+
+            # Scale to fit within max dimensions while maintaining aspect ratio
+            display_width, display_height = fit_size(size[0], size[1], max_width, max_height)
+            prepared = (self._prepared_image(image_data, display_width, display_height),
+                        display_width, display_height)
         except Exception as e:
-            print(f"    Warning: Failed to process image: {e}")
+            self._log(f"    Warning: Failed to process image: {e}", 'warning')
+            prepared = None
+
+        self.prepared_images[key] = prepared
+        return prepared
+
+    def _prepared_image(self, image_data: bytes, display_width: float, display_height: float) -> PreparedImage:
+        """Prepare image data per the rendering profile, reusing the result for images seen before"""
+        settings = (self.profile.image_settings(), round(display_width), round(display_height))
+        return self.image_dedup.get_or_prepare(
+            image_data, display_width / display_height, settings,
+            lambda: self._prepare_new_image(image_data, display_width, display_height))
+
+    @profiled('prepare_image')
+    def _prepare_new_image(self, image_data: bytes, display_width: float, display_height: float) -> PreparedImage:
+        """Prepare image data per the rendering profile, via the image store if there is one"""
+        profile = self.profile
+        if self.image_store is not None:
+            store_key = self.image_store.key(image_data, round(display_width, 2), round(display_height, 2),
+                                             profile.image_settings())
+            prepared = self.image_store.get(store_key)
+            if prepared is not None:
+                return prepared
+        prepared = prepare_image(image_data, display_width, display_height, dpi=profile.image_dpi,
+                                 mode=profile.image_mode, bits=profile.image_bits)
+        if self.image_store is not None:
+            self.image_store.put(store_key, prepared)
+        return prepared
+
+    def _create_image_flowable(self, image_info: Dict, max_width: float = None,
+                               max_height: float = None) -> Optional['PreparedImageFlowable']:
+        """Create a flowable that embeds the prepared image"""
+        prepared = self._prepare_image(image_info, max_width, max_height)
+        if not prepared:
             return None
-        
-    def _should_skip_paragraph(self, para_text: str, title: str, speaker: str, author_role: str = None) -> bool:
-        """Check if a paragraph should be skipped (duplicate title/speaker info)"""
-        para_clean = para_text.strip().lower()
-        title_clean = title.strip().lower()
-        speaker_clean = speaker.strip().lower()
-
-        # Skip if paragraph matches title exactly
-        if para_clean == title_clean:
-            return True
 
-        # Skip if paragraph matches speaker name (with or without "By")
-        if para_clean == speaker_clean or para_clean == f"by {speaker_clean}":
-            return True
+        image, display_width, display_height = prepared
+        return PreparedImageFlowable(image, display_width, display_height)
 
-        # Skip if paragraph starts with "By" and contains speaker name
-        if para_clean.startswith("by ") and speaker_clean in para_clean:
-            return True
-
-        # Skip if paragraph matches the author role that was already displayed
-        if author_role:
-            author_role_clean = author_role.strip().lower()
-            if para_clean == author_role_clean:
-                return True
-
-        # Skip common role/title lines that appear after speaker name
-        role_keywords = [
-            'president of the church',
-            'first counselor in the first presidency',
-            'second counselor in the first presidency',
-            'acting president of the quorum of the twelve apostles',
-            'president of the quorum of the twelve apostles',
-            'of the quorum of the twelve apostles',
-            'of the seventy',
-            'first counselor in the',
-            'second counselor in the',
-            'presidency of the seventy',
-            'general authority seventy',
-            'young women general president',
-            'young men general president',
-            'primary general president',
-            'relief society general president',
-            'sunday school general president'
-        ]
-
-        for keyword in role_keywords:
-            if keyword in para_clean:
-                return True
-
-        return False
+    def _should_skip_paragraph(self, para_text: str, title: str, speaker: str, author_role: str = None) -> bool:
+        """Check if a paragraph should be skipped (duplicate title/speaker info)"""
+        return should_skip_paragraph(para_text, title, speaker, author_role)
 
+    @profiled('_add_talk_to_story')
     def _add_talk_to_story(self, story: List, talk: Dict, talk_number: int, parent_bookmark_key: str = None):
         """Add a single talk to the PDF story"""
 
         # Add bookmark marker for this talk (level 1 = nested under session)
         title = talk.get('title', 'Untitled')
         speaker = talk.get('speaker', 'Unknown')
-        talk_key = f"talk_{talk_number}"
+        talk_key = self._talk_key(talk_number)
         bookmark_title = f"{speaker}: {title}"
 
-        # Create bookmark as a child of the session (level 1)
-        bookmark = BookmarkFlowable(talk_key, bookmark_title, level=1)
+        # Create bookmark as a child of the session
+        bookmark = BookmarkFlowable(talk_key, bookmark_title, level=self._outline_level + 1,
+                                    header=(bookmark_title, self.conference_date))
         story.append(bookmark)
 
         # Talk title
@@ -636,102 +969,54 @@ class ConferencePDFGenerator:
 
         story.append(Spacer(1, 0.15*inch))
 
-        # Check if we have structured content (with images)
-        structured_content = talk.get('structured_content', [])
-
-        # Track if we've added the first paragraph (for highlight styling)
-        first_paragraph_added = False
-
-        if structured_content:
-            # Use structured content to preserve image and header positions
-            for item in structured_content:
-                if item['type'] == 'text':
-                    # Split text into paragraphs
-                    paragraphs = self._split_into_paragraphs(item['content'])
-                    for para_text in paragraphs:
-                        if para_text:
-                            # Skip duplicate title/speaker paragraphs
-                            if self._should_skip_paragraph(para_text, title, speaker, author_role):
-                                continue
-
-                            cleaned_text = self._clean_text_for_pdf(para_text)
-                            # Use highlight style for first paragraph, regular style for rest
-                            if not first_paragraph_added:
-                                para = Paragraph(cleaned_text, self.styles['TalkHighlight'])
-                                first_paragraph_added = True
-                            else:
-                                para = Paragraph(cleaned_text, self.styles['TalkBody'])
-                            story.append(para)
-
-                elif item['type'] == 'header':
-                    # Add header with appropriate style based on level
-                    header_text = item.get('content', '')
-                    header_level = item.get('level', 2)
-
-                    # Skip if header matches the talk title (duplicate)
-                    if header_text.strip().lower() == title.strip().lower():
-                        continue
-
-                    # Map header levels to styles (h1 is reserved for talk title)
-                    # h2 -> ContentH2, h3 -> ContentH3, h4+ -> ContentH4
-                    if header_level <= 2:
-                        style_name = 'ContentH2'
-                    elif header_level == 3:
-                        style_name = 'ContentH3'
-                    else:
-                        style_name = 'ContentH4'
-
-                    cleaned_text = self._clean_text_for_pdf(header_text)
-                    header_para = Paragraph(cleaned_text, self.styles[style_name])
-                    story.append(header_para)
-
-                    # Mark that we've passed the first content (headers come after intro)
-                    first_paragraph_added = True
-
-                elif item['type'] == 'image':
-                    # Add the image
-                    img_flowable = self._create_image_flowable(item)
-                    if img_flowable:
-                        story.append(Spacer(1, 0.15*inch))
-                        story.append(img_flowable)
-
-                        # Add caption from credit field if available
-                        caption = item.get('credit', '')
-                        if caption:
-                            caption_style = ParagraphStyle(
-                                name='ImageCaption',
-                                parent=self.styles['Normal'],
-                                fontSize=9,
-                                textColor=colors.HexColor('#666666'),
-                                alignment=TA_CENTER,
-                                spaceAfter=6,
-                                spaceBefore=3,
-                                fontName=self.font_italic
-                            )
-                            caption_para = Paragraph(self._clean_text_for_pdf(caption), caption_style)
-                            story.append(caption_para)
-
-                        story.append(Spacer(1, 0.15*inch))
-        else:
-            # Fallback to plain text content (for backward compatibility)
-            content = talk.get('content', '')
-            paragraphs = self._split_into_paragraphs(content)
-
-            first_content_para = False
-            for para_text in paragraphs:
-                if para_text:
-                    # Skip duplicate title/speaker paragraphs
-                    if self._should_skip_paragraph(para_text, title, speaker, author_role):
-                        continue
-
-                    cleaned_text = self._clean_text_for_pdf(para_text)
-                    # Use highlight style for first paragraph, regular style for rest
-                    if not first_content_para:
-                        para = Paragraph(cleaned_text, self.styles['TalkHighlight'])
-                        first_content_para = True
-                    else:
-                        para = Paragraph(cleaned_text, self.styles['TalkBody'])
-                    story.append(para)
+        # Walk the body (structured content keeps image and header positions)
+        for kind, value, extra in iter_talk_blocks(talk):
+            if kind == 'paragraph':
+                cleaned_text = self._clean_text_for_pdf(value)
+                # Use highlight style for first paragraph, regular style for rest
+                style_name = 'TalkHighlight' if extra else 'TalkBody'
+                story.append(Paragraph(cleaned_text, self.styles[style_name]))
+
+            elif kind == 'header':
+                # Map header levels to styles (h1 is reserved for talk title)
+                # h2 -> ContentH2, h3 -> ContentH3, h4+ -> ContentH4
+                header_text, header_level = value, extra
+                if header_level <= 2:
+                    style_name = 'ContentH2'
+                elif header_level == 3:
+                    style_name = 'ContentH3'
+                else:
+                    style_name = 'ContentH4'
+
+                cleaned_text = self._clean_text_for_pdf(header_text)
+                header_para = Paragraph(cleaned_text, self.styles[style_name])
+                story.append(header_para)
+
+            elif kind == 'image':
+                item = value
+                # Add the image
+                img_flowable = self._create_image_flowable(item)
+                if img_flowable:
+                    story.append(Spacer(1, 0.15*inch))
+                    story.append(img_flowable)
+
+                    # Add caption from credit field if available
+                    caption = item.get('credit', '')
+                    if caption:
+                        caption_style = ParagraphStyle(
+                            name='ImageCaption',
+                            parent=self.styles['Normal'],
+                            fontSize=9,
+                            textColor=self._color('#666666'),
+                            alignment=TA_CENTER,
+                            spaceAfter=6,
+                            spaceBefore=3,
+                            fontName=self.font_italic
+                        )
+                        caption_para = Paragraph(self._clean_text_for_pdf(caption), caption_style)
+                        story.append(caption_para)
+
+                    story.append(Spacer(1, 0.15*inch))
 
         # Add footnotes if present
         footnotes = talk.get('footnotes', [])
@@ -744,7 +1029,7 @@ class ConferencePDFGenerator:
 
             # Add each footnote
             for footnote in footnotes:
-                marker = footnote.get('marker', '').rstrip('.')  # Remove trailing period if present
+                marker = footnote_number(footnote)  # Marker without trailing period
                 text = footnote.get('text', '')
 
                 if marker and text:
@@ -754,15 +1039,45 @@ class ConferencePDFGenerator:
                     footnote_para = Paragraph(f"<b>{marker}.</b> {cleaned_text}", self.styles['FootnoteText'])
                     story.append(footnote_para)
 
+        if self.related:
+            self._add_related_talks(story, talk)
+
         # Page break after each talk
         story.append(PageBreak())
         
+    def _add_unavailable_talk(self, story: List, talk: Dict, talk_number: int):
+        """A page for a talk listed in the table of contents that failed to scrape"""
+        title = talk.get('title', 'Untitled')
+        speaker = talk.get('speaker', 'Unknown')
+        bookmark_title = f"{speaker}: {title}"
+        story.append(BookmarkFlowable(self._talk_key(talk_number), bookmark_title, level=self._outline_level + 1,
+                                      header=(bookmark_title, self.conference_date)))
+        story.append(Paragraph(self._clean_text_for_pdf(title), self.styles['TalkTitle']))
+        story.append(Paragraph(self._clean_text_for_pdf(f"By {speaker}"), self.styles['Speaker']))
+        story.append(Paragraph("This talk could not be downloaded.", self.styles['Normal']))
+        self._log(f"  Warning: talk {talk_number} ({bookmark_title}) is unavailable", 'warning')
+        story.append(PageBreak())
+
+    def _add_related_talks(self, story: List, talk: Dict):
+        """Links to the talk's related talks, from the precomputed neighbour table"""
+        related = self.related.get(talk.get('url', ''))
+        if not related:
+            return
+        story.append(Spacer(1, 0.3*inch))
+        story.append(Paragraph("Related Talks", self.styles['FootnoteTitle']))
+        link_color = self.profile.color('#003366')
+        for other in related:
+            link, title, speaker, conference = (self._clean_text_for_pdf(other[key])
+                                                for key in ('link', 'title', 'speaker', 'conference'))
+            story.append(Paragraph(f'<a href="{link}" color="{link_color}">{title}</a>, {speaker} ({conference})',
+                                   self.styles['FootnoteText']))
+
     def _draw_cover_border(self, canvas, doc):
         """Draw a decorative border on the cover page"""
         canvas.saveState()
 
         # Set border properties
-        canvas.setStrokeColor(colors.HexColor('#003366'))
+        canvas.setStrokeColor(self._color('#003366'))
         canvas.setLineWidth(2)
 
         # Draw border with some margin from page edges
@@ -785,81 +1100,337 @@ class ConferencePDFGenerator:
         self._draw_cover_border(canvas, doc)
 
     def _on_later_pages(self, canvas, doc):
-        """Callback for pages after the cover (no border)"""
-        pass
+        """Callback for pages after the cover: page number footer"""
+        canvas.saveState()
+        style = self.styles['RunningHeader']
+        canvas.setFont(style.fontName, style.fontSize)
+        canvas.setFillColor(style.textColor)
+        page_width, _ = PAGE_SIZE
+        canvas.drawCentredString(page_width / 2, 0.45*inch, str(canvas.getPageNumber()))
+        canvas.restoreState()
 
-    def generate_pdf(self, output_filename: str):
-        """Generate the PDF document"""
+    def _on_page_end(self, canvas, doc):
+        """Callback after a page's content: running header with the current talk
 
-        print(f"\nGenerating PDF: {output_filename}")
-        print("="*80)
+        Drawn at the end of the page because only then do we know whether a
+        new talk started on it (its first page already shows the title).
+        """
+        if not doc.current_header or doc.current_header_page == canvas.getPageNumber():
+            return
+        left, right = doc.current_header
+        canvas.saveState()
+        style = self.styles['RunningHeader']
+        canvas.setFont(style.fontName, style.fontSize)
+        canvas.setFillColor(style.textColor)
+        page_width, page_height = PAGE_SIZE
+        canvas.drawString(doc.leftMargin, page_height - 0.5*inch, left)
+        if right:
+            canvas.drawRightString(page_width - doc.rightMargin, page_height - 0.5*inch, right)
+        canvas.setStrokeColor(self._color('#CCCCCC'))
+        canvas.setLineWidth(0.5)
+        canvas.line(doc.leftMargin, page_height - 0.55*inch, page_width - doc.rightMargin, page_height - 0.55*inch)
+        canvas.restoreState()
 
-        # Create the PDF document with custom page templates
-        doc = SimpleDocTemplate(
+    def _iter_conference_chunks(self, talks: Iterable[Dict], total: Optional[int],
+                                toc_talks: Optional[List[Dict]] = None,
+                                indexed_talks: Optional[List] = None) -> Iterator[List]:
+        """Yield one conference's session pages and talks, one talk per chunk
+
+        If indexed_talks is a list, (talk_key, speaker/title/conference) entries
+        for the index appendix are appended to it.
+        """
+        # Talks keep the number the TOC gave them, even if one failed to scrape
+        toc_talks = toc_talks or []
+        toc_numbers = {talk.get('url'): i for i, talk in enumerate(toc_talks, 1)}
+        session = {'number': None, 'key': None}  # The session being laid out
+
+        def start_session(chunk: List, talk: Dict):
+            session_number, session_name = self._session_for_talk(talk)
+            if session_number != session['number'] and session_number != '0':
+                session['number'], session['key'] = session_number, self._session_key(session_number)
+                self._log(f"\n  === {session_name} ===")
+                self._create_session_page(chunk, session_name, session['key'])
+
+        def unavailable(numbers) -> Iterator[List]:
+            # The TOC already links to these talks (and their sessions), so they need a page
+            for number in numbers:
+                chunk = []
+                start_session(chunk, toc_talks[number - 1])
+                self._add_unavailable_talk(chunk, toc_talks[number - 1], number)
+                yield chunk
+
+        next_number = 1  # First TOC talk not laid out yet
+        for i, talk in enumerate(talks, 1):
+            chunk = []
+            speaker = talk.get('speaker', 'Unknown')
+            title = talk.get('title', 'Untitled')
+            talk_number = toc_numbers.get(talk.get('url'), i)
+            if talk.get('url') in toc_numbers:
+                yield from unavailable(range(next_number, talk_number))
+                next_number = max(next_number, talk_number + 1)
+
+            # Check if we're starting a new session
+            start_session(chunk, talk)
+
+            self._log(f"  [{i}/{total if total is not None else '?'}] {speaker}: {title}")
+            self._add_talk_to_story(chunk, talk, talk_number, session['key'])
+            if self.progress:
+                self.progress.advance('render', item=f"{speaker}: {title}")
+            if indexed_talks is not None:
+                # Only the fields the index needs are kept, not whole talks
+                indexed_talks.append((self._talk_key(talk_number),
+                                      {'speaker': speaker, 'title': title, 'conference': self.conference_date}))
+            yield chunk
+        yield from unavailable(range(next_number, len(toc_talks) + 1))
+
+    def _iter_story_chunks(self, talks: Iterable[Dict], total: Optional[int],
+                           toc_talks: Optional[List[Dict]] = None,
+                           include_index: bool = False) -> Iterator[List]:
+        """Yield the story as lists of flowables: the cover (and TOC), each talk, then the index"""
+        chunk = []
+        self._log("\nAdding cover page...", 'info')
+        self._create_cover_page(chunk)
+        if toc_talks:
+            self._log("Adding table of contents...", 'info')
+            self._create_table_of_contents(chunk, toc_talks)
+        yield chunk
+
+        self._log(f"\nAdding {total if total is not None else 'streamed'} talks to PDF...", 'info')
+
+        indexed_talks = [] if include_index else None
+        yield from self._iter_conference_chunks(talks, total, toc_talks, indexed_talks)
+
+        if indexed_talks:
+            self._log("\nAdding speaker and topic index...", 'info')
+            chunk = []
+            self._create_index_appendix(chunk, indexed_talks)
+            yield chunk
+
+    def _iter_compilation_chunks(self, conferences: Iterable, title: str, include_toc: bool,
+                                 include_index: bool) -> Iterator[List]:
+        """Yield the story of a multi-conference compilation
+
+        Conferences may be conference data or JSON file paths; paths are loaded
+        only when layout reaches them, and each conference is released once
+        its talks are laid out.
+        """
+        chunk = []
+        self.conference_date = title
+        self._log("\nAdding cover page...", 'info')
+        self._create_cover_page(chunk)
+        yield chunk
+
+        indexed_talks = [] if include_index else None
+        for n, conference in enumerate(conferences, 1):
+            if isinstance(conference, str):
+                self._log(f"\nLoading conference data from: {conference}", 'info')
+                conference = load_conference(conference)
+
+            self.conference_data = conference
+            self.conference_date = self._extract_conference_date()
+            self._key_prefix = f"c{n}_"
+            self._outline_level = 1
+            conference_title = self.conference_date or conference.get('conference_title', f"Conference {n}")
+            talks = conference.get('talks', [])
+            self._log(f"\n=== {conference_title}: {len(talks)} talks ===", 'info')
+
+            # Conference cover page (outline level 0) with its own table of contents
+            chunk = [BookmarkFlowable(f"{self._key_prefix}conference", conference_title, level=0)]
+            self._create_cover_page(chunk)
+            if include_toc:
+                self._create_table_of_contents(chunk, talks)
+            yield chunk
+
+            yield from self._iter_conference_chunks(talks, len(talks), talks, indexed_talks)
+            self.conference_data = conference = talks = None
+
+        self._key_prefix = ''
+        self._outline_level = 0
+        if indexed_talks:
+            self._log("\nAdding speaker and topic index...", 'info')
+            chunk = []
+            self._create_index_appendix(chunk, indexed_talks, label_suffix=lambda talk: talk['conference'])
+            yield chunk
+
+    def _doc_template(self, output_filename, first_page_number: int = 1) -> ConferenceDocTemplate:
+        """The document template with the page layout and callbacks every part of the PDF uses"""
+        doc = ConferenceDocTemplate(
             output_filename,
             pagesize=PAGE_SIZE,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
             topMargin=0.75*inch,
-            bottomMargin=0.75*inch
+            bottomMargin=0.75*inch,
+            first_page_number=first_page_number
         )
+        doc.on_page_end = self._on_page_end
+        doc.text_measurer = self.text_measurer
+        return doc
 
-        # Build the story (content)
-        story = []
-
-        # Add cover page
-        print("\nAdding cover page...")
-        self._create_cover_page(story)
+    def _build_document(self, output_filename: str, chunks: Iterator[List], total_talks: Optional[int] = None):
+        """Lay out story chunks into a PDF, filling in page references afterwards"""
+        # Create the PDF document with custom page templates
+        doc = self._doc_template(output_filename)
+        # Page numbers are filled in after layout, just before the file is written
+        doc.on_layout_end = self._end_layout
+        self._page_ref_keys = set()
 
-        # Add each talk with session headers
-        talks = self.conference_data.get('talks', [])
-        print(f"\nAdding {len(talks)} talks to PDF...")
+        # The story (content) is built chunk by chunk while doc.build lays it out
+        story = StreamingStory(chunks)
 
-        current_session = None
-        current_session_key = None
-        for i, talk in enumerate(talks, 1):
-            speaker = talk.get('speaker', 'Unknown')
-            title = talk.get('title', 'Untitled')
-            talk_url = talk.get('url', '')
+        # Build the PDF with custom page callbacks
+        self._log("\nBuilding PDF document...", 'info')
+        if self.progress:
+            self.progress.start('render', total=total_talks, unit='talks')
+        with stage('doc.build', snapshot=True):
+            doc.build(story, onFirstPage=self._on_first_page, onLaterPages=self._on_later_pages)
+        if self.progress:
+            self.progress.finish('render')
+        self.bookmark_pages = dict(doc.bookmark_pages)
+        self._report_images(doc)
+        if self.linearize:
+            with stage('linearize'):
+                self.linearize_report = linearize_pdf(output_filename)
+            self._log(describe_linearized(self.linearize_report), 'info')
+
+    def _end_layout(self, canv, doc: ConferenceDocTemplate):
+        """Define the page number forms once every bookmark's page is known"""
+        style = self.styles['TOCEntry']
+        doc.define_page_refs(self._page_ref_keys, style.fontName, style.fontSize)
+        self.page_count = canv.getPageNumber() - 1
+
+    def _report_images(self, doc: ConferenceDocTemplate):
+        """Log (and keep in image_report) how much embedding each image once saved"""
+        uses = doc.image_uses.values()
+        self.image_report = {
+            'placements': sum(count for _, count in uses),
+            'embedded': len(doc.image_uses),
+            'embedded_bytes': sum(size for size, _ in uses),
+            'saved_bytes': sum(size * (count - 1) for size, count in uses),
+        }
+        report = self.image_report
+        if report['placements']:
+            self._log(f"Images: {report['placements']} placed, {report['embedded']} embedded "
+                      f"({report['embedded_bytes'] / 1024:.0f} KiB); sharing saved "
+                      f"{report['saved_bytes'] / 1024:.0f} KiB", 'info')
+
+    def generate_pdf(self, output_filename: str, talks: Optional[Iterable[Dict]] = None,
+                     toc_talks: Optional[List[Dict]] = None, include_toc: bool = True,
+                     include_index: bool = True):
+        """Generate the PDF document
+
+        talks defaults to the conference data's talks. Any iterable works, so a
+        generator that is still scraping can feed the layout as talks arrive;
+        in that case pass toc_talks (e.g. the parsed talk links, which have
+        url/speaker/title) so the table of contents can be laid out up front.
+        """
+
+        self._log(f"\nGenerating PDF: {output_filename}", 'info')
+        self._log("="*80)
+
+        if talks is None:
+            talks = self.conference_data.get('talks', [])
+        total = len(talks) if hasattr(talks, '__len__') else None
+        if toc_talks is None and total is not None:
+            toc_talks = talks
+        if not include_toc:
+            toc_talks = None
+
+        self._build_document(output_filename, self._iter_story_chunks(talks, total, toc_talks, include_index),
+                             total if total is not None else len(toc_talks or []) or None)
+
+        self._log(f"\n{'='*80}")
+        self._log(f"PDF generated successfully: {output_filename}", 'info')
+        self._log(f"{'='*80}")
+
+    def render_talk_pages(self, talk: Dict, talk_number: int, first_page_number: int,
+                          session_key: Optional[str] = None) -> Tuple[bytes, int]:
+        """Lay out one talk on its own, numbered from first_page_number; returns (PDF bytes, page count)
+
+        The pages match the talk's pages in a full document (same styles,
+        running headers and page numbers), so they can be spliced into one
+        built earlier (see watch_render.py).
+        """
+        output = io.BytesIO()
+        doc = self._doc_template(output, first_page_number)
+        story = []
+        # The part's outline is discarded, but ReportLab wants its talk entry at the top level
+        outline_level, self._outline_level = self._outline_level, -1
+        try:
+            self._add_talk_to_story(story, talk, talk_number, session_key)
+        finally:
+            self._outline_level = outline_level
+        doc.build(story, onFirstPage=self._on_later_pages, onLaterPages=self._on_later_pages)
+        return output.getvalue(), doc.canv.getPageNumber() - first_page_number
 
-            # Check if we're starting a new session
-            session_number = self._extract_session_number(talk_url)
-            if session_number != current_session and session_number != '0':
-                current_session = session_number
-                session_name = self._get_session_name(session_number)
-                current_session_key = f"session_{session_number}"
-                print(f"\n  === {session_name} ===")
-                self._create_session_page(story, session_name, current_session_key)
+    def generate_compilation_pdf(self, output_filename: str, conferences: Iterable,
+                                 title: str = "Collected Talks", include_toc: bool = True,
+                                 include_index: bool = True):
+        """Generate one PDF from many conferences (conference data or JSON paths)
 
-            print(f"  [{i}/{len(talks)}] {speaker}: {title}")
-            self._add_talk_to_story(story, talk, i, current_session_key)
+        The outline nests conference -> session -> talk, bookmark keys are
+        prefixed per conference so they never collide, and the image cache is
+        shared across conferences (use an ImageCache to bound its size).
+        """
+        self._log(f"\nGenerating compilation PDF: {output_filename}", 'info')
+        self._log("="*80)
 
-        # Build the PDF with custom page callbacks
-        print("\nBuilding PDF document...")
-        doc.build(story, onFirstPage=self._on_first_page, onLaterPages=self._on_later_pages)
+        self._build_document(output_filename,
+                             self._iter_compilation_chunks(conferences, title, include_toc, include_index))
 
-        print(f"\n{'='*80}")
-        print(f"PDF generated successfully: {output_filename}")
-        print(f"{'='*80}")
+        self._log(f"\n{'='*80}")
+        self._log(f"PDF generated successfully: {output_filename}", 'info')
+        self._log(f"{'='*80}")
 
 
 def main():
     """Main function for standalone PDF generation from JSON"""
+    progress = progress_from_argv(sys.argv)
+    profile = profile_from_argv(sys.argv)
+    image_store = image_store_from_argv(sys.argv)
+    image_dedup = ImageDeduplicator(perceptual='--similar-images' in sys.argv)
+    if '--similar-images' in sys.argv:
+        sys.argv.remove('--similar-images')
+    related = related_from_argv(sys.argv)
+    linearize = '--linearize' in sys.argv
+    if linearize:
+        sys.argv.remove('--linearize')
+    profiler = profiler_from_argv(sys.argv, 'render', progress)
     if len(sys.argv) < 2:
-        print("Usage: python pdf_generator.py <conference_data.json> [output.pdf]")
+        print("Usage: python pdf_generator.py [--progress human|quiet|jsonl] [--eink[=BITS]] [--image-cache DIR] "
+              "[--similar-images] [--related FILE] [--linearize] [--profile[=DIR] [--profile-cpu-only]] <conference_data.json> [more_data.json ...] [output.pdf]")
         sys.exit(1)
-        
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "conference_output.pdf"
-    
-    # Load conference data
-    print(f"Loading conference data from: {input_file}")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        conference_data = json.load(f)
-        
-    # Generate PDF
-    generator = ConferencePDFGenerator(conference_data)
-    generator.generate_pdf(output_file)
+    if profiler:
+        profiler.start()
+    # A failed run still writes its profile; that's when one is needed most
+    try:
+        args = sys.argv[1:]
+        output_file = args.pop() if len(args) > 1 and args[-1].lower().endswith('.pdf') else "conference_output.pdf"
+
+        # Several JSON files make a compilation with one section per conference
+        if len(args) > 1:
+            generator = ConferencePDFGenerator(image_cache=ImageCache(), progress=progress, profile=profile,
+                                               image_store=image_store, image_dedup=image_dedup, related=related,
+                                               linearize=linearize)
+            generator.generate_compilation_pdf(output_file, args)
+        else:
+            input_file = args[0]
+
+            # Load conference data
+            if not progress:
+                print(f"Loading conference data from: {input_file}")
+            conference_data = load_conference(input_file)
+
+            # Generate PDF
+            generator = ConferencePDFGenerator(conference_data, progress=progress, profile=profile,
+                                               image_store=image_store, image_dedup=image_dedup, related=related,
+                                               linearize=linearize)
+            generator.generate_pdf(output_file)
+    finally:
+        if profiler:
+            profiler.stop()
+    if progress:
+        progress.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Linearized PDF Output for Fast First-Page Display
+
+ReportLab writes the cross-reference table at the end of the file, so a
+reader downloading a PDF can't show anything until the last byte arrives.
+A linearized ("fast web view") PDF puts the first page and everything it
+needs at the front, with hints for the rest, so the first page shows as
+soon as its section has arrived. Packing the small objects (outline items,
+annotations, page dictionaries) into compressed object streams, indexed by
+a cross-reference stream, also makes the whole file smaller.
+
+ReportLab can't write either, so this is a post-processing stage run on the
+finished file, with qpdf doing the work: through pikepdf (its Python binding)
+when that is installed, else through the qpdf command line tool. Neither is
+required otherwise, and pikepdf is only imported when a file is linearized.
+
+Usage:
+    python pdf_linearize.py <input.pdf> [output.pdf]     (in place without an output)
+
+Example:
+    python pdf_generator.py --linearize Output/2025_April.json Output/2025_April.pdf
+"""
+
+import io
+import os
+import re
+import sys
+import shutil
+import tempfile
+import subprocess
+import importlib.util
+from typing import Dict, Optional
+
+
+# The linearization dictionary is the first object, within the first 1024 bytes
+_LINEARIZATION = re.compile(rb'/Linearized\b[^>]*?/E\s+(\d+)', re.S)
+
+
+def linearize_backend() -> Optional[str]:
+    """'pikepdf' or 'qpdf' (the command line tool), whichever is available first; None if neither"""
+    if importlib.util.find_spec('pikepdf') is not None:
+        return 'pikepdf'
+    if shutil.which('qpdf'):
+        return 'qpdf'
+    return None
+
+
+def require_linearize_backend() -> str:
+    backend = linearize_backend()
+    if backend is None:
+        raise ImportError("Linearized output needs pikepdf (pip install pikepdf) or the qpdf tool")
+    return backend
+
+
+def first_page_bytes(data: bytes) -> int:
+    """Bytes a reader needs before it can show the first page (the whole file unless linearized)"""
+    match = _LINEARIZATION.search(data[:1024])
+    return int(match.group(1)) if match else len(data)
+
+
+def linearize_bytes(data: bytes) -> bytes:
+    """The PDF linearized, with object streams and a cross-reference stream"""
+    backend = require_linearize_backend()
+    if backend == 'pikepdf':
+        import pikepdf
+        output = io.BytesIO()
+        with pikepdf.open(io.BytesIO(data)) as pdf:
+            pdf.save(output, linearize=True, object_stream_mode=pikepdf.ObjectStreamMode.generate,
+                     compress_streams=True)
+        return output.getvalue()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source, target = os.path.join(tmp_dir, 'in.pdf'), os.path.join(tmp_dir, 'out.pdf')
+        with open(source, 'wb') as f:
+            f.write(data)
+        result = subprocess.run(['qpdf', '--linearize', '--object-streams=generate', source, target],
+                                capture_output=True, text=True)
+        # Exit status 3 means qpdf succeeded with warnings
+        if result.returncode not in (0, 3):
+            raise RuntimeError(f"qpdf failed: {result.stderr.strip()}")
+        with open(target, 'rb') as f:
+            return f.read()
+
+
+def linearize_pdf(output, target=None) -> Dict:
+    """Linearize a written PDF (a path, or a file object such as BytesIO), in place unless target is given
+
+    Returns sizes before and after, and the bytes needed for the first page.
+    """
+    if hasattr(output, 'getvalue'):
+        data = output.getvalue()
+    else:
+        with open(output, 'rb') as f:
+            data = f.read()
+    linearized = linearize_bytes(data)
+
+    target = target if target is not None else output
+    if hasattr(target, 'getvalue'):
+        target.seek(0)
+        target.truncate()
+        target.write(linearized)
+    else:
+        tmp_path = f"{target}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(linearized)
+        os.replace(tmp_path, target)
+    return {
+        'bytes_before': len(data),
+        'bytes_after': len(linearized),
+        'first_page_before': first_page_bytes(data),
+        'first_page_after': first_page_bytes(linearized),
+    }
+
+
+def describe(report: Dict) -> str:
+    return (f"Linearized: {report['bytes_before'] / 1024:.0f} KiB -> {report['bytes_after'] / 1024:.0f} KiB, "
+            f"first page after {report['first_page_after'] / 1024:.0f} KiB "
+            f"(was {report['first_page_before'] / 1024:.0f} KiB)")
+
+
+def main():
+    """Main function for linearizing an existing PDF"""
+    if len(sys.argv) < 2:
+        print("Usage: python pdf_linearize.py <input.pdf> [output.pdf]")
+        sys.exit(1)
+    try:
+        report = linearize_pdf(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    except ImportError as e:
+        sys.exit(str(e))
+    print(describe(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Profiling Mode for the General Conference Tools
+
+With --profile the scraper and the generators record where their time and
+memory go, labelled by stage:
+
+    scrape                      scraping a conference (allocation snapshot)
+    scrape_talk                 fetching and extracting one talk (worker threads)
+    extract_content_from_html   turning a talk's HTML into blocks and footnotes
+    prepare_image               decoding and resizing one image
+    doc.build                   laying out and writing the PDF (allocation snapshot)
+    linearize                   rewriting the PDF for fast first-page display
+    _add_talk_to_story          building one talk's flowables
+
+A sampling thread records every thread's Python stack every few milliseconds
+(wall clock, so time spent waiting on the network shows up too), with each
+stage inserted as a frame where it was entered. Stages marked for snapshots
+also get tracemalloc snapshots on entry and exit, compared by source line.
+Tracing allocations slows allocation-heavy code (ReportLab's layout) several
+times over, so the CPU shares are those of the traced run; --profile-cpu-only
+leaves tracemalloc off for true timings.
+
+Each run writes a directory under the profile directory with:
+
+    cpu.collapsed     collapsed stacks ("frame;frame;frame count"), the input
+                      format of flamegraph.pl, speedscope and inferno
+    allocations.txt   per snapshot stage: peak traced memory and the top lines
+                      by memory allocated (and still held) during the stage
+    summary.json      the same numbers for scripts
+
+and prints a short summary, so batch runs are not swamped. When profiling is
+off, stage() and @profiled cost one global lookup.
+
+Example:
+    profiler = Profiler('profile', label='render')
+    profiler.start()
+    with stage('doc.build', snapshot=True):
+        doc.build(story)
+    profiler.stop()
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+DEFAULT_DIRECTORY = 'profile'
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.005
+
+# Lines listed per stage in the allocation report
+TOP_ALLOCATIONS = 25
+
+# Frames kept per allocation (1 = the allocating line, the cheapest setting)
+TRACEMALLOC_FRAMES = 1
+
+# Threads whose innermost frame is in one of these modules are idle, not working
+# (thread.py is concurrent.futures' pool worker waiting for a task)
+IDLE_MODULES = ('threading.py', 'queue.py', 'selectors.py', 'thread.py')
+
+# Allocations made by the profiling itself
+_IGNORED_FILES = (__file__, tracemalloc.__file__, '<unknown>')
+
+_active = None  # The running Profiler, if any
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str, snapshot: bool = False):
+    """Label the enclosed work as a stage of the running profile (does nothing when not profiling)"""
+    profiler = _active
+    if profiler is None:
+        return _NULL_STAGE
+    return _Stage(profiler, name, snapshot)
+
+
+def profiled(name: str):
+    """Decorator labelling each call of a function as a stage"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            with _Stage(profiler, name, False):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Stage:
+    """One entered stage: its label goes into the stack of the thread that entered it"""
+
+    __slots__ = ('profiler', 'name', 'snapshot', 'frame', 'before', 'start_memory', 'peak_seen')
+
+    def __init__(self, profiler: 'Profiler', name: str, snapshot: bool):
+        self.profiler = profiler
+        self.name = name
+        self.snapshot = snapshot
+
+    def __enter__(self):
+        self.frame = sys._getframe(1)
+        self.snapshot = self.snapshot and self.profiler.memory
+        if self.snapshot:
+            self.profiler._begin_snapshot(self)
+        self.profiler._stacks.setdefault(threading.get_ident(), []).append(self)
+        return self
+
+    def __exit__(self, *exc):
+        stack = self.profiler._stacks.get(threading.get_ident())
+        if stack and stack[-1] is self:
+            stack.pop()
+        if self.snapshot:
+            self.profiler._end_snapshot(self)
+        self.frame = None
+        return False
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """Samples stacks and takes allocation snapshots per stage, then writes the reports"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, label: str = 'run', progress=None,
+                 memory: bool = True, interval: float = SAMPLE_INTERVAL, top: int = TOP_ALLOCATIONS):
+        self.directory = directory
+        self.label = label
+        self.progress = progress
+        self.memory = memory  # Trace allocations (slower) for the snapshot stages
+        self.interval = interval
+        self.top = top
+        self.samples = Counter()  # Collapsed stack -> samples
+        self.stage_samples = Counter()  # Stage -> samples with the stage anywhere in the stack
+        self.allocations = []  # Per finished snapshot stage: {'stage', 'peak', 'lines'}
+        self.output_dir = None
+        self._stacks = {}  # Thread ident -> entered _Stages, outermost first
+        self._open_snapshots = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+        self._owns_tracing = False  # Whether start() turned tracemalloc on (and stop() should turn it off)
+
+    def _log(self, message: str):
+        if self.progress:
+            self.progress.log(message)
+        else:
+            print(message)
+
+    def start(self):
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracing = True
+        self._started = (time.perf_counter(), time.process_time())
+        self._thread = threading.Thread(target=self._sample_loop, name='profiler', daemon=True)
+        self._thread.start()
+        _active = self
+
+    def stop(self) -> Dict:
+        """Stop sampling, write the reports and print the summary; returns the summary"""
+        global _active
+        _active = None
+        self._stop.set()
+        self._thread.join()
+        wall = time.perf_counter() - self._started[0]
+        cpu = time.process_time() - self._started[1]
+        if self.memory:
+            if self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+            self._compare_snapshots()
+
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.output_dir = os.path.join(self.directory, f"{self.label}-{stamp}-{os.getpid()}")
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = self._summary(wall, cpu)
+        self._write_reports(summary)
+        self._print_summary(summary)
+        return summary
+
+    # Sampling
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(frame, list(self._stacks.get(ident, ())))
+
+    def _sample(self, frame, stages: List[_Stage]):
+        if os.path.basename(frame.f_code.co_filename) in IDLE_MODULES:
+            return
+        labels = {}
+        for entered in stages:
+            if entered.frame is not None:
+                labels.setdefault(id(entered.frame), []).append(f"[{entered.name}]")
+
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        names = []
+        for frame in reversed(frames):
+            if frame.f_code.co_filename != __file__:
+                names.append(_frame_name(frame.f_code))
+            names.extend(labels.get(id(frame), ()))
+
+        with self._lock:
+            self.samples[';'.join(names)] += 1
+            for name in {entered.name for entered in stages}:
+                self.stage_samples[name] += 1
+
+    # Allocation snapshots
+
+    def _begin_snapshot(self, entered: _Stage):
+        with self._lock:
+            entered.start_memory = tracemalloc.get_traced_memory()[0]
+            entered.peak_seen = 0
+            if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+                tracemalloc.reset_peak()
+            self._open_snapshots.append(entered)
+        entered.before = tracemalloc.take_snapshot()
+
+    def _end_snapshot(self, entered: _Stage):
+        after = tracemalloc.take_snapshot()
+        with self._lock:
+            peak = max(tracemalloc.get_traced_memory()[1], entered.peak_seen)
+            if entered in self._open_snapshots:
+                self._open_snapshots.remove(entered)
+            # Enclosing stages' peaks include this one (the peak counter was reset for it)
+            for outer in self._open_snapshots:
+                outer.peak_seen = max(outer.peak_seen, peak)
+            # Comparing is slow while tracing (it allocates), so it waits until stop()
+            self.allocations.append({'stage': entered.name, 'peak': peak - entered.start_memory,
+                                     'snapshots': (entered.before, after)})
+        entered.before = None
+
+    def _compare_snapshots(self):
+        """Replace each stage's snapshots with its top lines by memory allocated during the stage"""
+        for record in self.allocations:
+            before, after = record.pop('snapshots')
+            lines = []
+            # Filtering the grouped lines is much cheaper than filtering every trace
+            for stat in after.compare_to(before, 'lineno'):
+                if stat.size_diff <= 0 or len(lines) == self.top:
+                    break
+                frame = stat.traceback[0]
+                if frame.filename in _IGNORED_FILES or frame.filename.startswith('<frozen importlib'):
+                    continue
+                lines.append({'line': f"{frame.filename}:{frame.lineno}", 'bytes': stat.size_diff,
+                              'blocks': stat.count_diff})
+            record['lines'] = lines
+
+    # Reports
+
+    def _summary(self, wall: float, cpu: float) -> Dict:
+        total = sum(self.samples.values())
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] += count
+        return {
+            'label': self.label,
+            'wall_seconds': round(wall, 3),
+            'cpu_seconds': round(cpu, 3),
+            'samples': total,
+            'sample_interval': self.interval,
+            'stages': {name: {'samples': count, 'share': round(count / total, 3) if total else 0.0}
+                       for name, count in self.stage_samples.most_common()},
+            'hottest_functions': [[name, count] for name, count in leaves.most_common(10)],
+            'allocations': self.allocations,
+        }
+
+    def _write_reports(self, summary: Dict):
+        with open(os.path.join(self.output_dir, 'cpu.collapsed'), 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as f:
+            for record in self.allocations:
+                f.write(f"== {record['stage']}: peak {record['peak'] / 2**20:.1f} MiB above its start\n")
+                for line in record['lines']:
+                    f.write(f"{line['bytes'] / 1024:10.1f} KiB {line['blocks']:8d} blocks  {line['line']}\n")
+                f.write("\n")
+
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+    def _print_summary(self, summary: Dict):
+        self._log(f"Profile: {summary['samples']} samples, {summary['wall_seconds']:.1f} s wall, "
+                  f"{summary['cpu_seconds']:.1f} s CPU -> {self.output_dir}")
+        for name, stats in list(summary['stages'].items())[:6]:
+            peaks = [record['peak'] for record in self.allocations if record['stage'] == name]
+            peak = f", peak {max(peaks) / 2**20:.1f} MiB" if peaks else ''
+            self._log(f"  {name:28s} {stats['share'] * 100:5.1f}% of samples{peak}")
+        hottest = ', '.join(name.split(' ', 1)[0] for name, _ in summary['hottest_functions'][:3])
+        if hottest:
+            self._log(f"  hottest: {hottest}")
+
+
+def profiler_from_argv(argv, label: str = 'run', progress=None) -> Optional[Profiler]:
+    """Remove '--profile' (or '--profile=DIR') and '--profile-cpu-only' from argv and create the profiler
+
+    The profiler is not started yet. Returns None when --profile isn't given.
+    """
+    memory = '--profile-cpu-only' not in argv
+    if not memory:
+        argv.remove('--profile-cpu-only')
+    for i, arg in enumerate(argv):
+        if arg == '--profile':
+            del argv[i]
+            return Profiler(DEFAULT_DIRECTORY, label, progress, memory)
+        if arg.startswith('--profile='):
+            del argv[i]
+            return Profiler(arg.split('=', 1)[1], label, progress, memory)
+    return None
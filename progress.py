@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Progress Reporting for the General Conference Tools
+
+The scraper, the generators and the archive crawler report what they do as
+events on named stages ('scrape', 'images', 'render', ...). ProgressReporter
+keeps per-stage counters and turns them into throughput (items/s, MB/s) and
+an ETA, and writes them in one of three modes:
+
+    human   a status line that is redrawn in place on a terminal (or written
+            every few seconds when output is redirected), with messages above it
+    quiet   only warnings and errors
+    jsonl   one JSON object per event, for job schedulers and log collectors
+
+Reporters are thread safe, so stages running in worker threads can share one.
+
+Example:
+    progress = ProgressReporter('human')
+    progress.start('scrape', total=len(talk_links), unit='talks')
+    progress.advance('scrape', nbytes=len(body))
+    progress.finish('scrape')
+"""
+
+import sys
+import json
+import time
+import threading
+from typing import Dict, Optional
+
+
+MODES = ('human', 'quiet', 'jsonl')
+
+
+class StageStats:
+    """Counters for one stage"""
+
+    __slots__ = ('name', 'unit', 'total', 'done', 'bytes', 'started', 'finished')
+
+    def __init__(self, name: str, total: Optional[int] = None, unit: str = 'items'):
+        self.name = name
+        self.unit = unit
+        self.total = total
+        self.done = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def rate(self) -> float:
+        """Items per second"""
+        elapsed = self.elapsed()
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def mb_per_second(self) -> float:
+        elapsed = self.elapsed()
+        return self.bytes / elapsed / 1e6 if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Seconds left at the current rate (None if unknown)"""
+        if self.total is None or self.finished:
+            return None
+        rate = self.rate()
+        if not rate:
+            return None
+        return max(self.total - self.done, 0) / rate
+
+    def to_dict(self) -> Dict:
+        eta = self.eta()
+        return {
+            'stage': self.name,
+            'unit': self.unit,
+            'done': self.done,
+            'total': self.total,
+            'bytes': self.bytes,
+            'elapsed': round(self.elapsed(), 3),
+            'rate': round(self.rate(), 3),
+            'mb_per_s': round(self.mb_per_second(), 3),
+            'eta': round(eta, 1) if eta is not None else None,
+        }
+
+    def describe(self) -> str:
+        """Short human-readable summary, e.g. 'scrape 12/40 talks 3.1/s 1.2 MB/s ETA 0:09'"""
+        count = f"{self.done}/{self.total}" if self.total is not None else f"{self.done}"
+        text = f"{self.name} {count} {self.unit} {self.rate():.1f}/s"
+        if self.bytes:
+            text += f" {self.mb_per_second():.1f} MB/s"
+        eta = self.eta()
+        if eta is not None:
+            text += f" ETA {_format_duration(eta)}"
+        elif self.finished:
+            text += " done"
+        return text
+
+
+def _format_duration(seconds: float) -> str:
+    """'1:02:03' or '2:03'"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """Collects stage events and reports them as 'human', 'quiet' or 'jsonl' output"""
+
+    def __init__(self, mode: str = 'human', stream=None, interval: Optional[float] = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown progress mode: {mode} (expected one of {', '.join(MODES)})")
+        self.mode = mode
+        self.stream = stream if stream is not None else sys.stderr
+        self.is_tty = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        # Redraw often on a terminal, but keep redirected logs short
+        self.interval = interval if interval is not None else (0.2 if self.is_tty else 5.0)
+        self.stages = {}  # name -> StageStats, in the order stages started
+        self._lock = threading.Lock()
+        self._last_draw = 0.0
+        self._status_shown = False
+
+    def start(self, stage: str, total: Optional[int] = None, unit: str = 'items'):
+        """Begin (or restart) a stage; total may be None if unknown"""
+        with self._lock:
+            stats = self.stages[stage] = StageStats(stage, total, unit)
+            self._emit('start', stats)
+
+    def set_total(self, stage: str, total: Optional[int]):
+        with self._lock:
+            stats = self._stage(stage)
+            stats.total = total
+            self._emit('total', stats)
+
+    def advance(self, stage: str, n: int = 1, nbytes: int = 0, item: Optional[str] = None):
+        """Count n more items (and nbytes bytes) done in a stage"""
+        with self._lock:
+            stats = self._stage(stage)
+            stats.done += n
+            stats.bytes += nbytes
+            self._emit('advance', stats, item=item)
+
+    def finish(self, stage: str):
+        with self._lock:
+            stats = self._stage(stage)
+            stats.finished = time.monotonic()
+            self._emit('finish', stats, force=True)
+
+    def log(self, message: str, level: str = 'info'):
+        """Report a message ('info', 'warning' or 'error')"""
+        with self._lock:
+            if self.mode == 'jsonl':
+                self._write_json({'event': 'log', 'level': level, 'message': message})
+            elif self.mode == 'human' or level != 'info':
+                self._clear_status()
+                self.stream.write(message + '\n')
+                if self.is_tty:
+                    self._draw_status(force=True)
+                self.stream.flush()
+
+    def close(self):
+        """Finish any open stages and end the status line"""
+        with self._lock:
+            for stats in self.stages.values():
+                if not stats.finished:
+                    stats.finished = time.monotonic()
+            if self.mode == 'human':
+                self._draw_status(force=True)
+                if self._status_shown and self.is_tty:
+                    self.stream.write('\n')
+                self._status_shown = False
+            elif self.mode == 'jsonl':
+                self._write_json({'event': 'summary', 'stages': [s.to_dict() for s in self.stages.values()]})
+            self.stream.flush()
+
+    def status_line(self) -> str:
+        return ' | '.join(stats.describe() for stats in self.stages.values())
+
+    def _stage(self, stage: str) -> StageStats:
+        # Stages may be advanced without an explicit start (e.g. image downloads)
+        if stage not in self.stages:
+            self.stages[stage] = StageStats(stage)
+        return self.stages[stage]
+
+    def _emit(self, event: str, stats: StageStats, item: Optional[str] = None, force: bool = False):
+        if self.mode == 'jsonl':
+            record = {'event': event}
+            record.update(stats.to_dict())
+            if item:
+                record['item'] = item
+            self._write_json(record)
+        elif self.mode == 'human':
+            self._draw_status(force=force)
+
+    def _write_json(self, record: Dict):
+        record['time'] = round(time.time(), 3)
+        self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+    def _draw_status(self, force: bool = False):
+        now = time.monotonic()
+        if not self.stages or (not force and now - self._last_draw < self.interval):
+            return
+        self._last_draw = now
+        line = self.status_line()
+        if self.is_tty:
+            self.stream.write('\r\x1b[K' + line)
+            self._status_shown = True
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def _clear_status(self):
+        if self._status_shown and self.is_tty:
+            self.stream.write('\r\x1b[K')
+
+
+def progress_from_argv(argv) -> Optional[ProgressReporter]:
+    """Remove '--progress MODE' (or '--progress=MODE') from argv and build its reporter
+
+    Returns None when the option isn't given, so callers keep their plain output.
+    A missing or unknown mode prints the usage and exits.
+    """
+    for i, arg in enumerate(argv):
+        if arg == '--progress' or arg.startswith('--progress='):
+            if arg == '--progress':
+                mode = argv[i + 1] if i + 1 < len(argv) else None
+                del argv[i:i + 2]
+            else:
+                mode = arg.split('=', 1)[1]
+                del argv[i]
+            if mode not in MODES:
+                print(f"Usage: --progress {'|'.join(MODES)}" + (f" (not {mode!r})" if mode else ''))
+                sys.exit(1)
+            return ProgressReporter(mode)
+    return None
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Related Talks from TF-IDF Similarity
+
+This module finds, for every talk in the archive, the talks most similar to
+it and keeps them in a neighbour table the generators read at render time
+(one dict lookup per talk), so each talk can end with "Related Talks" links.
+
+Talks are compared as sparse TF-IDF vectors of their content terms plus the
+scripture references their footnotes cite, taken from an analytics.TermStore
+so the text is tokenized only once. The top-k neighbours are found with
+blocked products, a block of talks at a time against the whole archive, which
+keeps memory bounded however large the archive grows. Talks share so many
+words that the similarities are nearly dense, so each block is made dense and
+multiplied by the sparse archive (about 2.5x faster than a sparse product).
+
+Updates are incremental: conferences already in the store (same name and
+content hash) are skipped, new talks get full neighbour lists, and existing
+talks only have their lists merged with the new talks. Scores of pairs that
+were already in the table are kept as they were (the IDF weights drift a
+little as the archive grows); --rebuild recomputes everything, and a
+conference whose content changed triggers a rebuild automatically. A rebuild
+covers every conference in the store: the ones given again are re-tokenized,
+the rest keep their stored tokens, so the earlier JSON files aren't needed
+(unless the store is missing, in which case the update is refused).
+
+Building needs NumPy and SciPy (see analytics.py); reading the table does
+not, and they are only imported to build it, so the generators' --related
+option costs no startup time.
+
+Usage:
+    python related_talks.py [--table FILE] [--store FILE] [--k N] [--rebuild] <conference_data.json> [...]
+
+Example:
+    python related_talks.py --table related.json --store related.npz archive/*.json
+    python pdf_generator.py --related related.json archive/2025_April.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+
+SITE_URL = "https://www.churchofjesuschrist.org"
+
+# Related talks kept per talk
+DEFAULT_K = 5
+
+# Talks per block of the similarity product (a dense block is BLOCK_SIZE x terms floats)
+BLOCK_SIZE = 256
+
+# Weight of the cited-scripture features against the text features
+CITATION_WEIGHT = 0.5
+
+
+class RelatedTalks:
+    """The neighbour table: each talk URL -> its most similar talks, best first"""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.talks = {}  # url -> [title, speaker, conference]
+        self.neighbours = {}  # url -> [[url, score], ...]
+        self.conferences = {}  # Conference name -> content hash, for incremental updates
+
+    def get(self, url: str, limit: Optional[int] = None) -> List[Dict]:
+        """Related talks of a talk (none if it isn't in the table)"""
+        related = []
+        for other, score in self.neighbours.get(url, ())[:limit or self.k]:
+            title, speaker, conference = self.talks[other]
+            related.append({'url': other, 'link': talk_link(other), 'title': title, 'speaker': speaker,
+                            'conference': conference, 'score': score})
+        return related
+
+    def save(self, path: str):
+        data = {'k': self.k, 'conferences': self.conferences, 'talks': self.talks, 'neighbours': self.neighbours}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'RelatedTalks':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        table = cls(data['k'])
+        table.talks = data['talks']
+        table.neighbours = data['neighbours']
+        table.conferences = data['conferences']
+        return table
+
+
+def talk_link(url: str) -> str:
+    """Absolute link to a talk on the Church's site"""
+    return SITE_URL + url if url.startswith('/') else url
+
+
+def talk_vectors(store):
+    """L2-normalised TF-IDF rows (talks x (terms + scripture references)) from an analytics.TermStore"""
+    import numpy as np
+    from scipy import sparse
+
+    num_talks = max(len(store), 1)
+
+    def tfidf(counts):
+        counts = counts.tocsr().astype(np.float32)
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        idf = np.log((1 + num_talks) / (1 + df)).astype(np.float32) + 1
+        counts.data = (1 + np.log(counts.data)) * idf[counts.indices]  # Sublinear term frequency
+        return counts
+
+    words = store.talk_terms().copy()
+    words.data[~store.content_terms()[words.indices]] = 0
+    words.eliminate_zeros()
+    ones = np.ones(len(store.citation_ref), dtype=np.int32)
+    citations = sparse.csr_matrix((ones, (store.citation_talk, store.citation_ref)),
+                                  shape=(len(store), len(store.references)))
+    vectors = sparse.hstack([tfidf(words), CITATION_WEIGHT * tfidf(citations)], format='csr')
+
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)) @ vectors
+
+
+def top_neighbours(vectors, k: int, rows, columns, block_size: int = BLOCK_SIZE) -> Tuple:
+    """Top-k (column talk, cosine) for each row talk, one block of rows at a time
+
+    Returns (indices, scores), each of shape (len(rows), k'), k' = min(k, len(columns)),
+    best first; a talk is never its own neighbour.
+    """
+    import numpy as np
+
+    rows, columns = np.asarray(rows), np.asarray(columns)
+    k = min(k, len(columns))
+    indices = np.zeros((len(rows), k), dtype=np.int64)
+    scores = np.zeros((len(rows), k), dtype=np.float32)
+    if not k:
+        return indices, scores
+    column_vectors = vectors[columns]
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        similarity = (column_vectors @ vectors[block].toarray().T).T
+        similarity[block[:, None] == columns[None, :]] = -1  # Not itself
+        top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        indices[start:start + len(block)] = columns[np.take_along_axis(top, order, axis=1)]
+        scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+
+def update_related(table: RelatedTalks, store, conferences, rebuild: bool = False, log=print):
+    """Add conferences (dicts or JSON paths) to the store and bring the table up to date
+
+    Returns the store to use from now on (a new one when everything was rebuilt).
+    Raises ValueError when the table has conferences that are neither in the
+    store nor given, since a rebuild would drop them.
+    """
+    import numpy as np
+    from talk_model import load_conference
+    from snapshot_diff import conference_tree
+    from content_utils import conference_slug
+
+    known = {info['name']: info['hash'] for info in store.conferences}
+    given, replaced, new = set(), [], []
+    for conference in conferences:
+        if isinstance(conference, str):
+            conference = load_conference(conference)
+        name = conference_slug(conference)
+        given.add(name)
+        if name not in known:
+            new.append(conference)
+        elif known[name] != conference_tree(conference)['hash']:
+            log(f"{name} changed since it was added, rebuilding")
+            replaced.append(conference)
+            rebuild = True
+        elif rebuild:
+            replaced.append(conference)
+
+    missing = set(table.conferences) - set(known) - given
+    if missing:
+        raise ValueError(f"The table has conferences the store doesn't ({', '.join(sorted(missing))}); "
+                         f"give their JSON files too, or the update would drop them")
+
+    old_talks = len(store)
+    if rebuild or not table.neighbours:
+        # Conferences given again are re-tokenized, the rest keep their stored tokens
+        store = store.without({conference_slug(conference) for conference in replaced})
+        for conference in replaced + new:
+            store.add_conference(conference)
+        table.talks, table.neighbours, table.conferences = {}, {}, {}
+        old_talks = 0
+    else:
+        for conference in new:
+            store.add_conference(conference)
+    if len(store) == old_talks:
+        log("No new conferences")
+        return store
+
+    for info in store.conferences:
+        table.conferences[info['name']] = info['hash']
+    for talk, speaker, conference in zip(store.talks[old_talks:], store.talk_speaker[old_talks:].tolist(),
+                                         store.talk_conference[old_talks:].tolist()):
+        info = store.conferences[conference]
+        label = f"{info['month']} {info['year']}" if info['month'] else info['name']
+        table.talks[talk['url']] = [talk['title'], store.speakers[speaker], label]
+    urls = [talk['url'] for talk in store.talks]
+
+    vectors = talk_vectors(store)
+    everyone, added = np.arange(len(store)), np.arange(old_talks, len(store))
+    # New talks against the whole archive
+    indices, scores = top_neighbours(vectors, table.k, added, everyone)
+    for row, talk in enumerate(added.tolist()):
+        table.neighbours[urls[talk]] = [[urls[other], round(float(score), 4)]
+                                        for other, score in zip(indices[row].tolist(), scores[row].tolist())
+                                        if score > 0]
+    # Existing talks only need the new talks as candidates
+    if old_talks:
+        indices, scores = top_neighbours(vectors, table.k, np.arange(old_talks), added)
+        for talk in range(old_talks):
+            merged = table.neighbours.get(urls[talk], []) + [
+                [urls[other], round(float(score), 4)]
+                for other, score in zip(indices[talk].tolist(), scores[talk].tolist()) if score > 0]
+            merged.sort(key=lambda pair: -pair[1])
+            table.neighbours[urls[talk]] = merged[:table.k]
+    log(f"Related talks: {len(added)} new talks, {len(store)} in the table")
+    return store
+
+
+def related_from_argv(argv) -> Optional[RelatedTalks]:
+    """Remove '--related FILE' (or '--related=FILE') from argv and load that neighbour table
+
+    Returns None when the option isn't given.
+    """
+    for i, arg in enumerate(argv):
+        if arg == '--related' and i + 1 < len(argv):
+            path = argv[i + 1]
+            del argv[i:i + 2]
+            return RelatedTalks.load(path)
+        if arg.startswith('--related='):
+            del argv[i]
+            return RelatedTalks.load(arg.split('=', 1)[1])
+    return None
+
+
+def main():
+    """Main function for building or updating the related talks table"""
+    parser = argparse.ArgumentParser(description="Find related talks across conferences")
+    parser.add_argument('inputs', nargs='+', help="conference data JSON file(s)")
+    parser.add_argument('--table', default='related.json', help="neighbour table to update (default: related.json)")
+    parser.add_argument('--store', help="term store kept between runs, so only new conferences are tokenized "
+                                        "(default: the table name with .npz)")
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help=f"related talks per talk (default: {DEFAULT_K})")
+    parser.add_argument('--rebuild', action='store_true', help="recompute the whole table")
+    args = parser.parse_args()
+
+    from analytics import TermStore, require_numpy
+    require_numpy()
+
+    store_path = args.store or os.path.splitext(args.table)[0] + '.npz'
+    # Loaded even for --rebuild: the store has the conferences not given again
+    table = RelatedTalks.load(args.table) if os.path.exists(args.table) else RelatedTalks(args.k)
+    store = TermStore.load(store_path) if os.path.exists(store_path) else TermStore()
+    if table.k != args.k:
+        table.k = args.k
+        args.rebuild = True
+
+    start = time.perf_counter()
+    try:
+        store = update_related(table, store, args.inputs, args.rebuild)
+    except ValueError as e:
+        sys.exit(str(e))
+    store.save(store_path)
+    table.save(args.table)
+    print(f"Saved {args.table} and {store_path} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Rendering Profiles for the PDF Generator
+
+A profile says how the PDF is rendered for a kind of reading device: the
+colours of its text styles and how embedded images are prepared.
+
+    color   the default: the full-colour styles, RGB JPEG images
+    eink    for e-ink readers: the blue style colours become high-contrast
+            grays, and images are converted to grayscale and dithered to a
+            few gray levels (4 bits, the 16 levels most e-ink screens show,
+            by default), stored losslessly instead of as JPEG
+
+Example:
+    generator = ConferencePDFGenerator(conference_data, profile=eink_profile(bits=2))
+"""
+
+import sys
+from typing import Dict, List, Optional
+from image_pipeline import DEFAULT_DPI, QUANTIZE_BITS
+
+
+# Style colours (as written in the generator) -> high-contrast replacements
+EINK_COLORS = {
+    '#003366': '#000000',  # Titles, headings and rules
+    '#2D83AE': '#1A1A1A',  # Footnote markers
+    '#5A7FA5': '#333333',  # Speaker names and session subtitles
+    '#486581': '#333333',  # Speaker roles
+}
+
+DEFAULT_EINK_BITS = 4
+
+# Image bit depths the e-ink profile supports (dithered gray, or grayscale JPEG)
+EINK_DEPTHS = (1, 2, 4, 8)
+
+
+class RenderProfile:
+    """Colours and image settings for one kind of output device"""
+
+    def __init__(self, name: str, image_mode: str = 'RGB', image_bits: int = 8, image_dpi: int = DEFAULT_DPI,
+                 color_map: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.image_mode = image_mode  # 'RGB' or 'L'
+        self.image_bits = image_bits  # 8 for JPEG, or one of QUANTIZE_BITS for dithered gray
+        self.image_dpi = image_dpi
+        self.color_map = {k.upper(): v for k, v in (color_map or {}).items()}
+
+    def color(self, hex_color: str) -> str:
+        """The colour to use for a style colour given as '#RRGGBB'"""
+        return self.color_map.get(hex_color.upper(), hex_color)
+
+    def image_settings(self):
+        """Everything that affects how an image is prepared (for cache keys)"""
+        return (self.image_mode, self.image_bits, self.image_dpi)
+
+
+def color_profile() -> RenderProfile:
+    return RenderProfile('color')
+
+
+def eink_profile(bits: int = DEFAULT_EINK_BITS) -> RenderProfile:
+    """Grayscale profile; bits is 1, 2 or 4 for dithered images, or 8 for grayscale JPEG"""
+    if bits != 8 and bits not in QUANTIZE_BITS:
+        raise ValueError(f"Unsupported bit depth: {bits} (expected 1, 2, 4 or 8)")
+    return RenderProfile('eink', image_mode='L', image_bits=bits, color_map=EINK_COLORS)
+
+
+def expand_bare_eink(argv: List[str]) -> List[str]:
+    """argv with a bare --eink (one not followed by a bit depth) written as --eink=4
+
+    An optional value would take the input file after a bare --eink as its
+    bit depth, so parsers only ever see --eink BITS or --eink=BITS.
+    """
+    expanded = []
+    for i, arg in enumerate(argv):
+        if arg == '--eink' and not (i + 1 < len(argv) and argv[i + 1].isdigit()):
+            arg = f"--eink={DEFAULT_EINK_BITS}"
+        expanded.append(arg)
+    return expanded
+
+
+def profile_from_argv(argv) -> Optional[RenderProfile]:
+    """Remove '--eink', '--eink BITS' or '--eink=BITS' from argv and build its profile
+
+    Returns None when the option isn't given, so callers use the colour profile.
+    An unsupported BITS prints the usage and exits.
+    """
+    argv[:] = expand_bare_eink(argv)
+    for i, arg in enumerate(argv):
+        if arg == '--eink':
+            bits = argv[i + 1]
+            del argv[i:i + 2]
+        elif arg.startswith('--eink='):
+            bits = arg.split('=', 1)[1]
+            del argv[i]
+        else:
+            continue
+        try:
+            return eink_profile(int(bits))
+        except ValueError:
+            print(f"Usage: --eink[=BITS], BITS one of {', '.join(map(str, EINK_DEPTHS))} (not {bits!r})")
+            sys.exit(1)
+    return None
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+On-demand PDF Render Service
+
+This script serves custom PDFs (a whole conference, one session, or a
+hand-picked set of talks) over HTTP from one long-running process. Most of
+what a cold generate_conference_pdf.py run redoes stays warm between requests:
+the registered fonts, each conference's scraped talks, downloaded and prepared
+images, and the rendered PDFs themselves (each cache bounded in size).
+
+Endpoints:
+    GET /pdf?conference=URL[&session=ID][&talks=1,4,7][&eink=BITS][&toc=0][&index=0]
+        the PDF; talks are numbered in conference order (or given as talk URLs)
+    GET /talks?conference=URL
+        the conference's talks as JSON (number, title, speaker, session)
+    GET /status
+        cache sizes and hit counts as JSON
+
+With --fixtures the service never touches the network, so it can be tested
+entirely on localhost.
+
+Usage:
+    python render_service.py [--host HOST] [--port PORT] [--workers N] [--linearize]
+                             [--cache DIR | --fixtures DIR | --record DIR] [--image-cache DIR]
+
+Example:
+    python render_service.py --fixtures fixtures/2025_04 --port 8080
+    curl -o session.pdf "http://127.0.0.1:8080/pdf?conference=/study/general-conference/2025/04&session=1"
+"""
+
+import io
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from conference_scraper import ConferenceScraper
+from content_utils import talk_session
+from pdf_generator import ConferencePDFGenerator, ImageCache
+from image_pipeline import ImageDeduplicator, PreparedImageCache, PreparedImageStore
+from render_profile import color_profile, eink_profile
+from progress import ProgressReporter
+from fetchers import HTTPFetcher, add_fetcher_arguments, fetcher_from_args
+
+
+class RequestError(Exception):
+    """A request the service can't serve; status is the HTTP status to answer with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def conference_size(conference: Dict) -> int:
+    """Rough size of a scraped conference in bytes (its JSON length)"""
+    return len(json.dumps(conference, default=str))
+
+
+class LRUCache(OrderedDict):
+    """key -> value, evicting the least recently used once the values' sizeof adds up past max_bytes"""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024, sizeof=len):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self:
+                return default
+            self.move_to_end(key)
+            return super().__getitem__(key)
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self:
+                self.total_bytes -= self.sizeof(super().__getitem__(key))
+            super().__setitem__(key, value)
+            self.total_bytes += self.sizeof(value)
+            while self.total_bytes > self.max_bytes and len(self) > 1:
+                _, evicted = self.popitem(last=False)
+                self.total_bytes -= self.sizeof(evicted)
+
+
+class RenderService:
+    """Scrapes conferences and renders PDFs on request, keeping everything warm"""
+
+    def __init__(self, fetcher=None, image_store: Optional[PreparedImageStore] = None, max_workers: int = 4,
+                 progress=None, image_cache_bytes: int = 256 * 1024 * 1024,
+                 pdf_cache_bytes: int = 128 * 1024 * 1024, prepared_cache_bytes: int = 128 * 1024 * 1024,
+                 conference_cache_bytes: int = 64 * 1024 * 1024, linearize: bool = False):
+        self.fetcher = fetcher if fetcher is not None else HTTPFetcher()
+        self.image_store = image_store
+        self.linearize = linearize  # Served PDFs start showing before the download finishes
+        self.max_workers = max_workers
+        # Quiet by default: per-talk log lines would flood a service's log
+        self.progress = progress if progress is not None else ProgressReporter('quiet')
+        self.image_cache = ImageCache(image_cache_bytes)  # Downloaded images, shared by every render
+        # Everything below is bounded too, so a long-running service doesn't grow without limit
+        self.prepared_cache_bytes = prepared_cache_bytes
+        self.prepared_images = {}  # Profile image settings -> that profile's PreparedImageCache
+        # Same image under several URLs is prepared once
+        self.image_dedup = ImageDeduplicator(max_bytes=prepared_cache_bytes)
+        self.pdfs = LRUCache(pdf_cache_bytes)
+        # Conference URI -> conference data (scraped again only once evicted)
+        self.conferences = LRUCache(conference_cache_bytes, sizeof=conference_size)
+        self._conference_locks = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'pdf_hits': 0, 'renders': 0, 'scrapes': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _generator(self, conference_data: Dict, profile=None) -> ConferencePDFGenerator:
+        """A generator sharing the service's image caches (fonts are registered once per process)"""
+        profile = profile if profile is not None else color_profile()
+        generator = ConferencePDFGenerator(conference_data, image_cache=self.image_cache, progress=self.progress,
+                                           fetcher=self.fetcher, profile=profile, image_store=self.image_store,
+                                           image_dedup=self.image_dedup, linearize=self.linearize)
+        with self._lock:
+            prepared = self.prepared_images.get(profile.image_settings())
+            if prepared is None:
+                prepared = PreparedImageCache(self.prepared_cache_bytes)
+                self.prepared_images[profile.image_settings()] = prepared
+            generator.prepared_images = prepared
+        return generator
+
+    def conference(self, conference_url: str) -> Dict:
+        """The conference's data, scraped (with its images) on first use"""
+        scraper = ConferenceScraper(conference_url, progress=self.progress, fetcher=self.fetcher)
+        uri = scraper.extract_uri_from_url(conference_url)
+        with self._lock:
+            lock = self._conference_locks.setdefault(uri, threading.Lock())
+        # One scrape per conference, even when requests for it arrive together
+        with lock:
+            conference = self.conferences.get(uri)
+            if conference is None:
+                try:
+                    conference_title, talk_links = scraper.fetch_talk_links()
+                except Exception as e:
+                    raise RequestError(502, f"Could not fetch conference {conference_url}: {e}") from e
+                prefetch = self._generator({}).prefetch_images
+                talks = list(scraper.iter_talks(talk_links, max_workers=self.max_workers, prepare=prefetch))
+                conference = {'conference_title': conference_title, 'talks': talks}
+                self.conferences.put(uri, conference)
+                self._count('scrapes')
+            return conference
+
+    @staticmethod
+    def select_talks(talks: List[Dict], session: Optional[str] = None,
+                     numbers: Optional[List[str]] = None) -> List[Dict]:
+        """Talks of one session and/or picked by number (1-based, conference order) or URL"""
+        selected = list(talks)
+        if session:
+            selected = [talk for talk in selected if talk_session(talk)[0] == session]
+        if numbers:
+            by_url = {talk['url'].split('?')[0]: talk for talk in talks}
+            allowed = {id(talk) for talk in selected}
+            picked = {}
+            for number in numbers:
+                if number.isdigit() and 1 <= int(number) <= len(talks):
+                    talk = talks[int(number) - 1]
+                elif number.split('?')[0] in by_url:
+                    talk = by_url[number.split('?')[0]]
+                else:
+                    raise RequestError(404, f"No such talk: {number}")
+                if id(talk) in allowed:
+                    picked[id(talk)] = talk
+            selected = list(picked.values())
+        if not selected:
+            raise RequestError(404, "No talks match the request")
+        return selected
+
+    def render(self, conference_url: str, session: Optional[str] = None, numbers: Optional[List[str]] = None,
+               eink_bits: Optional[int] = None, include_toc: bool = True,
+               include_index: bool = True) -> Tuple[bytes, bool]:
+        """Render (or reuse) a PDF; returns (pdf, True if it came from the cache)"""
+        try:
+            profile = eink_profile(eink_bits) if eink_bits else color_profile()
+        except ValueError as e:
+            raise RequestError(400, str(e)) from e
+        conference = self.conference(conference_url)
+        talks = self.select_talks(conference['talks'], session, numbers)
+
+        # Talk URLs include the conference, so they identify the selection
+        key = (tuple(talk['url'] for talk in talks), profile.name, profile.image_settings(),
+               include_toc, include_index)
+        pdf = self.pdfs.get(key)
+        if pdf is not None:
+            self._count('pdf_hits')
+            return pdf, True
+
+        output = io.BytesIO()
+        generator = self._generator(conference, profile)
+        generator.generate_pdf(output, talks=talks, include_toc=include_toc, include_index=include_index)
+        pdf = output.getvalue()
+        self.pdfs.put(key, pdf)
+        self._count('renders')
+        return pdf, False
+
+    def talk_list(self, conference_url: str) -> Dict:
+        conference = self.conference(conference_url)
+        return {
+            'conference_title': conference['conference_title'],
+            'talks': [{'number': n, 'title': talk.get('title'), 'speaker': talk.get('speaker'),
+                       'url': talk.get('url'), 'session': talk_session(talk)[0],
+                       'session_name': talk_session(talk)[1]}
+                      for n, talk in enumerate(conference['talks'], 1)],
+        }
+
+    def status(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(conferences=len(self.conferences), conference_cache_bytes=self.conferences.total_bytes,
+                     pdfs_cached=len(self.pdfs), pdf_cache_bytes=self.pdfs.total_bytes,
+                     images_cached=len(self.image_cache), image_cache_bytes=self.image_cache.total_bytes,
+                     prepared_images=sum(len(cache) for cache in list(self.prepared_images.values())),
+                     prepared_cache_bytes=sum(cache.total_bytes for cache in list(self.prepared_images.values())),
+                     dedup_bytes=self.image_dedup.total_bytes)
+        return stats
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Routes GET requests to the server's RenderService"""
+
+    server_version = "ConferenceRenderService/1.0"
+
+    def do_GET(self):
+        service = self.server.service
+        service._count('requests')
+        request = urlparse(self.path)
+        params = {name: values[-1] for name, values in parse_qs(request.query).items()}
+        start = time.perf_counter()
+        try:
+            if request.path == '/pdf':
+                pdf, cached = service.render(
+                    self._required(params, 'conference'),
+                    session=params.get('session'),
+                    numbers=[n for n in params.get('talks', '').split(',') if n] or None,
+                    eink_bits=self._int(params, 'eink'),
+                    include_toc=params.get('toc', '1') != '0',
+                    include_index=params.get('index', '1') != '0')
+                self._send(200, pdf, 'application/pdf', {
+                    'X-Render-Cache': 'hit' if cached else 'miss',
+                    'X-Render-Time': f"{(time.perf_counter() - start) * 1000:.1f}ms",
+                })
+            elif request.path == '/talks':
+                self._send_json(200, service.talk_list(self._required(params, 'conference')))
+            elif request.path == '/status':
+                self._send_json(200, service.status())
+            else:
+                raise RequestError(404, f"Unknown path: {request.path}")
+        except RequestError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            service.progress.log(f"Error serving {self.path}: {e}", 'error')
+            self._send_json(500, {'error': str(e)})
+
+    @staticmethod
+    def _required(params: Dict, name: str) -> str:
+        if not params.get(name):
+            raise RequestError(400, f"Missing parameter: {name}")
+        return params[name]
+
+    @staticmethod
+    def _int(params: Dict, name: str) -> Optional[int]:
+        if name not in params:
+            return None
+        try:
+            return int(params[name])
+        except ValueError:
+            raise RequestError(400, f"Parameter {name} must be a number")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def log_message(self, format, *args):
+        self.server.service.progress.log(f"{self.address_string()} {format % args}")
+
+
+class RenderServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding one RenderService"""
+
+    daemon_threads = True
+
+    def __init__(self, service: RenderService, host: str = '127.0.0.1', port: int = 8000):
+        self.service = service
+        super().__init__((host, port), RenderRequestHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def main():
+    """Main function for running the render service"""
+    parser = argparse.ArgumentParser(description="Serve conference PDFs on request")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="port to listen on (0 picks a free one)")
+    parser.add_argument('--workers', type=int, default=4, help="talks fetched concurrently when scraping")
+    parser.add_argument('--image-cache', metavar='DIR', help="keep prepared images on disk across restarts")
+    parser.add_argument('--linearize', action='store_true',
+                        help="serve linearized PDFs that show their first page early (needs pikepdf or qpdf)")
+    add_fetcher_arguments(parser)
+    args = parser.parse_args()
+
+    fetcher = fetcher_from_args(args)
+    image_store = PreparedImageStore(args.image_cache) if args.image_cache else None
+
+    service = RenderService(fetcher=fetcher, image_store=image_store, max_workers=args.workers,
+                            progress=ProgressReporter('human'), linearize=args.linearize)
+    server = RenderServer(service, args.host, args.port)
+    print(f"Serving PDFs on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
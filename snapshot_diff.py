@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Content Hashes and Diffs for Conference Snapshots
+
+Every snapshot written by ConferenceScraper.scrape_all_talks carries a hash
+tree under 'content_hashes':
+
+    conference    hash of the title and of every talk hash, in order
+      talk        hash of its metadata, block and footnote hashes
+        meta      speaker, title, session, ... (everything but the content)
+        blocks    one hash per structured_content item (text, header, image)
+        footnotes one hash per footnote, by footnote id
+
+Two snapshots are compared top down: equal hashes mean equal subtrees, so
+only talks (and within them, blocks and footnotes) whose hashes differ are
+looked at, and an unchanged conference is recognised from one comparison.
+The hashes are stable across runs and machines, so caches of anything derived
+from a talk (rendered pages, prepared images) can key off them too.
+
+The stored tree is only a record of what was scraped: a snapshot edited by
+hand keeps its old tree, so anything that decides whether work can be skipped
+(diffs, the analytics store, the related talks table) recomputes it with
+conference_tree (tens of milliseconds per conference, well under a diff
+of the JSON files).
+
+Usage:
+    python snapshot_diff.py [--json] <old_snapshot.json> <new_snapshot.json>
+    python snapshot_diff.py --hash <snapshot.json>     (add hashes to an older snapshot)
+"""
+
+import sys
+import json
+import time
+import difflib
+import hashlib
+import argparse
+from typing import Dict, List, Optional
+
+
+HASHES_KEY = 'content_hashes'
+
+# Talk fields that are not metadata: the content has its own subtrees, 'content'
+# is derived from the text blocks and 'full_data' is the raw API response
+CONTENT_FIELDS = ('structured_content', 'footnotes', 'content', 'full_data')
+
+# Hex digits kept from each SHA-1 (64 bits, plenty within one conference)
+HASH_LENGTH = 16
+
+
+def _plain(value):
+    """talk_model records as plain dicts, so both shapes hash the same"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    return value
+
+
+def hash_value(value) -> str:
+    """Hash of a JSON value (key order doesn't matter)"""
+    encoded = json.dumps(_plain(value), sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def talk_key(talk) -> str:
+    """How a talk is identified across snapshots: its URL, else speaker and title"""
+    return talk.get('url') or f"{talk.get('speaker', '')}: {talk.get('title', '')}"
+
+
+def _footnote_keys(footnotes) -> List[str]:
+    keys = []
+    seen = set()
+    for i, footnote in enumerate(footnotes):
+        key = footnote.get('id') or footnote.get('marker') or str(i)
+        if key in seen:
+            key = f"{key}#{i}"
+        seen.add(key)
+        keys.append(key)
+    return keys
+
+
+def talk_meta(talk) -> Dict:
+    return {key: _plain(talk[key]) for key in talk.keys() if key not in CONTENT_FIELDS}
+
+
+def talk_tree(talk) -> Dict:
+    """The hash subtree of one talk"""
+    footnotes = talk.get('footnotes') or []
+    node = {
+        'meta': hash_value(talk_meta(talk)),
+        'blocks': [hash_value(block) for block in talk.get('structured_content') or []],
+        'footnotes': dict(zip(_footnote_keys(footnotes), (hash_value(note) for note in footnotes))),
+    }
+    node['hash'] = hash_value([node['meta'], node['blocks'], list(node['footnotes'].items())])
+    return node
+
+
+def conference_tree(conference) -> Dict:
+    """The hash tree of a conference (dict or talk_model.Conference)"""
+    talks = {}
+    for talk in conference['talks']:
+        talks[talk_key(talk)] = talk_tree(talk)
+    title = conference.get('conference_title', '')
+    return {
+        'hash': hash_value([title, [[key, node['hash']] for key, node in talks.items()]]),
+        'talks': talks,
+    }
+
+
+def _block_label(block) -> str:
+    block = _plain(block)
+    kind = block.get('type', 'block')
+    if kind == 'image':
+        return f"image {block.get('url', '')}"
+    text = ' '.join(str(block.get('content', '')).split())
+    return f"{kind} \"{text[:60]}{'...' if len(text) > 60 else ''}\""
+
+
+def _diff_blocks(old_blocks, new_blocks, old_hashes, new_hashes) -> List[str]:
+    """Changes between two block lists, matched on their hashes"""
+    changes = []
+    matcher = difflib.SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        if op == 'replace' and i2 - i1 == j2 - j1:
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                old, new = _plain(old_blocks[i]), _plain(new_blocks[j])
+                if old.get('type') == 'image' and new.get('type') == 'image' and old.get('url') != new.get('url'):
+                    changes.append(f"block {j + 1}: image swapped {old.get('url')} -> {new.get('url')}")
+                else:
+                    changes.append(f"block {j + 1}: changed, now {_block_label(new)}")
+            continue
+        for i in range(i1, i2):
+            changes.append(f"block {i + 1}: removed {_block_label(old_blocks[i])}")
+        for j in range(j1, j2):
+            changes.append(f"block {j + 1}: added {_block_label(new_blocks[j])}")
+    return changes
+
+
+def _diff_talk(old_talk, new_talk, old_node, new_node) -> List[str]:
+    changes = []
+    if old_node['meta'] != new_node['meta']:
+        old_meta, new_meta = talk_meta(old_talk), talk_meta(new_talk)
+        for field in sorted(set(old_meta) | set(new_meta)):
+            if old_meta.get(field) != new_meta.get(field):
+                changes.append(f"{field}: {old_meta.get(field)!r} -> {new_meta.get(field)!r}")
+
+    if old_node['blocks'] != new_node['blocks']:
+        changes.extend(_diff_blocks(old_talk.get('structured_content') or [],
+                                    new_talk.get('structured_content') or [],
+                                    old_node['blocks'], new_node['blocks']))
+
+    old_notes, new_notes = old_node['footnotes'], new_node['footnotes']
+    if old_notes != new_notes:
+        for key, digest in new_notes.items():
+            if key not in old_notes:
+                changes.append(f"footnote {key}: added")
+            elif old_notes[key] != digest:
+                changes.append(f"footnote {key}: changed")
+        changes.extend(f"footnote {key}: removed" for key in old_notes if key not in new_notes)
+    return changes
+
+
+class SnapshotDiff:
+    """What changed between two snapshots"""
+
+    def __init__(self):
+        self.title = None  # (old, new) when the conference title changed
+        self.added = []  # Talks only in the new snapshot
+        self.removed = []  # Talks only in the old snapshot
+        self.changed = []  # [(talk, [change descriptions])] for talks in both
+        self.reordered = False
+        self.talks_compared = 0  # Talks whose subtrees had to be walked
+
+    def __bool__(self):
+        return bool(self.title or self.added or self.removed or self.changed or self.reordered)
+
+    def to_dict(self) -> Dict:
+        return {
+            'title': list(self.title) if self.title else None,
+            'added': [talk_key(talk) for talk in self.added],
+            'removed': [talk_key(talk) for talk in self.removed],
+            'changed': {talk_key(talk): changes for talk, changes in self.changed},
+            'reordered': self.reordered,
+        }
+
+    def report(self) -> str:
+        """A compact human readable change report"""
+        if not self:
+            return "No changes"
+        lines = []
+        if self.title:
+            lines.append(f"conference title: {self.title[0]!r} -> {self.title[1]!r}")
+        for talk in self.added:
+            lines.append(f"+ {talk.get('speaker', '')}: {talk.get('title', '')} ({talk_key(talk)})")
+        for talk in self.removed:
+            lines.append(f"- {talk.get('speaker', '')}: {talk.get('title', '')} ({talk_key(talk)})")
+        for talk, changes in self.changed:
+            lines.append(f"~ {talk.get('speaker', '')}: {talk.get('title', '')}")
+            lines.extend(f"    {change}" for change in changes)
+        if self.reordered:
+            lines.append("talks were reordered")
+        lines.append(f"{len(self.changed)} changed, {len(self.added)} added, {len(self.removed)} removed")
+        return '\n'.join(lines)
+
+
+def diff_snapshots(old, new, old_tree: Optional[Dict] = None, new_tree: Optional[Dict] = None) -> SnapshotDiff:
+    """Compare two snapshots, walking only the subtrees whose hashes differ
+
+    old_tree and new_tree are the snapshots' conference_tree, when the caller
+    already has them; the trees stored in the snapshots are not trusted.
+    """
+    old_tree = old_tree or conference_tree(old)
+    new_tree = new_tree or conference_tree(new)
+    diff = SnapshotDiff()
+    if old_tree['hash'] == new_tree['hash']:
+        return diff
+
+    if old.get('conference_title') != new.get('conference_title'):
+        diff.title = (old.get('conference_title'), new.get('conference_title'))
+
+    old_nodes, new_nodes = old_tree['talks'], new_tree['talks']
+    old_talks = {talk_key(talk): talk for talk in old['talks']}
+    for talk in new['talks']:
+        key = talk_key(talk)
+        old_node = old_nodes.get(key)
+        if old_node is None:
+            diff.added.append(talk)
+        elif old_node['hash'] != new_nodes[key]['hash']:
+            diff.talks_compared += 1
+            diff.changed.append((talk, _diff_talk(old_talks[key], talk, old_node, new_nodes[key])))
+    diff.removed = [talk for key, talk in old_talks.items() if key not in new_nodes]
+
+    common_old = [key for key in old_nodes if key in new_nodes]
+    common_new = [key for key in new_nodes if key in old_nodes]
+    diff.reordered = common_old != common_new
+    return diff
+
+
+def load_snapshot(path: str) -> Dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two conference snapshots, or add hashes to one")
+    parser.add_argument('--json', action='store_true', help="print the changes as JSON")
+    parser.add_argument('--hash', action='store_true', help="add (or refresh) the hash tree of one snapshot")
+    parser.add_argument('snapshots', nargs='+', metavar='snapshot.json')
+    args = parser.parse_args()
+
+    if args.hash:
+        for path in args.snapshots:
+            snapshot = load_snapshot(path)
+            snapshot[HASHES_KEY] = conference_tree(snapshot)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=2, ensure_ascii=False)
+            print(f"{path}: {snapshot[HASHES_KEY]['hash']}")
+        return
+
+    if len(args.snapshots) != 2:
+        parser.error("expected an old and a new snapshot")
+    old, new = (load_snapshot(path) for path in args.snapshots)
+    start = time.perf_counter()
+    diff = diff_snapshots(old, new)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(diff.to_dict(), indent=2, ensure_ascii=False))
+    else:
+        print(diff.report())
+        print(f"({diff.talks_compared} of {len(new['talks'])} talks walked in {elapsed * 1000:.1f} ms)")
+    sys.exit(1 if diff else 0)
+
+
+if __name__ == '__main__':
+    main()
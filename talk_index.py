@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Speaker and Topic Index Maps for General Conference Talks
+
+This module builds the sorted, grouped maps behind the index appendix of the
+PDF: every speaker with the talks they gave, and the topics (significant title
+words) with the talks whose titles mention them. The maps are built once from
+(key, talk) pairs, where key is the talk's bookmark key, so the renderer only
+has to walk them.
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Tuple
+from content_utils import STOP_WORDS, WORD_PATTERN
+
+
+# Name suffixes that stay after the given names when inverting a name
+NAME_SUFFIXES = ('jr.', 'jr', 'sr.', 'sr', 'ii', 'iii', 'iv')
+
+# Title words that say little about a talk's topic
+TOPIC_STOP_WORDS = STOP_WORDS | frozenset("""about all can come into more must not one only
+shall than then there these those through unto upon what when which who why""".split())
+
+
+def _sort_key(text: str) -> str:
+    """Case- and accent-insensitive sort key"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+
+def invert_name(speaker: str) -> str:
+    """'Dallin H. Oaks' -> 'Oaks, Dallin H.'; 'Neil L. Andersen Jr.' -> 'Andersen, Neil L., Jr.'"""
+    parts = speaker.split()
+    if len(parts) < 2:
+        return speaker
+    suffix = ''
+    if parts[-1].lower() in NAME_SUFFIXES and len(parts) > 2:
+        suffix = f", {parts.pop()}"
+    return f"{parts[-1]}, {' '.join(parts[:-1])}{suffix}"
+
+
+# Index maps: [(heading, [(entry, [(label, key), ...]), ...]), ...] grouped by first letter
+IndexMap = List[Tuple[str, List[Tuple[str, List[Tuple[str, str]]]]]]
+
+
+def _group_by_letter(entries: Dict[str, List[Tuple[str, str]]]) -> IndexMap:
+    groups = []
+    for entry in sorted(entries, key=_sort_key):
+        letter = _sort_key(entry)[:1].upper() or '#'
+        if not letter.isalpha():
+            letter = '#'
+        if not groups or groups[-1][0] != letter:
+            groups.append((letter, []))
+        groups[-1][1].append((entry, entries[entry]))
+    return groups
+
+
+def build_speaker_index(talks: Iterable[Tuple[str, Dict]], label_suffix=None) -> IndexMap:
+    """Group talks by speaker (sorted by surname), each speaker's talks in order
+
+    label_suffix(talk) may add context to each talk label, e.g. the conference
+    name in a multi-conference compilation.
+    """
+    speakers = {}
+    for key, talk in talks:
+        speaker = talk.get('speaker', 'Unknown')
+        label = talk.get('title', 'Untitled')
+        if label_suffix:
+            label = f"{label} ({label_suffix(talk)})"
+        speakers.setdefault(invert_name(speaker), []).append((label, key))
+    return _group_by_letter(speakers)
+
+
+def build_topic_index(talks: Iterable[Tuple[str, Dict]], label_suffix=None) -> IndexMap:
+    """Group talks under each significant word of their titles"""
+    topics = {}
+    for key, talk in talks:
+        title = talk.get('title', 'Untitled')
+        label = f"{title} - {talk.get('speaker', 'Unknown')}"
+        if label_suffix:
+            label = f"{label} ({label_suffix(talk)})"
+        words = {word.strip("'") for word in WORD_PATTERN.findall(title.lower())}
+        for word in sorted(words):
+            if len(word) > 3 and word not in TOPIC_STOP_WORDS and not re.match(r'^\d+$', word):
+                topics.setdefault(word.capitalize(), []).append((label, key))
+    return _group_by_letter(topics)
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Compact Talk Model for General Conference Data
+
+This module provides slotted record classes for conferences, talks, content
+blocks, images and footnotes. They use far less memory than the nested dicts
+produced by the scraper, convert losslessly to and from the JSON shape, and
+support dict-style read access (item['type'], talk.get('footnotes', [])) so
+existing code can consume them unchanged.
+"""
+
+import json
+from typing import Dict, List, Optional, Union
+
+
+# Marker for keys that were absent in the source dict, so to_dict() can
+# reproduce the original shape exactly
+_MISSING = object()
+
+# Marker for a talk's 'content' text that is the join of its text blocks, so it isn't stored twice
+_DERIVED = object()
+
+
+class _Record:
+    """Base class giving slotted records read-only dict-style access"""
+
+    __slots__ = ()
+    _keys = ()  # Keys in JSON order
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys and getattr(self, key) is not _MISSING
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> List[str]:
+        return [key for key in self._keys if key in self]
+
+    def to_dict(self) -> Dict:
+        """Convert the record back to its JSON dict shape"""
+        return {key: _to_json(self[key]) for key in self.keys()}
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={self[key]!r}" for key in self.keys() if key != 'type')
+        return f"{self.__class__.__name__}({fields})"
+
+
+def _to_json(value):
+    """Recursively convert records inside lists to plain dicts"""
+    if isinstance(value, _Record):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return value
+
+
+class TextBlock(_Record):
+    """A run of paragraph text (paragraphs separated by blank lines)"""
+
+    __slots__ = ('content',)
+    _keys = ('type', 'content')
+    type = 'text'
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class HeaderBlock(_Record):
+    """A section header inside a talk (h2, h3, ...)"""
+
+    __slots__ = ('level', 'content')
+    _keys = ('type', 'level', 'content')
+    type = 'header'
+
+    def __init__(self, level: int, content: str):
+        self.level = level
+        self.content = content
+
+
+class ImageBlock(_Record):
+    """An image embedded in a talk with its metadata and credit"""
+
+    __slots__ = ('url', 'alt', 'title', 'description', 'width', 'height', 'credit')
+    _keys = ('type', 'url', 'alt', 'title', 'description', 'width', 'height', 'credit')
+    type = 'image'
+
+    def __init__(self, url: str, alt: str = '', title: str = '', description: str = '',
+                 width: str = '', height: str = '', credit: str = ''):
+        self.url = url
+        self.alt = alt
+        self.title = title
+        self.description = description
+        self.width = width
+        self.height = height
+        self.credit = credit
+
+
+class Footnote(_Record):
+    """A footnote from the Notes section of a talk"""
+
+    __slots__ = ('marker', 'id', 'text')
+    _keys = ('marker', 'id', 'text')
+
+    def __init__(self, marker: str, id: str, text: str):
+        self.marker = marker
+        self.id = id
+        self.text = text
+
+
+_BLOCK_TYPES = {
+    'text': TextBlock,
+    'header': HeaderBlock,
+    'image': ImageBlock,
+}
+
+
+def _record_from_dict(cls, data: Dict):
+    """Build a record if the dict has exactly the record's keys, else keep the dict"""
+    keys = cls._keys
+    if len(data) != len(keys) or any(key not in data for key in keys):
+        return dict(data)
+    if 'type' in keys and data['type'] != cls.type:
+        return dict(data)
+    return cls(*(data[key] for key in keys if key != 'type'))
+
+
+def block_from_dict(data: Dict) -> Union[_Record, Dict]:
+    """Convert a structured_content item to its record type"""
+    cls = _BLOCK_TYPES.get(data.get('type'))
+    if cls is None:
+        return dict(data)
+    return _record_from_dict(cls, data)
+
+
+def footnote_from_dict(data: Dict) -> Union[Footnote, Dict]:
+    """Convert a footnote dict to a Footnote record"""
+    return _record_from_dict(Footnote, data)
+
+
+class Talk(_Record):
+    """A single conference talk"""
+
+    __slots__ = ('url', 'speaker', 'title', 'type', 'session', 'session_number', '_content',
+                 'structured_content', 'footnotes', 'author_role', 'full_data')
+    _keys = ('url', 'speaker', 'title', 'type', 'session', 'session_number', 'content',
+             'structured_content', 'footnotes', 'author_role', 'full_data')
+
+    def __init__(self, url=_MISSING, speaker=_MISSING, title=_MISSING, type=_MISSING,
+                 session=_MISSING, session_number=_MISSING, content=_MISSING,
+                 structured_content=_MISSING, footnotes=_MISSING, author_role=_MISSING,
+                 full_data=_MISSING):
+        self.url = url
+        self.speaker = speaker
+        self.title = title
+        self.type = type
+        self.session = session
+        self.session_number = session_number
+        self.structured_content = structured_content
+        self.footnotes = footnotes
+        self.author_role = author_role
+        self.full_data = full_data
+        self.content = content
+
+    @property
+    def content(self):
+        """Plain text of the talk, derived from the text blocks when possible"""
+        if self._content is not _DERIVED:
+            return self._content
+        blocks = self.structured_content if isinstance(self.structured_content, list) else []
+        return '\n\n'.join(item.content for item in blocks if isinstance(item, TextBlock))
+
+    @content.setter
+    def content(self, value):
+        # Only store the text when it can't be rebuilt from structured_content (None is kept as None)
+        if isinstance(value, str) and isinstance(self.structured_content, list):
+            self._content = _DERIVED
+            if self.content == value:
+                return
+        self._content = value
+
+    def __setitem__(self, key, value):
+        if key not in self._keys:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Union['Talk', Dict]:
+        """Build a Talk from its JSON dict, keeping unknown shapes as dicts"""
+        if any(key not in cls._keys for key in data):
+            return dict(data)
+
+        structured_content = data.get('structured_content', _MISSING)
+        if structured_content is not _MISSING:
+            structured_content = [block_from_dict(item) for item in structured_content]
+        footnotes = data.get('footnotes', _MISSING)
+        if footnotes is not _MISSING:
+            footnotes = [footnote_from_dict(item) for item in footnotes]
+
+        return cls(
+            url=data.get('url', _MISSING),
+            speaker=data.get('speaker', _MISSING),
+            title=data.get('title', _MISSING),
+            type=data.get('type', _MISSING),
+            session=data.get('session', _MISSING),
+            session_number=data.get('session_number', _MISSING),
+            content=data.get('content', _MISSING),
+            structured_content=structured_content,
+            footnotes=footnotes,
+            author_role=data.get('author_role', _MISSING),
+            full_data=data.get('full_data', _MISSING),
+        )
+
+
+class Conference(_Record):
+    """A scraped conference: title, talks and scrape timestamp"""
+
+    __slots__ = ('conference_title', 'talks', 'scraped_at', 'extra')
+    _keys = ('conference_title', 'talks', 'scraped_at')
+
+    def __init__(self, conference_title=_MISSING, talks=_MISSING, scraped_at=_MISSING,
+                 extra: Optional[Dict] = None):
+        self.conference_title = conference_title
+        self.talks = talks
+        self.scraped_at = scraped_at
+        self.extra = extra or {}  # Any additional top-level keys
+
+    def __getitem__(self, key):
+        if key in self.extra:
+            return self.extra[key]
+        return super().__getitem__(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self.extra or super().__contains__(key)
+
+    def keys(self) -> List[str]:
+        return super().keys() + list(self.extra)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Conference':
+        """Build a Conference (and its talks) from the scraper's JSON dict"""
+        extra = {key: value for key, value in data.items() if key not in cls._keys}
+        return cls(
+            conference_title=data.get('conference_title', _MISSING),
+            talks=[Talk.from_dict(talk) for talk in data['talks']] if 'talks' in data else _MISSING,
+            scraped_at=data.get('scraped_at', _MISSING),
+            extra=extra,
+        )
+
+
+def load_conference(path: str) -> Conference:
+    """Load a conference JSON file into the compact model"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return Conference.from_dict(json.load(f))
+
+
+def save_conference(conference: Union[Conference, Dict], path: str):
+    """Save a conference (model or dict) in the scraper's JSON format"""
+    data = conference.to_dict() if isinstance(conference, _Record) else conference
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
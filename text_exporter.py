@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Markdown and Plain-Text Exporter for General Conference Talks
+
+This module writes talk text for downstream processing (NLP jobs, search,
+diffing) straight from the scraped data, either as one file per talk or as a
+single concatenated corpus. Output is streamed line by line and conferences
+are loaded one at a time, so memory stays flat however many are exported.
+
+Usage:
+    python text_exporter.py [--format md|txt] [--progress human|quiet|jsonl] (--corpus FILE | --dir DIR) <conference_data.json> [...]
+
+Example:
+    python text_exporter.py --format md --corpus corpus.md data/*.json
+"""
+
+import os
+import argparse
+from typing import Dict, Iterable, Iterator, Optional
+from talk_model import load_conference
+from progress import MODES, ProgressReporter
+from content_utils import (split_footnote_markers, extract_conference_date, iter_talk_blocks,
+                           footnote_number, conference_slug, talk_slug)
+
+
+class TextExporter:
+    """Streams talks as Markdown ('md') or plain text ('txt')"""
+
+    def __init__(self, fmt: str = 'md', progress: Optional[ProgressReporter] = None):
+        if fmt not in ('md', 'txt'):
+            raise ValueError(f"Unknown format: {fmt} (expected 'md' or 'txt')")
+        self.fmt = fmt
+        self.progress = progress  # Counts talks in an 'export' stage; conferences stream, so no total
+
+    def _log(self, message: str):
+        if not self.progress:
+            print(message)
+
+    def _talk_done(self, talk: Dict):
+        if self.progress:
+            self.progress.advance('export', item=f"{talk.get('speaker', '')}: {talk.get('title', '')}")
+
+    def _format_text(self, text: str, note_prefix: str) -> str:
+        """Replace {{FOOTNOTE:n}} markers with [^n] (Markdown) or [n] (plain text)"""
+        parts = []
+        for segment, num in split_footnote_markers(text.replace('\xa0', ' ')):
+            parts.append(segment)
+            if num:
+                parts.append(f"[^{note_prefix}{num}]" if self.fmt == 'md' else f"[{num}]")
+        return ''.join(parts)
+
+    def iter_talk_lines(self, talk: Dict, conference_date: str = '', heading_level: int = 1,
+                        note_prefix: str = '') -> Iterator[str]:
+        """Yield a talk as lines of text (each ending in a newline)
+
+        note_prefix keeps Markdown footnote labels unique when several talks
+        share one file.
+        """
+        md = self.fmt == 'md'
+        title = talk.get('title', 'Untitled')
+        speaker = talk.get('speaker', 'Unknown')
+        author_role = talk.get('author_role')
+
+        if md:
+            yield f"{'#' * heading_level} {title}\n\n"
+            yield f"**By {speaker}**  \n"
+            if author_role:
+                yield f"*{author_role}*  \n"
+            if conference_date:
+                yield f"{conference_date}\n"
+        else:
+            yield f"{title}\n{'=' * len(title)}\n\n"
+            yield f"By {speaker}\n"
+            if author_role:
+                yield f"{author_role}\n"
+            if conference_date:
+                yield f"{conference_date}\n"
+        yield "\n"
+
+        for kind, value, extra in iter_talk_blocks(talk):
+            if kind == 'paragraph':
+                yield f"{self._format_text(value, note_prefix)}\n\n"
+            elif kind == 'header':
+                text = self._format_text(value, note_prefix)
+                if md:
+                    yield f"{'#' * min(heading_level + extra - 1, 6)} {text}\n\n"
+                else:
+                    yield f"{text}\n{'-' * len(text)}\n\n"
+            elif kind == 'image' and md:
+                alt = value.get('alt', '') or value.get('title', '')
+                url = value.get('url', '')
+                if url:
+                    yield f"![{alt}]({url})\n\n"
+                    if value.get('credit'):
+                        yield f"*{value['credit']}*\n\n"
+
+        footnotes = [note for note in talk.get('footnotes', []) if footnote_number(note) and note.get('text')]
+        if footnotes:
+            if not md:
+                yield "Notes\n-----\n\n"
+            for footnote in footnotes:
+                num = footnote_number(footnote)
+                if md:
+                    yield f"[^{note_prefix}{num}]: {footnote['text']}\n"
+                else:
+                    yield f"{num}. {footnote['text']}\n"
+            yield "\n"
+
+    def export_corpus(self, conferences: Iterable[Dict], output_filename: str) -> int:
+        """Write every talk of every conference into one file; returns the talk count"""
+        count = 0
+        if self.progress:
+            self.progress.start('export', unit='talks')
+        with open(output_filename, 'w', encoding='utf-8') as f:
+            for conference in conferences:
+                date = extract_conference_date(conference)
+                slug = conference_slug(conference)
+                heading = conference.get('conference_title', slug)
+                if self.fmt == 'md':
+                    f.write(f"# {heading}\n\n")
+                else:
+                    f.write(f"{heading}\n{'#' * len(heading)}\n\n")
+                for i, talk in enumerate(conference.get('talks', []), 1):
+                    note_prefix = f"{slug}-{i}-"
+                    f.writelines(self.iter_talk_lines(talk, date, heading_level=2, note_prefix=note_prefix))
+                    count += 1
+                    self._talk_done(talk)
+                self._log(f"  {slug}: {len(conference.get('talks', []))} talks")
+        if self.progress:
+            self.progress.finish('export')
+        return count
+
+    def export_per_talk(self, conferences: Iterable[Dict], output_dir: str) -> int:
+        """Write each talk to <output_dir>/<conference>/<talk>.<fmt>; returns the talk count"""
+        count = 0
+        if self.progress:
+            self.progress.start('export', unit='talks')
+        for conference in conferences:
+            date = extract_conference_date(conference)
+            slug = conference_slug(conference)
+            conference_dir = os.path.join(output_dir, slug)
+            os.makedirs(conference_dir, exist_ok=True)
+            for i, talk in enumerate(conference.get('talks', []), 1):
+                path = os.path.join(conference_dir, f"{talk_slug(talk, i)}.{self.fmt}")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.writelines(self.iter_talk_lines(talk, date))
+                count += 1
+                self._talk_done(talk)
+            self._log(f"  {slug}: {len(conference.get('talks', []))} talks")
+        if self.progress:
+            self.progress.finish('export')
+        return count
+
+
+def iter_conference_files(paths: Iterable[str]) -> Iterator:
+    """Load conference JSON files one at a time"""
+    for path in paths:
+        yield load_conference(path)
+
+
+def main():
+    """Main function for exporting talk text from JSON files"""
+    parser = argparse.ArgumentParser(description="Export conference talks as Markdown or plain text")
+    parser.add_argument('inputs', nargs='+', help="conference data JSON file(s)")
+    parser.add_argument('--format', choices=['md', 'txt'], default='md', help="output format (default: md)")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--corpus', help="write all talks into this single file")
+    target.add_argument('--dir', help="write one file per talk under this directory")
+    parser.add_argument('--progress', choices=MODES, help="report progress as counters instead of log lines")
+    args = parser.parse_args()
+
+    progress = ProgressReporter(args.progress) if args.progress else None
+    exporter = TextExporter(args.format, progress)
+    conferences = iter_conference_files(args.inputs)
+    if args.corpus:
+        count = exporter.export_corpus(conferences, args.corpus)
+    else:
+        count = exporter.export_per_talk(conferences, args.dir)
+    message = f"Exported {count} talks to {args.corpus or args.dir}"
+    if progress:
+        progress.log(message)
+        progress.close()
+    else:
+        print(f"\n{message}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Cached Text Measurement for Paragraph Wrapping
+
+ReportLab wraps a paragraph by measuring every word (and space) with
+pdfmetrics.stringWidth, and measures them again for every paragraph, talk
+and conference. A talk body only uses a few fonts and sizes, and the same
+few thousand words, so most of those measurements are repeats.
+
+TextMeasurer replaces the stringWidth that ReportLab's paragraph module uses
+while a document is built (measuring_text), and only then:
+
+    - widths are memoized per (text, font, size) in a bounded LRU cache,
+      shared by every generator in the process (talks, conferences, and the
+      renders of a batch run or the render service)
+    - a miss is measured from a character width table made once per font
+      (the TrueType font's own width table, or for the standard Type 1 fonts
+      each character's width, filled in as characters are met) instead of
+      encoding the text through the font on every call
+
+The widths are computed exactly as ReportLab computes them, so line breaks
+and the output are unchanged. A font name must not be re-registered with a
+different font file after text in it was measured.
+
+Example:
+    from text_metrics import measuring_text, shared_text_measurer
+    measurer = shared_text_measurer()
+    with measuring_text(measurer):
+        doc.build(story)
+    print(measurer.stats())
+"""
+
+import functools
+import threading
+import contextlib
+from typing import Dict
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.rl_accel import unicode2T1
+from reportlab.platypus import paragraph
+
+
+# Strings (words, spaces, punctuation) whose widths are kept; about 150 bytes each
+WORD_CACHE_SIZE = 65536
+
+
+class _FontTable:
+    """Character widths of one font, in thousandths of the font size"""
+
+    __slots__ = ('widths', 'default', 'truetype', 'fonts')
+
+    def __init__(self, font):
+        self.truetype = isinstance(font, TTFont)
+        if self.truetype:
+            self.widths = {chr(code): width for code, width in font.face.charWidths.items()}
+            self.default = font.face.defaultWidth
+        else:
+            self.widths = {}  # Filled in as characters are met (encodings and fallbacks vary)
+            self.default = None
+            self.fonts = [font] + font.substitutionFonts
+
+    def width(self, char: str):
+        """The width of a character the table hasn't seen (Type 1 fonts)"""
+        width = sum(sum(map(font.widths.__getitem__, encoded)) for font, encoded in unicode2T1(char, self.fonts))
+        self.widths[char] = width
+        return width
+
+    def measure(self, text: str, size: float) -> float:
+        # Summed and scaled in the order ReportLab uses, so the results are identical
+        if self.truetype:
+            get, default = self.widths.get, self.default
+            return 0.001 * size * sum([get(char, default) for char in text])
+        widths = self.widths
+        total = 0
+        for char in text:
+            width = widths.get(char)
+            total += self.width(char) if width is None else width
+        return total * 0.001 * size
+
+
+class TextMeasurer:
+    """Memoized string widths per (font, size), measured from per-font width tables"""
+
+    def __init__(self, max_words: int = WORD_CACHE_SIZE):
+        self.tables = {}  # Font name -> _FontTable
+        self._lock = threading.Lock()
+        self._cached = functools.lru_cache(maxsize=max_words)(self._measure)
+
+    def _table(self, font_name: str) -> _FontTable:
+        table = self.tables.get(font_name)
+        if table is None:
+            with self._lock:
+                table = self.tables.get(font_name)
+                if table is None:
+                    table = self.tables[font_name] = _FontTable(pdfmetrics.getFont(font_name))
+        return table
+
+    def _measure(self, text: str, font_name: str, font_size: float) -> float:
+        return self._table(font_name).measure(text, font_size)
+
+    def string_width(self, text, font_name: str, font_size: float, encoding: str = 'utf8') -> float:
+        """Drop-in replacement for pdfmetrics.stringWidth"""
+        if not isinstance(text, str):
+            text = text.decode(encoding)
+        return self._cached(text, font_name, font_size)
+
+    def stats(self) -> Dict:
+        info = self._cached.cache_info()
+        lookups = info.hits + info.misses
+        return {'lookups': lookups, 'hits': info.hits, 'hit_rate': info.hits / lookups if lookups else 0.0,
+                'cached': info.currsize, 'fonts': len(self.tables)}
+
+    def clear(self):
+        """Forget every width (e.g. after re-registering a font name)"""
+        self._cached.cache_clear()
+        with self._lock:
+            self.tables.clear()
+
+
+_shared = None  # The TextMeasurer every generator in the process uses
+_lock = threading.Lock()
+_builds = 0  # Builds inside measuring_text right now (several at once in the render service)
+_original = None  # ReportLab's stringWidth, put back when the last build finishes
+
+
+def shared_text_measurer() -> TextMeasurer:
+    """The TextMeasurer shared by every generator in the process, so widths carry across documents"""
+    global _shared
+    with _lock:
+        if _shared is None:
+            _shared = TextMeasurer()
+        return _shared
+
+
+@contextlib.contextmanager
+def measuring_text(measurer=None):
+    """Make ReportLab's paragraph wrapping measure through measurer while the block runs
+
+    Blocks may nest or run in several threads at once; the first one in
+    installs its measurer (meant to be the shared one) and the last one out
+    puts ReportLab's stringWidth back. With measurer None, nothing changes.
+    """
+    global _builds, _original
+    if measurer is None:
+        yield
+        return
+    with _lock:
+        if not _builds:
+            _original = paragraph.stringWidth
+            paragraph.stringWidth = measurer.string_width
+        _builds += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _builds -= 1
+            if not _builds:
+                paragraph.stringWidth = _original
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Watch Mode: Re-render Only What Changed
+
+Keeps a PDF generator resident while you edit a conference snapshot or the
+styles in pdf_generator.py, and after each save re-lays out only the talks
+the change affects, splicing their pages into the PDF already written:
+
+    snapshot edits      the talk hash trees (see snapshot_diff.py) of the old
+                        and new snapshot are compared; talks whose text,
+                        images or footnotes changed are re-laid out
+    style edits         pdf_generator.py is reloaded and its style sheet
+                        compared; talks that use a changed style (directly
+                        or through a parent style) are re-laid out
+
+A re-laid out talk is numbered from its first page, so its running headers and
+page numbers match, and its pages replace the old ones in place (the outline,
+table of contents links and page references keep pointing at them). Anything
+else needs a full render, which still reuses the warm fonts, word widths and
+prepared images:
+
+    - a talk's page count changed (every later page number moves)
+    - talks were added, removed or reordered, or a title or speaker changed
+      (table of contents, outline and index)
+    - a changed style is used outside the talks (cover, contents, session
+      pages, index, running headers)
+    - pdf_generator.py changed but its styles didn't (other code changed)
+
+Spliced talks reuse the document's copies of their images, but bring their
+own font objects, so the file grows slightly until the next full render
+(Ctrl+C makes a final one). Splicing needs pikepdf (pip install pikepdf).
+
+Usage:
+    python watch_render.py [--eink [BITS]] [--interval SECONDS] <conference_data.json> [output.pdf]
+
+Example:
+    python watch_render.py Output/2025_April.json Output/2025_April.pdf
+"""
+
+import io
+import os
+import hashlib
+import sys
+import time
+import argparse
+import importlib
+from typing import Dict, List, Set, Tuple
+
+import pdf_generator
+from talk_model import load_conference
+from progress import ProgressReporter
+from snapshot_diff import conference_tree, diff_snapshots, talk_key
+from render_profile import eink_profile, expand_bare_eink
+
+try:
+    import pikepdf
+except ImportError:  # Optional dependency, only needed to splice pages
+    pikepdf = None
+
+
+# Seconds between checks for saved changes
+POLL_INTERVAL = 0.3
+
+# Styles drawn on every page by the page callbacks, not by any flowable
+PAGE_STYLES = ('RunningHeader',)
+
+
+def style_fingerprints(styles) -> Dict[str, Tuple]:
+    """Every style's resolved attributes (parents included), to see which ones an edit changed"""
+    return {name: tuple((attr, repr(getattr(style, attr))) for attr in sorted(style.defaults))
+            for name, style in styles.byName.items()}
+
+
+def _style_names(flowable) -> Set[str]:
+    """Names of the style a flowable uses and of that style's parents"""
+    names = set()
+    style = getattr(flowable, 'style', None)
+    while style is not None and hasattr(style, 'name'):
+        names.add(style.name)
+        style = style.parent
+    return names
+
+
+class WatchSession:
+    """A resident generator, the document it last wrote, and what it was built from"""
+
+    def __init__(self, input_path: str, output_path: str, fetcher=None, profile=None, log=print):
+        if pikepdf is None:
+            raise ImportError("Watch mode needs pikepdf to splice pages: pip install pikepdf")
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fetcher = fetcher
+        self.profile = profile
+        self.log = log
+        self.module = pdf_generator
+        self.module_path = os.path.abspath(pdf_generator.__file__)
+        # Shared by every generator the session makes, so reloads keep them warm
+        self.image_cache = pdf_generator.ImageCache()
+        self.image_dedup = pdf_generator.ImageDeduplicator()
+        self.prepared_images = {}
+        self.progress = ProgressReporter('quiet')
+
+        self.conference = load_conference(input_path)
+        self.tree = conference_tree(self.conference)
+        self.generator = self._make_generator()
+        self.styles = style_fingerprints(self.generator.styles)
+        self.pdf = None  # The written document, open for splicing
+        self.images = {}  # Digest of an image's stream -> the image in self.pdf, so splices reuse them
+        self.mtimes = self._mtimes()
+
+    def _mtimes(self) -> Tuple[float, float]:
+        return os.path.getmtime(self.input_path), os.path.getmtime(self.module_path)
+
+    def _make_generator(self):
+        generator = self.module.ConferencePDFGenerator(self.conference, image_cache=self.image_cache,
+                                                       progress=self.progress, fetcher=self.fetcher,
+                                                       profile=self.profile, image_dedup=self.image_dedup)
+        generator.prepared_images = self.prepared_images
+        return generator
+
+    # Rendering
+
+    def full_render(self, reason: str = 'first render'):
+        start = time.perf_counter()
+        self.generator.conference_data = self.conference
+        self.generator.generate_pdf(self.output_path)
+        with open(self.output_path, 'rb') as f:
+            self.pdf = pikepdf.open(io.BytesIO(f.read()))
+        self.images = {}
+        for page in self.pdf.pages:
+            self._share_images(page.obj.Resources)
+        self.log(f"Full render ({reason}): {self.generator.page_count} pages in "
+                 f"{time.perf_counter() - start:.2f} s")
+
+    def _talk_pages(self, number: int) -> Tuple[int, int]:
+        """(first page, page count) of talk number in the current document"""
+        pages = self.generator.bookmark_pages
+        first = pages[self.generator._talk_key(number)]
+        later = [page for page in pages.values() if page > first]
+        return first, (min(later) if later else self.generator.page_count + 1) - first
+
+    def update_talks(self, numbers: List[int], reason: str):
+        """Re-lay out talks (1-based) and splice their pages in; a full render if their length changed"""
+        if not numbers:
+            return
+        start = time.perf_counter()
+        talks = self.conference['talks']
+        parts = []
+        for number in numbers:
+            first, count = self._talk_pages(number)
+            data, new_count = self.generator.render_talk_pages(talks[number - 1], number, first)
+            if new_count != count:
+                self.full_render(f"{reason}; talk {number} now has {new_count} pages, not {count}")
+                return
+            parts.append((first, pikepdf.open(io.BytesIO(data))))
+
+        for first, part in parts:
+            for offset, page in enumerate(part.pages):
+                self._replace_page(self.pdf.pages[first - 1 + offset], page, part)
+        tmp_path = f"{self.output_path}.tmp"
+        self.pdf.save(tmp_path)
+        os.replace(tmp_path, self.output_path)
+        label = ', '.join(str(number) for number in numbers)
+        self.log(f"Re-rendered talk{'s' if len(numbers) > 1 else ''} {label} ({reason}) in "
+                 f"{time.perf_counter() - start:.2f} s")
+
+    def _replace_page(self, target, page, part):
+        """Give target (a page of the document) the content of page (from a separately laid out part)
+
+        The page object itself stays, so outline entries and links that point
+        at it still do.
+        """
+        def copy(obj):
+            # Only indirect objects can be copied between documents
+            return self.pdf.copy_foreign(obj if obj.is_indirect else part.make_indirect(obj))
+
+        target.obj.Contents = copy(page.obj.Contents)
+        target.obj.Resources = copy(page.obj.Resources)
+        self._share_images(target.obj.Resources)
+        # Web links come along; a part has no internal destinations worth keeping
+        annotations = []
+        for annotation in page.obj.get('/Annots', []):
+            if '/Dest' not in annotation:
+                if '/P' in annotation:  # Back to the part's page, which would copy the part's page tree
+                    del annotation['/P']
+                annotations.append(copy(annotation))
+        if annotations:
+            target.obj.Annots = pikepdf.Array(annotations)
+        elif '/Annots' in target.obj:
+            del target.obj['/Annots']
+
+    def _share_images(self, resources):
+        """Point a page's images at the document's copies of the same images"""
+        xobjects = resources.get('/XObject')
+        if xobjects is None:
+            return
+        for name, xobject in list(xobjects.items()):
+            if xobject.get('/Subtype') != '/Image':
+                continue
+            key = hashlib.sha1(xobject.read_raw_bytes()).hexdigest()
+            shared = self.images.setdefault(key, xobject)
+            if shared.objgen != xobject.objgen:
+                xobjects[name] = shared
+
+    # Change detection
+
+    def _snapshot_changed(self):
+        try:
+            conference = load_conference(self.input_path)
+        except ValueError as e:  # Caught mid-save, or a typo; wait for the next save
+            self.log(f"Snapshot not readable yet: {e}")
+            return
+        tree = conference_tree(conference)
+        diff = diff_snapshots(self.conference, conference, self.tree, tree)
+        old_nodes = self.tree['talks']
+        self.conference, self.tree = conference, tree
+        if not diff:
+            return
+        if diff.title or diff.added or diff.removed or diff.reordered:
+            self.full_render("talks added, removed or reordered")
+            return
+        numbers = []
+        for number, talk in enumerate(conference['talks'], 1):
+            key = talk_key(talk)
+            if old_nodes[key]['hash'] != tree['talks'][key]['hash']:
+                if old_nodes[key]['meta'] != tree['talks'][key]['meta']:
+                    self.full_render(f"talk {number}'s details changed")
+                    return
+                numbers.append(number)
+        self.update_talks(numbers, "snapshot changed")
+
+    def _styles_used(self) -> Tuple[Dict[int, Set[str]], Set[str]]:
+        """Styles each talk's flowables use, and the styles used anywhere else"""
+        generator = self.generator
+        generator._page_ref_keys = set()
+        talks = self.conference['talks']
+        talk_keys = {generator._talk_key(number): number for number in range(1, len(talks) + 1)}
+        by_talk, other = {}, set(PAGE_STYLES)
+        owner = other
+        for chunk in generator._iter_story_chunks(talks, len(talks), talks, include_index=True):
+            for flowable in chunk:
+                # By name: the class is a new one after each reload
+                if type(flowable).__name__ == 'BookmarkFlowable':
+                    number = talk_keys.get(flowable.key)
+                    owner = by_talk.setdefault(number, set()) if number else other
+                owner |= _style_names(flowable)
+        return by_talk, other
+
+    def _module_changed(self):
+        old_class = self.module.ConferencePDFGenerator
+        try:
+            self.module = importlib.reload(self.module)
+        except Exception as e:  # A half-finished edit; keep the generator we have
+            self.log(f"pdf_generator.py didn't load: {e}")
+            return
+        # Fonts are registered with ReportLab once per process
+        self.module.ConferencePDFGenerator._fonts = old_class._fonts
+        previous = self.generator
+        self.generator = self._make_generator()
+        self.generator.bookmark_pages = previous.bookmark_pages
+        self.generator.page_count = previous.page_count
+
+        styles = style_fingerprints(self.generator.styles)
+        changed = {name for name in set(styles) | set(self.styles) if styles.get(name) != self.styles.get(name)}
+        self.styles = styles
+        if not changed:
+            self.full_render("pdf_generator.py changed outside the styles")
+            return
+        by_talk, other = self._styles_used()
+        names = ', '.join(sorted(changed))
+        if changed & other:
+            self.full_render(f"style {names} is used outside the talks")
+            return
+        numbers = sorted(number for number, used in by_talk.items() if used & changed)
+        if numbers:
+            self.update_talks(numbers, f"style {names} changed")
+        else:
+            self.log(f"Style {names} changed, but no talk uses it")
+
+    def check(self) -> bool:
+        """Act on saved changes since the last check; returns whether there were any"""
+        try:
+            mtimes = self._mtimes()
+        except OSError:  # Between an editor's delete and rename
+            return False
+        if mtimes == self.mtimes:
+            return False
+        snapshot_changed, module_changed = (new != old for new, old in zip(mtimes, self.mtimes))
+        self.mtimes = mtimes
+        if module_changed:
+            self._module_changed()
+        if snapshot_changed:
+            self._snapshot_changed()
+        return True
+
+    def run(self, interval: float = POLL_INTERVAL):
+        self.full_render()
+        self.log(f"Watching {self.input_path} and {self.module_path} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(interval)
+                self.check()
+        except KeyboardInterrupt:
+            self.full_render("final")
+
+
+def main():
+    """Main function for watch mode"""
+    parser = argparse.ArgumentParser(description="Re-render a conference PDF as its snapshot or styles change")
+    parser.add_argument('input', help="conference data JSON file")
+    parser.add_argument('output', nargs='?', help="output PDF (default: the input name with .pdf)")
+    parser.add_argument('--eink', type=int, nargs='?', const=4, choices=(1, 2, 4, 8), metavar='BITS',
+                        help="render for e-ink readers, images dithered to BITS (1, 2, 4 or 8); "
+                             "a bare --eink means 4")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL,
+                        help=f"seconds between checks for changes (default: {POLL_INTERVAL})")
+    # A bare --eink becomes --eink=4 first (an optional value would swallow the input path)
+    args = parser.parse_args(expand_bare_eink(sys.argv[1:]))
+
+    output = args.output or os.path.splitext(args.input)[0] + '.pdf'
+    try:
+        session = WatchSession(args.input, output, profile=eink_profile(args.eink) if args.eink else None)
+    except ImportError as e:
+        sys.exit(str(e))
+    session.run(args.interval)
+
+
+if __name__ == '__main__':
+    main()